@@ -0,0 +1,149 @@
+# benchmarks/__main__.py
+"""
+Run the benchmark suite and write the results as one JSON document.
+
+Each benchmark runs in its own interpreter, since the apps read their settings when first
+imported and several benchmarks configure them differently. The document records the
+interpreter, platform and git commit next to each benchmark's results, and with --compare
+the relative change of every numeric result against an earlier document.
+
+    python -m benchmarks                            # every benchmark, default sizes
+    python -m benchmarks --quick bench_load         # selected benchmarks, small sizes
+    python -m benchmarks --output results.json --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import pkgutil
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Tuple
+
+import benchmarks
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Arguments for --quick, small enough for the whole suite to finish in a few minutes
+QUICK_ARGS: Dict[str, List[int]] = {
+    "bench_auth_flow": [100, 10],
+    "bench_bearer_auth": [200, 20],
+    "bench_bulk_import": [1_000],
+    "bench_conditional_get": [1_000, 20],
+    "bench_content_negotiation": [1_000, 5],
+    "bench_hero_analytics": [100_000, 10_000, 5],
+    "bench_hero_concurrency": [100, 10],
+    "bench_hero_events": [200, 200, 20, 2_000],
+    "bench_hero_journal": [100_000, 500, 20],
+    "bench_hero_listing": [10_000],
+    "bench_hero_proxy": [100, 20, 10],
+    "bench_hero_serialization": [200, 50],
+    "bench_hero_store": [1_000, 10_000],
+    "bench_jwks": [200, 20],
+    "bench_load": [2_000, 20, 50],
+    "bench_logging": [200],
+    "bench_login_callback": [50, 5],
+    "bench_metrics": [500, 3],
+    "bench_profiling": [100],
+    "bench_scopes": [10_000],
+    "bench_sessions": [5_000, 2_000, 2_000, 100],
+    "bench_skill_masks": [10_000, 5],
+    "bench_startup": [3],
+    "bench_storage_engines": [2_000, 20],
+    "bench_token_refresh": [100],
+}
+
+
+def discover() -> List[str]:
+    return sorted(module.name for module in pkgutil.iter_modules(benchmarks.__path__)
+                  if module.name.startswith("bench_"))
+
+
+def run_benchmark(name: str, args: List, timeout: float) -> Dict:
+    """Run one benchmark module in a subprocess, returning its results or the error it failed with."""
+    command = [sys.executable, "-m", f"benchmarks.{name}", *map(str, args)]
+    started = time.perf_counter()
+    try:
+        process = subprocess.run(command, capture_output=True, text=True, timeout=timeout, cwd=ROOT)
+    except subprocess.TimeoutExpired:
+        return {"error": f"Timed out after {timeout:.0f}s"}
+    elapsed = time.perf_counter() - started
+    if process.returncode != 0:
+        return {"error": process.stderr.strip().splitlines()[-1] if process.stderr.strip() else
+                f"Exited with status {process.returncode}"}
+    return {"args": args, "seconds": elapsed, "results": json.loads(process.stdout)}
+
+
+def numeric_leaves(document, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(document, dict):
+        for key, value in document.items():
+            yield from numeric_leaves(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(document, (int, float)) and not isinstance(document, bool):
+        yield prefix, float(document)
+
+
+def compare(current: Dict, baseline: Dict) -> Dict[str, Dict[str, float]]:
+    """Relative change of every numeric result present in both runs, keyed by its dotted path."""
+    before = dict(numeric_leaves(baseline["benchmarks"]))
+    changes = {}
+    for path, value in numeric_leaves(current["benchmarks"]):
+        if path.endswith(".seconds") or path not in before:
+            continue
+        previous = before[path]
+        changes[path] = {"baseline": previous, "current": value,
+                         "change_pct": (value - previous) / previous * 100 if previous else None}
+    return changes
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=ROOT).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the benchmark suite.")
+    parser.add_argument("names", nargs="*", help="Benchmarks to run, e.g. bench_load (default: all)")
+    parser.add_argument("--quick", action="store_true", help="Use small sizes instead of each benchmark's defaults")
+    parser.add_argument("--output", help="Write the results to this file instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="Results of an earlier run to compare against")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="Seconds allowed per benchmark")
+    options = parser.parse_args()
+
+    available = discover()
+    unknown = [name for name in options.names if name not in available]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}; available: {', '.join(available)}")
+
+    document = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": git_commit(),
+        "quick": options.quick,
+        "benchmarks": {},
+    }
+    for name in options.names or available:
+        print(f"Running {name}", file=sys.stderr)
+        args = QUICK_ARGS.get(name, []) if options.quick else []
+        document["benchmarks"][name] = run_benchmark(name, args, options.timeout)
+
+    if options.compare:
+        with open(options.compare) as file:
+            document["comparison"] = compare(document, json.load(file))
+
+    output = json.dumps(document, indent=2)
+    if options.output:
+        with open(options.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_auth_flow.py
+"""
+Load test of the complete authorization code flow against the client app, with the stub
+identity provider served locally: the client's /auth/login redirecting the browser to the
+authorize endpoint, which redirects back with a code, then the client's /auth/callback
+exchanging it for tokens and starting a session.
+Logins run `concurrency` at a time; both legs are timed separately.
+
+    python -m benchmarks.bench_auth_flow [logins] [concurrency]
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+from benchmarks.common import emit, latency_summary, serve_in_thread, use_stub_settings
+from benchmarks.stub_idp import StubIdentityProvider, TENANT_ID
+
+
+async def _logins(app, logins: int, concurrency: int) -> dict:
+    from client.services.session_service import session_service
+
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = {"authorize": [], "callback": [], "login": []}
+
+    async def login(browser: httpx.AsyncClient, client: httpx.AsyncClient):
+        async with semaphore:
+            started = time.perf_counter()
+            login_redirect = await client.get("/auth/login")
+            redirect = await browser.get(login_redirect.headers["location"])
+            query = {key: values[0] for key, values in parse_qs(urlsplit(redirect.headers["location"]).query).items()}
+            redirected = time.perf_counter()
+            response = (await client.get("/auth/callback", params=query)).raise_for_status()
+            if session_service.cookie_name not in response.cookies:
+                raise RuntimeError("The callback did not start a session")
+            finished = time.perf_counter()
+        samples["authorize"].append(redirected - started)
+        samples["callback"].append(finished - redirected)
+        samples["login"].append(finished - started)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient() as browser, \
+                httpx.AsyncClient(transport=transport, base_url="http://client") as client:
+            await login(browser, client)
+            for phase in samples.values():
+                phase.clear()
+            started = time.perf_counter()
+            await asyncio.gather(*(login(browser, client) for _ in range(logins)))
+            elapsed = time.perf_counter() - started
+    return {**{phase: latency_summary(phase_samples) for phase, phase_samples in samples.items()},
+            "logins_per_sec": logins / elapsed}
+
+
+def run(logins: int = 500, concurrency: int = 20):
+    idp = StubIdentityProvider()
+    use_stub_settings(TENANT_ID)
+    logging.disable(logging.CRITICAL)
+    try:
+        with serve_in_thread(idp.app) as authority_host:
+            os.environ["AUTHORITY_HOST"] = authority_host
+            from client.main import create_app
+            app = create_app()
+
+            results = {"logins": logins, "concurrency": concurrency,
+                       **asyncio.run(_logins(app, logins, concurrency))}
+            results["idp_requests"] = dict(idp.requests)
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
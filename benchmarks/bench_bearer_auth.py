@@ -0,0 +1,82 @@
+# benchmarks/bench_bearer_auth.py
+"""
+Cost of bearer-token authentication on the server app: cold requests each carry a token that
+has never been seen (full RS256 verification), warm requests reuse one token (claims cache hit).
+
+    python -m benchmarks.bench_bearer_auth [requests] [concurrency]
+"""
+
+import asyncio
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import emit, latency_summary, serve_in_thread, use_stub_settings
+from benchmarks.stub_idp import StubIdentityProvider
+
+
+async def _verify_loop(verifier, tokens):
+    started = time.perf_counter()
+    for token in tokens:
+        await verifier.verify(token)
+    return len(tokens) / (time.perf_counter() - started)
+
+
+async def _request_loop(client: httpx.AsyncClient, tokens, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def request(token):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get("/api/heroes/", headers={"Authorization": f"Bearer {token}"})
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(token) for token in tokens))
+    elapsed = time.perf_counter() - started
+    return {"requests_per_sec": len(tokens) / elapsed, **latency_summary(latencies)}
+
+
+async def _run(requests: int, concurrency: int):
+    idp = StubIdentityProvider()
+    use_stub_settings(idp.tenant_id)
+
+    from server.main import create_app
+    from server.services import auth_service
+    from server.services.claims_cache import ClaimsCache
+    from server.config import get_oauth_settings
+
+    app = create_app()
+    audience = auth_service.token_audiences(get_oauth_settings())[0]
+    cold_tokens = [idp.sign(audience, scp="Heroes.Read") for _ in range(requests)]
+    warm_tokens = [idp.sign(audience, scp="Heroes.Read")] * requests
+    results = {"requests": requests, "concurrency": concurrency}
+
+    with serve_in_thread(idp.app) as base_url:
+        verifier = auth_service.get_token_verifier()
+        verifier.jwks_cache.jwks_url = f"{base_url}/{idp.tenant_id}/discovery/v2.0/keys"
+        verifier.claims_cache = ClaimsCache(requests * 2)
+
+        results["verify_cold_per_sec"] = await _verify_loop(verifier, cold_tokens)
+        results["verify_warm_per_sec"] = await _verify_loop(verifier, warm_tokens)
+        verifier.claims_cache.clear()
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://server") as client:
+            results["asgi_cold"] = await _request_loop(client, cold_tokens, concurrency)
+            results["asgi_warm"] = await _request_loop(client, warm_tokens, concurrency)
+
+        await verifier.jwks_cache.stop()
+
+    return results
+
+
+def run(requests: int = 2000, concurrency: int = 50):
+    return asyncio.run(_run(requests, concurrency))
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
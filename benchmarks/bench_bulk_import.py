@@ -0,0 +1,83 @@
+# benchmarks/bench_bulk_import.py
+"""
+Importing a roster through the server app: one POST /api/heroes/ per hero versus a single
+POST /api/heroes/bulk carrying a JSON array or an NDJSON stream, followed by removing the
+roster with one DELETE per hero versus a single DELETE /api/heroes/bulk.
+
+Requests go through httpx's in-process ASGI transport, so the figures exclude network
+round-trips, which would only widen the gap in favour of the bulk endpoints.
+
+    python -m benchmarks.bench_bulk_import [heroes]
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import emit, use_stub_settings
+from benchmarks.payloads import hero_payloads
+from benchmarks.stub_idp import TENANT_ID
+
+
+async def _one_by_one(client: httpx.AsyncClient, payloads):
+    started = time.perf_counter()
+    hero_ids = []
+    for payload in payloads:
+        response = await client.post("/api/heroes/", json=payload)
+        response.raise_for_status()
+        hero_ids.append(response.json()["id"])
+    created = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for hero_id in hero_ids:
+        (await client.delete(f"/api/heroes/{hero_id}")).raise_for_status()
+    return {"requests": len(payloads) * 2, "create_s": created, "delete_s": time.perf_counter() - started}
+
+
+async def _bulk(client: httpx.AsyncClient, body: bytes, content_type: str):
+    started = time.perf_counter()
+    response = await client.post("/api/heroes/bulk", content=body, headers={"content-type": content_type})
+    response.raise_for_status()
+    hero_ids = [result["id"] for result in response.json()["results"]]
+    created = time.perf_counter() - started
+
+    started = time.perf_counter()
+    response = await client.request("DELETE", "/api/heroes/bulk", json=hero_ids)
+    response.raise_for_status()
+    assert response.json()["deleted"] == len(hero_ids)
+    return {"requests": 2, "create_s": created, "delete_s": time.perf_counter() - started}
+
+
+async def _run(app, payloads):
+    ndjson = "".join(json.dumps(payload) + "\n" for payload in payloads).encode()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        results = {"one_by_one": await _one_by_one(client, payloads),
+                   "bulk_json": await _bulk(client, json.dumps(payloads).encode(), "application/json"),
+                   "bulk_ndjson": await _bulk(client, ndjson, "application/x-ndjson")}
+    for mode in results.values():
+        mode["heroes_per_sec"] = len(payloads) / mode["create_s"]
+    return results
+
+
+def run(heroes: int = 10_000):
+    use_stub_settings(TENANT_ID)
+    from server.main import create_app
+    from server.services.auth_service import get_current_claims
+
+    app = create_app()
+    logging.disable(logging.INFO)
+    app.dependency_overrides[get_current_claims] = lambda: {"roles": ["Admin"]}
+    try:
+        return {"heroes": heroes, **asyncio.run(_run(app, hero_payloads(heroes)))}
+    finally:
+        app.dependency_overrides.clear()
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
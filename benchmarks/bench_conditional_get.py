@@ -0,0 +1,74 @@
+# benchmarks/bench_conditional_get.py
+"""
+Dashboard-style polling of the server's hero read endpoints: unconditional GETs against GETs
+revalidated with If-None-Match, for the full roster and a single hero, and the cost of the
+first full listing after one hero was added to an otherwise unchanged roster.
+
+    python -m benchmarks.bench_conditional_get [heroes] [polls]
+"""
+
+import asyncio
+import logging
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import emit, latency_summary, use_stub_settings
+from benchmarks.payloads import hero_payloads, make_roster
+from benchmarks.stub_idp import TENANT_ID
+
+
+async def _poll(client: httpx.AsyncClient, path: str, polls: int, conditional: bool):
+    samples, received = [], 0
+    etag = (await client.get(path)).headers["etag"]
+    for _ in range(polls):
+        started = time.perf_counter()
+        response = await client.get(path, headers={"If-None-Match": etag} if conditional else {})
+        samples.append(time.perf_counter() - started)
+        received += len(response.content)
+    return {**latency_summary(samples), "bytes_per_poll": received / polls, "status": response.status_code}
+
+
+async def _run(app, hero_service, polls: int):
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://server") as client:
+        hero_id = next(iter(hero_service.backend.store)).id
+        for name, path in (("list", "/api/heroes/"), ("hero", f"/api/heroes/{hero_id}")):
+            results[name] = {mode: await _poll(client, path, polls, mode == "if_none_match")
+                             for mode in ("unconditional", "if_none_match")}
+
+        # One new hero: only it is encoded, the rest of the array is spliced from cached bytes
+        (await client.post("/api/heroes/", json=hero_payloads(1)[0])).raise_for_status()
+        started = time.perf_counter()
+        (await client.get("/api/heroes/")).raise_for_status()
+        results["list_after_one_create_ms"] = (time.perf_counter() - started) * 1000
+
+        hero_service._encoded.clear()
+        (await client.post("/api/heroes/", json=hero_payloads(1)[0])).raise_for_status()
+        started = time.perf_counter()
+        (await client.get("/api/heroes/")).raise_for_status()
+        results["list_after_one_create_cold_cache_ms"] = (time.perf_counter() - started) * 1000
+    return results
+
+
+def run(heroes: int = 10_000, polls: int = 50):
+    use_stub_settings(TENANT_ID)
+    from server.main import create_app
+    from server.services.auth_service import get_current_claims
+
+    app = create_app()
+    hero_service = app.state.hero_service
+    logging.disable(logging.INFO)
+    app.dependency_overrides[get_current_claims] = lambda: {"roles": ["Admin"]}
+    try:
+        asyncio.run(hero_service.create_heroes(make_roster(heroes)))
+        return {"heroes": heroes, "polls": polls, **asyncio.run(_run(app, hero_service, polls))}
+    finally:
+        app.dependency_overrides.clear()
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
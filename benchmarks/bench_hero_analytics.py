@@ -0,0 +1,92 @@
+# benchmarks/bench_hero_analytics.py
+"""
+Aggregates over the roster from HeroAnalytics' columns: the cost of keeping the columns
+current on create and delete, and the latency of group-bys, percentiles and distributions
+over a large roster. For comparison, the client-side route the stats endpoints replace:
+decoding the full `GET /api/heroes/` listing and grouping it in Python, on a smaller roster.
+
+    python -m benchmarks.bench_hero_analytics [heroes] [client_side_heroes] [repeats]
+"""
+
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.common import emit
+from benchmarks.payloads import make_roster
+
+TEMPLATES = 1_000
+REMOVALS = 10_000
+
+
+def _median_ms(call, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def _client_side_level_by_class(body: bytes) -> dict:
+    by_class = defaultdict(list)
+    for hero in json.loads(body):
+        by_class[hero["class_"]].append(hero["level"])
+    return {class_: {"mean": statistics.fmean(levels), "quartiles": statistics.quantiles(levels, n=4)}
+            for class_, levels in by_class.items()}
+
+
+def run(heroes: int = 1_000_000, client_side_heroes: int = 100_000, repeats: int = 20):
+    from server.services.hero_analytics import HeroAnalytics
+    from server.services.hero_service import HeroService
+
+    logging.disable(logging.INFO)
+    try:
+        # Heroes are added from a pool of templates under fresh ids; the columns copy the
+        # fields, so the hero objects need not stay alive
+        templates = make_roster(TEMPLATES)
+        analytics = HeroAnalytics()
+        started = time.perf_counter()
+        for number in range(heroes):
+            hero = templates[number % TEMPLATES]
+            hero.id = f"hero-{number}"
+            analytics.add(hero)
+        add_us = (time.perf_counter() - started) / heroes * 1e6
+
+        queries = {
+            "level_by_class": lambda: analytics.summary("level", "class_"),
+            "ability_percentiles_by_race": lambda: [analytics.summary(ability, "race", (10, 50, 90))
+                                                    for ability in ("strength", "dexterity", "constitution",
+                                                                    "intelligence", "wisdom", "charisma")],
+            "hit_points_distribution": lambda: analytics.distribution("hit_points", 10),
+            "armor_class_distribution_by_alignment": lambda: analytics.distribution("armor_class", 1, "alignment"),
+        }
+        results = {"heroes": heroes, "add_us": add_us,
+                   "queries_ms": {name: _median_ms(query, repeats) for name, query in queries.items()}}
+
+        started = time.perf_counter()
+        for number in range(0, REMOVALS * 7, 7):
+            analytics.remove(f"hero-{number}")
+        results["remove_us"] = (time.perf_counter() - started) / REMOVALS * 1e6
+
+        service = HeroService()
+        asyncio.run(service.create_heroes(make_roster(client_side_heroes)))
+        body, _ = asyncio.run(service.list_heroes_json())
+        # Loads the roster into the service's analytics columns
+        asyncio.run(service.hero_stats("level"))
+        results["level_by_class_client_side"] = {
+            "heroes": client_side_heroes,
+            "ms": _median_ms(lambda: _client_side_level_by_class(body), max(1, repeats // 5)),
+            "analytics_ms": _median_ms(lambda: service.analytics.summary("level", "class_"), repeats),
+        }
+        return results
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,104 @@
+# benchmarks/bench_hero_concurrency.py
+"""
+p50/p99 latency of a 95/5 read/write mix from 1k concurrent tasks, under the previous single
+asyncio.Lock and under AsyncRWLock.
+
+Two scenarios are measured: critical sections that await storage I/O while holding the lock
+(simulated with asyncio.sleep, as a persistent backend would), and the in-memory HeroService,
+whose critical sections never suspend.
+
+    python -m benchmarks.bench_hero_concurrency [tasks] [ops_per_task]
+"""
+
+import asyncio
+import logging
+import random
+import sys
+import time
+
+from benchmarks.common import emit, latency_summary
+from benchmarks.payloads import make_roster
+from server.services.hero_service import HeroService
+from server.services.rw_lock import AsyncRWLock
+
+
+class ExclusiveLock:
+    """The previous model: one asyncio.Lock shared by reads and writes alike."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+
+    def read(self):
+        return self._lock
+
+    def write(self):
+        return self._lock
+
+
+async def _mix(tasks: int, ops_per_task: int, write_ratio: float, read_op, write_op):
+    reads, writes = [], []
+    rng = random.Random(11)
+
+    async def worker():
+        for _ in range(ops_per_task):
+            is_write = rng.random() < write_ratio
+            started = time.perf_counter()
+            await (write_op() if is_write else read_op())
+            (writes if is_write else reads).append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(tasks)))
+    elapsed = time.perf_counter() - started
+    return {"ops_per_sec": (len(reads) + len(writes)) / elapsed,
+            "read": latency_summary(reads), "write": latency_summary(writes)}
+
+
+async def _storage_io(lock, tasks, ops_per_task, write_ratio, io_delay):
+    async def read_op():
+        async with lock.read():
+            await asyncio.sleep(io_delay)
+
+    async def write_op():
+        async with lock.write():
+            await asyncio.sleep(io_delay)
+
+    return await _mix(tasks, ops_per_task, write_ratio, read_op, write_op)
+
+
+async def _in_memory_service(lock, tasks, ops_per_task, write_ratio, roster):
+    service = HeroService()
+    service.lock = lock
+    for hero in roster:
+        await service.create_hero(hero.model_copy())
+    hero_ids = [hero.id for hero in service.backend.store]
+    templates = roster[:100]
+    rng = random.Random(5)
+
+    async def read_op():
+        await service.get_hero(rng.choice(hero_ids))
+
+    async def write_op():
+        await service.create_hero(rng.choice(templates).model_copy())
+
+    return await _mix(tasks, ops_per_task, write_ratio, read_op, write_op)
+
+
+def run(tasks: int = 1000, ops_per_task: int = 20, write_ratio: float = 0.05, io_delay: float = 0.0005,
+        heroes: int = 10_000):
+    logging.disable(logging.INFO)
+    roster = make_roster(heroes)
+    results = {"tasks": tasks, "ops_per_task": ops_per_task, "write_ratio": write_ratio, "io_delay_ms": io_delay * 1000}
+    try:
+        for name, lock_factory in (("asyncio_lock", ExclusiveLock), ("rw_lock", AsyncRWLock)):
+            results[name] = {
+                "storage_io": asyncio.run(_storage_io(lock_factory(), tasks, ops_per_task, write_ratio, io_delay)),
+                "in_memory_service": asyncio.run(
+                    _in_memory_service(lock_factory(), tasks, ops_per_task, write_ratio, roster)),
+            }
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,189 @@
+# benchmarks/bench_hero_events.py
+"""
+Cost of the hero change feed:
+
+- fan_out: `subscribers` in-process subscribers, iterated as the SSE route does, while heroes
+  are created one at a time: create latency next to the same creates with no subscribers,
+  publish-to-receipt latency of every chunk, and the CPU time the fan-out adds per delivery.
+  A tenth of the subscribers stop reading after their first event, as clients whose socket
+  buffers have filled up would; they must not slow the creates, and are sent a resync event
+  once they read again
+- http: `http_subscribers` clients streaming GET /api/heroes/events from a local server while
+  `events` heroes are created through the API, with the time from sending a create request
+  to each client receiving its event
+- bytes_per_change: what a client downloads per change from the feed, against re-polling
+  GET /api/heroes/ with a roster of `roster` heroes
+
+    python -m benchmarks.bench_hero_events [subscribers] [events] [http_subscribers] [roster]
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import emit, latency_summary, serve_in_thread, use_stub_settings
+from benchmarks.payloads import hero_payloads, make_heroes, make_roster
+from benchmarks.stub_idp import TENANT_ID, StubIdentityProvider
+
+
+def _last_seq(chunk: bytes) -> Optional[int]:
+    """Sequence number of the last event in a chunk of SSE frames."""
+    start = chunk.rfind(b"id: ")
+    if start < 0:
+        return None
+    return int(chunk[chunk.index(b"-", start) + 1:chunk.index(b"\n", start)])
+
+
+async def _subscriber(hub, latest: List[int], slot: int, published: Dict[int, float], delays: List[float],
+                      stalled: Optional[asyncio.Future]) -> Optional[bytes]:
+    """
+    Read the feed until cancelled. A stalled subscriber stops reading after its first chunk until
+    `stalled` completes, then returns the next chunk it reads.
+    """
+    stream = hub.subscribe()
+    try:
+        async for chunk in stream:
+            if stalled is not None:
+                await stalled
+                return await stream.__anext__()
+            received = time.perf_counter()
+            seq = _last_seq(chunk)
+            if seq is not None:
+                delays.append(received - published[seq])
+                latest[slot] = seq
+    finally:
+        await stream.aclose()
+
+
+async def _creates(service, events: int, published: Dict[int, float]) -> List[float]:
+    samples = []
+    for hero in make_heroes(events):
+        started = time.perf_counter()
+        await service.create_hero(hero)
+        samples.append(time.perf_counter() - started)
+        published[service.events.seq] = started
+        # Let subscribers run between creates, as requests arriving over the network would
+        await asyncio.sleep(0)
+    return samples
+
+
+async def _fan_out(subscribers: int, events: int) -> dict:
+    from server.services.hero_events import HeroEventHub
+    from server.services.hero_service import HeroService
+
+    # Baseline: the same creates with nobody subscribed
+    cpu_started = time.process_time()
+    baseline = await _creates(HeroService(events=HeroEventHub(keepalive=None)), events, {})
+    baseline_cpu = time.process_time() - cpu_started
+
+    hub = HeroEventHub(max_backlog=events // 2, keepalive=None)
+    service = HeroService(events=hub)
+    stalled_count = subscribers // 10
+    readers = subscribers - stalled_count
+    stalled = asyncio.get_running_loop().create_future()
+    published: Dict[int, float] = {}
+    delays: List[float] = []
+    latest = [0] * subscribers
+    tasks = [asyncio.ensure_future(_subscriber(hub, latest, slot, published, delays,
+                                               stalled if slot < stalled_count else None))
+             for slot in range(subscribers)]
+    await asyncio.sleep(0)
+
+    cpu_started = time.process_time()
+    samples = await _creates(service, events, published)
+    while sum(1 for seq in latest[stalled_count:] if seq == hub.seq) < readers:
+        await asyncio.sleep(0.001)
+    cpu = time.process_time() - cpu_started
+
+    # The stalled subscribers read again, far behind by now
+    stalled.set_result(None)
+    resumed = await asyncio.gather(*tasks[:stalled_count])
+    for task in tasks[stalled_count:]:
+        task.cancel()
+    await asyncio.gather(*tasks[stalled_count:], return_exceptions=True)
+
+    return {"creates": latency_summary(samples), "creates_without_subscribers": latency_summary(baseline),
+            "delivery": latency_summary(delays),
+            "cpu_us_per_delivery": max(0.0, cpu - baseline_cpu) / (events * readers) * 1e6,
+            "stalled_subscribers": stalled_count,
+            "stalled_resynced": sum(1 for chunk in resumed if chunk and b"event: resync" in chunk)}
+
+
+async def _http_subscriber(client: httpx.AsyncClient, headers: dict, published: Dict[int, float],
+                           delays: List[float], events: int):
+    async with client.stream("GET", "/api/heroes/events", headers=headers) as response:
+        response.raise_for_status()
+        # Read line by line, as chunks from the network may end mid-frame
+        async for line in response.aiter_lines():
+            if line.startswith("id: "):
+                seq = int(line.partition("-")[2])
+                delays.append(time.perf_counter() - published[seq])
+                if seq >= events:
+                    return
+
+
+async def _http(hero_service, base_url: str, token: str, subscribers: int, events: int) -> dict:
+    headers = {"Authorization": f"Bearer {token}"}
+    published: Dict[int, float] = {}
+    delays: List[float] = []
+    limits = httpx.Limits(max_connections=subscribers + 1)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        first = hero_service.events.seq
+        streams = [asyncio.ensure_future(_http_subscriber(client, headers, published, delays, first + events))
+                   for _ in range(subscribers)]
+        while hero_service.events.subscribers < subscribers:
+            await asyncio.sleep(0.01)
+
+        for number, payload in enumerate(hero_payloads(events), start=first + 1):
+            published[number] = time.perf_counter()
+            (await client.post("/api/heroes/", json=payload, headers=headers)).raise_for_status()
+        await asyncio.gather(*streams)
+    return {"subscribers": subscribers, "events": events, "request_to_receipt": latency_summary(delays)}
+
+
+async def _bytes_per_change(roster: int) -> dict:
+    from server.services.hero_service import HeroService
+
+    service = HeroService()
+    await service.create_heroes(make_roster(roster))
+    before = f"{service.events.epoch.decode()}-{service.events.seq}"
+    for hero in make_heroes(100):
+        await service.create_hero(hero)
+    # Resuming from before the creates replays all of their events in one chunk
+    stream = service.events.subscribe(before)
+    replayed = await stream.__anext__()
+    await stream.aclose()
+    body, _ = await service.list_heroes_json()
+    return {"roster": roster, "event_bytes": len(replayed) / 100, "poll_bytes": len(body)}
+
+
+def run(subscribers: int = 1_000, events: int = 1_000, http_subscribers: int = 100, roster: int = 10_000):
+    idp = StubIdentityProvider()
+    use_stub_settings(TENANT_ID)
+    logging.disable(logging.CRITICAL)
+    try:
+        results = {"subscribers": subscribers, "events": events,
+                   "fan_out": asyncio.run(_fan_out(subscribers, events)),
+                   "bytes_per_change": asyncio.run(_bytes_per_change(roster))}
+
+        with serve_in_thread(idp.app) as authority_host:
+            from server.config import get_oauth_settings
+            from server.main import create_app
+            from server.services.auth_service import get_token_verifier, token_audiences
+            app = create_app()
+            get_token_verifier().jwks_cache.jwks_url = f"{authority_host}/{idp.tenant_id}/discovery/v2.0/keys"
+            token = idp.sign(token_audiences(get_oauth_settings())[0], roles=["Admin"])
+            with serve_in_thread(app) as base_url:
+                results["http"] = asyncio.run(_http(app.state.hero_service, base_url, token, http_subscribers,
+                                                     min(events, 200)))
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,147 @@
+# benchmarks/bench_hero_journal.py
+"""
+Durability costs of the journaled hero backend:
+
+- recovery: startup time with `heroes` heroes in the journal only, replayed record by record,
+  and in a snapshot, mapped and rebuilt without validation; next to the time Pydantic takes
+  to validate the same heroes from JSON, measured on a sample
+- writes: creates per second from `concurrency` concurrent writers through HeroService in each
+  fsync mode, against the in-memory backend, with the number of fsyncs they took
+
+Files are written to a temporary directory under the working directory, so that fsyncs reach
+a real disk rather than a memory-backed /tmp.
+
+    python -m benchmarks.bench_hero_journal [heroes] [writes] [concurrency]
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+from benchmarks.common import emit, latency_summary
+from benchmarks.payloads import make_heroes, make_roster
+
+CHUNK = 10_000
+VALIDATION_SAMPLE = 50_000
+
+
+def _directory_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+async def _timed_open(directory: str):
+    from server.services.hero_journal import JournaledHeroBackend
+
+    backend = JournaledHeroBackend(directory, fsync="never", snapshot_on_close=False)
+    started = time.perf_counter()
+    await backend.open()
+    return backend, time.perf_counter() - started
+
+
+async def _recovery(directory: str, heroes: int) -> dict:
+    from server.services.hero_journal import JournaledHeroBackend
+
+    # Journal only: one record per chunk, no snapshot
+    backend = JournaledHeroBackend(directory, fsync="never", snapshot_every=heroes + 1, snapshot_on_close=False)
+    await backend.open()
+    templates = make_heroes(1000)
+    for start in range(0, heroes, CHUNK):
+        await backend.add_many([templates[index % len(templates)].model_copy(
+            update={"id": str(index), "name": f"Hero {index}"}) for index in range(start, min(start + CHUNK, heroes))])
+    await backend.close()
+    journal_bytes = _directory_size(directory)
+
+    backend, journal_seconds = await _timed_open(directory)
+    recovered = await backend.count()
+    # Closing waits for the snapshot to be written
+    started = time.perf_counter()
+    await backend.snapshot()
+    await backend.close()
+    snapshot_write_seconds = time.perf_counter() - started
+    del backend
+
+    backend, snapshot_seconds = await _timed_open(directory)
+    if await backend.count() != recovered:
+        raise RuntimeError("The snapshot did not restore every hero")
+    snapshot_bytes = _directory_size(directory)
+    await backend.close()
+    return {"heroes": recovered,
+            "journal_replay": {"seconds": journal_seconds, "heroes_per_sec": recovered / journal_seconds,
+                               "bytes": journal_bytes},
+            "snapshot_load": {"seconds": snapshot_seconds, "heroes_per_sec": recovered / snapshot_seconds,
+                              "bytes": snapshot_bytes, "write_seconds": snapshot_write_seconds}}
+
+
+def _validation_rate() -> float:
+    """Heroes per second validated from JSON, as a store reloading a JSON dump would."""
+    from pydantic import TypeAdapter
+
+    from server.models.dnd_hero import DnDHero
+
+    adapter = TypeAdapter(List[DnDHero])
+    body = adapter.dump_json(make_roster(VALIDATION_SAMPLE))
+    started = time.perf_counter()
+    adapter.validate_json(body)
+    return VALIDATION_SAMPLE / (time.perf_counter() - started)
+
+
+async def _writes(backend, writes: int, concurrency: int) -> dict:
+    from server.services.hero_journal import HERO_JOURNAL_SYNC_SECONDS
+    from server.services.hero_service import HeroService
+
+    service = HeroService(backend)
+    await service.open()
+    heroes = make_roster(writes)
+    samples = []
+    sync_counts = HERO_JOURNAL_SYNC_SECONDS.labels(getattr(backend, "fsync", "memory")).counts
+    syncs_before = sum(sync_counts)
+
+    async def writer(batch):
+        for hero in batch:
+            started = time.perf_counter()
+            await service.create_hero(hero)
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(heroes[index::concurrency]) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    syncs = sum(sync_counts) - syncs_before
+    await service.close()
+    return {"writes_per_sec": writes / elapsed, **latency_summary(samples), "syncs": syncs}
+
+
+async def _run(heroes: int, writes: int, concurrency: int) -> dict:
+    from server.services.hero_backend import InMemoryHeroBackend
+    from server.services.hero_journal import JournaledHeroBackend
+
+    results = {}
+    with tempfile.TemporaryDirectory(dir=".") as directory:
+        results["recovery"] = await _recovery(directory, heroes)
+
+    validation_rate = _validation_rate()
+    results["recovery"]["pydantic_validate_json"] = {"heroes_per_sec": validation_rate,
+                                                     "seconds_estimate": heroes / validation_rate}
+
+    results["writes"] = {"memory": await _writes(InMemoryHeroBackend(), writes, concurrency)}
+    for mode in ("never", "batch", "always"):
+        with tempfile.TemporaryDirectory(dir=".") as directory:
+            backend = JournaledHeroBackend(directory, fsync=mode, snapshot_on_close=False)
+            results["writes"][mode] = await _writes(backend, writes, concurrency)
+    return results
+
+
+def run(heroes: int = 1_000_000, writes: int = 2_000, concurrency: int = 50):
+    logging.disable(logging.CRITICAL)
+    try:
+        return {"heroes": heroes, "writes": writes, "concurrency": concurrency,
+                **asyncio.run(_run(heroes, writes, concurrency))}
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
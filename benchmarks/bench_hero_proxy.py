@@ -0,0 +1,118 @@
+# benchmarks/bench_hero_proxy.py
+"""
+The client's hero routes forwarding to the server app, which runs in the same process as a
+local stand-in for the deployed API, with a stub identity provider behind both.
+
+Measures concurrent identical GETs through the proxy, where coalescing sends one upstream
+request per burst, against the same number of direct upstream requests; and a dashboard-like
+polling loop, where cached responses are revalidated with If-None-Match.
+
+    python -m benchmarks.bench_hero_proxy [heroes] [concurrency]
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.common import client_login_params, emit, latency_summary, serve_in_thread, use_stub_settings
+from benchmarks.payloads import make_roster
+from benchmarks.stub_idp import StubIdentityProvider, TENANT_ID
+
+
+async def _populate(hero_service, heroes):
+    await hero_service.create_heroes(heroes)
+
+
+async def _burst(call, concurrency: int):
+    samples = []
+
+    async def timed():
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed() for _ in range(concurrency)))
+    return {**latency_summary(samples), "burst_ms": (time.perf_counter() - started) * 1000}
+
+
+async def _run(app, idp: StubIdentityProvider, concurrency: int, polls: int):
+    from client.routers.heroes import hero_api
+    from client.services.session_service import session_service
+
+    upstream = Counter()
+
+    async def count_request(request: httpx.Request):
+        if request.url.path.startswith("/api/"):
+            upstream["requests"] += 1
+
+    async def count_response(response: httpx.Response):
+        if response.request.url.path.startswith("/api/"):
+            upstream["bytes"] += int(response.headers.get("content-length", 0))
+            upstream[f"status_{response.status_code}"] += 1
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        http_client = app.state.http_client
+        http_client.event_hooks = {"request": [count_request], "response": [count_response]}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://client") as client:
+            (await client.get("/auth/callback", params=await client_login_params(client, idp))).raise_for_status()
+            session_id = session_service.unsign(client.cookies.get(session_service.cookie_name))
+            session = await session_service.store.get(session_id)
+
+            async def via_proxy():
+                (await client.get("/api/heroes/")).raise_for_status()
+
+            async def direct():
+                response = await http_client.get(f"{hero_api.base_url}/api/heroes/",
+                                                 headers={"Authorization": f"Bearer {session.access_token}"})
+                response.raise_for_status()
+
+            for mode, call in (("direct_upstream", direct), ("proxy_coalesced", via_proxy)):
+                hero_api.clear()
+                upstream.clear()
+                results[mode] = {**await _burst(call, concurrency), "upstream": dict(upstream)}
+
+            hero_api.clear()
+            upstream.clear()
+            samples = []
+            for _ in range(polls):
+                started = time.perf_counter()
+                await via_proxy()
+                samples.append(time.perf_counter() - started)
+            results["proxy_polling"] = {**latency_summary(samples), "upstream": dict(upstream)}
+    return results
+
+
+def run(heroes: int = 200, concurrency: int = 100, polls: int = 50):
+    idp = StubIdentityProvider()
+    use_stub_settings(TENANT_ID)
+    logging.disable(logging.WARNING)
+    try:
+        with serve_in_thread(idp.app) as authority_host:
+            from server.main import create_app as create_server_app
+            from server.services.auth_service import get_token_verifier
+            server_app = create_server_app()
+            get_token_verifier().jwks_cache.jwks_url = f"{authority_host}/{idp.tenant_id}/discovery/v2.0/keys"
+            asyncio.run(_populate(server_app.state.hero_service, make_roster(heroes)))
+
+            with serve_in_thread(server_app) as hero_api_base_url:
+                os.environ["AUTHORITY_HOST"] = authority_host
+                os.environ["HERO_API_BASE_URL"] = hero_api_base_url
+                from client.main import create_app
+                app = create_app()
+
+                results = asyncio.run(_run(app, idp, concurrency, polls))
+    finally:
+        logging.disable(logging.NOTSET)
+    return {"heroes": heroes, "concurrency": concurrency, "polls": polls, **results}
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,100 @@
+# benchmarks/bench_hero_serialization.py
+"""
+Requests per second for the server's hero list, get and search endpoints when responses go
+through FastAPI's response_model (the models are validated again and encoded via
+jsonable_encoder) against the encoded bytes served from HeroService's cache. The list is also
+measured with the encoding caches cleared before every request.
+
+    python -m benchmarks.bench_hero_serialization [heroes] [requests]
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from typing import Annotated, List
+
+import httpx
+from fastapi import APIRouter, Depends, Query
+
+from benchmarks.common import emit, use_stub_settings
+from benchmarks.payloads import make_roster
+from benchmarks.stub_idp import TENANT_ID
+
+BASELINE_PREFIX = "/response-model"
+
+
+def _response_model_router(hero_service) -> APIRouter:
+    """The hero read routes as they were before responses were served as pre-encoded bytes."""
+    from server.models.dnd_hero import DnDHero
+    from server.models.hero_query import HeroQuery
+    from server.services.auth_service import require_scopes
+
+    router = APIRouter(dependencies=[Depends(require_scopes("Heroes.Read"))])
+
+    @router.get("/heroes/search", response_model=List[DnDHero])
+    async def search_heroes(query: Annotated[HeroQuery, Query()]):
+        return await hero_service.query_heroes(query)
+
+    @router.get("/heroes/{hero_id}", response_model=DnDHero)
+    async def read_hero(hero_id: str):
+        return await hero_service.get_hero(hero_id)
+
+    @router.get("/heroes/", response_model=List[DnDHero])
+    async def read_heroes():
+        return await hero_service.list_heroes()
+
+    return router
+
+
+async def _throughput(app, path: str, requests: int, before_each=None) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://server") as client:
+        body = (await client.get(path)).raise_for_status().content
+        started = time.perf_counter()
+        for _ in range(requests):
+            if before_each:
+                before_each()
+            (await client.get(path)).raise_for_status()
+        elapsed = time.perf_counter() - started
+    return {"requests_per_s": requests / elapsed, "bytes": len(body)}
+
+
+async def _run(app, hero_service, requests: int):
+    hero_id = next(iter(hero_service.backend.store)).id
+    paths = {"list": "/api/heroes/", "get": f"/api/heroes/{hero_id}",
+             "search": "/api/heroes/search?race=Elf&min_level=10"}
+
+    def clear_caches():
+        hero_service._encoded.clear()
+        hero_service._list_body = None
+
+    results = {}
+    for name, path in paths.items():
+        results[name] = {"response_model": await _throughput(app, BASELINE_PREFIX + path, requests),
+                         "encoded": await _throughput(app, path, requests)}
+    results["list"]["encoded_cold_cache"] = await _throughput(app, paths["list"], requests, clear_caches)
+    return results
+
+
+def run(heroes: int = 1_000, requests: int = 200):
+    use_stub_settings(TENANT_ID)
+    from server.main import create_app
+    from server.services.auth_service import get_current_claims
+
+    app = create_app()
+    hero_service = app.state.hero_service
+    logging.disable(logging.INFO)
+    app.dependency_overrides[get_current_claims] = lambda: {"roles": ["Admin"]}
+    try:
+        asyncio.run(hero_service.create_heroes(make_roster(heroes)))
+        # Same app, auth dependency and service, so only the response path differs
+        app.include_router(_response_model_router(hero_service), prefix=BASELINE_PREFIX + "/api")
+        return {"heroes": heroes, "requests": requests, **asyncio.run(_run(app, hero_service, requests))}
+    finally:
+        app.dependency_overrides.clear()
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
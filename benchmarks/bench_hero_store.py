@@ -0,0 +1,86 @@
+# benchmarks/bench_hero_store.py
+"""
+Micro-benchmark of HeroService create, get, delete and list at increasing roster sizes, with the
+previous list-scan lookups measured alongside for comparison.
+
+    python -m benchmarks.bench_hero_store [sizes...]
+"""
+
+import asyncio
+import logging
+import random
+import sys
+import time
+
+from benchmarks.common import emit
+from benchmarks.payloads import make_roster
+from server.services.hero_service import HeroService
+
+
+def _per_op_us(started: float, ops: int) -> float:
+    return (time.perf_counter() - started) / ops * 1e6
+
+
+def _bench_list_scan(heroes, ids, ops: int):
+    """The previous storage: a list searched with next(...) and shrunk with list.remove."""
+    heroes_db = list(heroes)
+    started = time.perf_counter()
+    for hero_id in ids[:ops]:
+        next((h for h in heroes_db if h.id == hero_id), None)
+    get_us = _per_op_us(started, ops)
+
+    started = time.perf_counter()
+    for hero_id in ids[:ops]:
+        hero = next((h for h in heroes_db if h.id == hero_id), None)
+        heroes_db.remove(hero)
+    return {"get_us": get_us, "delete_us": _per_op_us(started, ops)}
+
+
+async def _bench_service(heroes, ids, ops: int):
+    service = HeroService()
+    started = time.perf_counter()
+    for hero in heroes:
+        await service.create_hero(hero)
+    create_us = _per_op_us(started, len(heroes))
+
+    # create_hero assigns fresh ids, so look heroes up by the ids the service handed out
+    hero_ids = [hero.id for hero in heroes]
+    sample = [hero_ids[int(hero_id)] for hero_id in ids[:ops]]
+
+    started = time.perf_counter()
+    for hero_id in sample:
+        await service.get_hero(hero_id)
+    get_us = _per_op_us(started, ops)
+
+    started = time.perf_counter()
+    await service.list_heroes()
+    list_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for hero_id in sample:
+        await service.delete_hero(hero_id)
+    delete_us = _per_op_us(started, ops)
+
+    return {"create_us": create_us, "get_us": get_us, "delete_us": delete_us, "list_ms": list_ms}
+
+
+def run(sizes=(1_000, 100_000, 1_000_000), ops: int = 10_000, scan_ops: int = 50):
+    # Per-operation log lines would dominate the timings of the storage engine itself
+    logging.disable(logging.INFO)
+    results = {}
+    try:
+        for size in sizes:
+            heroes = make_roster(size)
+            ids = [str(i) for i in random.Random(7).sample(range(size), min(size, ops))]
+            results[str(size)] = {
+                "list_scan": _bench_list_scan(heroes, ids, min(scan_ops, len(ids))),
+                "hero_store": asyncio.run(_bench_service(heroes, ids, len(ids))),
+            }
+            del heroes
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == "__main__":
+    emit(run(tuple(int(size) for size in sys.argv[1:]) or (1_000, 100_000, 1_000_000)))
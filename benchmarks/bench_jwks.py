@@ -0,0 +1,77 @@
+# benchmarks/bench_jwks.py
+"""
+Verifications/sec of ID tokens against a local stub JWKS server, fetching the key set on every
+verification (the previous behaviour of verify_id_token) versus the cached JWKSCache.
+
+    python -m benchmarks.bench_jwks [verifications] [concurrency]
+"""
+
+import asyncio
+import sys
+import time
+
+import httpx
+import jwt
+
+from benchmarks.common import emit, serve_in_thread
+from benchmarks.stub_idp import StubIdentityProvider
+from client.services.jwks_cache import JWKSCache
+
+AUDIENCE = "bench-client-id"
+
+
+async def _verify_uncached(token: str, jwks_url: str):
+    async with httpx.AsyncClient() as client:
+        response = await client.get(jwks_url)
+        response.raise_for_status()
+        jwks = response.json()
+    kid = jwt.get_unverified_header(token)["kid"]
+    rsa_key = next(key for key in jwks["keys"] if key["kid"] == kid)
+    return jwt.decode(token, jwt.PyJWK(rsa_key).key, algorithms=["RS256"], audience=AUDIENCE)
+
+
+async def _verify_cached(token: str, cache: JWKSCache):
+    kid = jwt.get_unverified_header(token)["kid"]
+    return jwt.decode(token, await cache.get_signing_key(kid), algorithms=["RS256"], audience=AUDIENCE)
+
+
+async def _measure(verify, tokens, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker(token):
+        async with semaphore:
+            await verify(token)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(token) for token in tokens))
+    return len(tokens) / (time.perf_counter() - started)
+
+
+async def _run(verifications: int, concurrency: int):
+    idp = StubIdentityProvider()
+    tokens = [idp.sign(AUDIENCE) for _ in range(verifications)]
+    results = {"verifications": verifications, "concurrency": concurrency}
+
+    with serve_in_thread(idp.app) as base_url:
+        jwks_url = f"{base_url}/{idp.tenant_id}/discovery/v2.0/keys"
+
+        results["uncached_per_sec"] = await _measure(lambda t: _verify_uncached(t, jwks_url), tokens, concurrency)
+        results["uncached_jwks_fetches"] = idp.requests["jwks"]
+        idp.requests.clear()
+
+        async with httpx.AsyncClient() as client:
+            cache = JWKSCache(jwks_url, http_client=client)
+            results["cached_per_sec"] = await _measure(lambda t: _verify_cached(t, cache), tokens, concurrency)
+            await cache.stop()
+        results["cached_jwks_fetches"] = idp.requests["jwks"]
+
+    results["speedup"] = results["cached_per_sec"] / results["uncached_per_sec"]
+    return results
+
+
+def run(verifications: int = 2000, concurrency: int = 50):
+    return asyncio.run(_run(verifications, concurrency))
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,105 @@
+# benchmarks/bench_load.py
+"""
+Mixed-workload load test of the server app through its full authentication path: bearer
+tokens signed by the stub identity provider, whose key set is served locally, are verified
+on every request. `users` concurrent virtual users each send `requests_per_user` requests
+drawn from MIX against a pre-loaded roster, deleting only heroes they created themselves.
+Reports throughput and latency per operation.
+
+    python -m benchmarks.bench_load [heroes] [users] [requests_per_user]
+"""
+
+import asyncio
+import logging
+import random
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.common import emit, latency_summary, serve_in_thread, use_stub_settings
+from benchmarks.payloads import hero_payloads, make_roster
+from benchmarks.stub_idp import StubIdentityProvider, TENANT_ID
+
+# Share of each operation in the request mix
+MIX = {"get": 0.55, "list_page": 0.15, "search": 0.15, "stats": 0.05, "create": 0.06, "delete": 0.04}
+SEARCHES = [{"class_": "Wizard"}, {"race": "Elf", "min_level": 5}, {"spell": "Fireball", "max_armor_class": 15},
+            {"skills": ["stealth", "perception"]}]
+
+
+async def _user(client: httpx.AsyncClient, token: str, hero_ids, payloads, requests: int, rng: random.Random,
+                samples):
+    headers = {"Authorization": f"Bearer {token}"}
+    operations, weights = zip(*MIX.items())
+    created = []
+    for operation in rng.choices(operations, weights, k=requests):
+        if operation == "delete" and not created:
+            operation = "create"
+        started = time.perf_counter()
+        if operation == "get":
+            response = await client.get(f"/api/heroes/{rng.choice(hero_ids)}", headers=headers)
+        elif operation == "list_page":
+            response = await client.get("/api/heroes/", params={"limit": 50}, headers=headers)
+        elif operation == "search":
+            response = await client.get("/api/heroes/search", params=rng.choice(SEARCHES), headers=headers)
+        elif operation == "stats":
+            response = await client.get("/api/heroes/stats/level", params={"group_by": "class_"}, headers=headers)
+        elif operation == "create":
+            response = await client.post("/api/heroes/", json=rng.choice(payloads), headers=headers)
+            created.append(response.json()["id"])
+        else:
+            response = await client.delete(f"/api/heroes/{created.pop()}", headers=headers)
+        response.raise_for_status()
+        samples[operation].append(time.perf_counter() - started)
+
+
+async def _load(app, idp: StubIdentityProvider, heroes: int, users: int, requests_per_user: int) -> dict:
+    from server.config import get_oauth_settings
+    from server.services.auth_service import token_audiences
+
+    roster = await app.state.hero_service.create_heroes(make_roster(heroes))
+    hero_ids = [hero.id for hero in roster]
+    payloads = hero_payloads(100)
+    # One token per user, as each user's client would reuse its access token
+    tokens = [idp.sign(token_audiences(get_oauth_settings())[0], roles=["Admin"]) for _ in range(users)]
+
+    samples = defaultdict(list)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://server") as client:
+        # Warm up: fetch the key set, verify each token once and load the analytics columns
+        for token in tokens:
+            headers = {"Authorization": f"Bearer {token}"}
+            (await client.get("/api/heroes/stats/level", headers=headers)).raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(_user(client, token, hero_ids, payloads, requests_per_user, random.Random(index),
+                                     samples)
+                               for index, token in enumerate(tokens)))
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(operation_samples) for operation_samples in samples.values())
+    return {"requests_per_sec": total / elapsed,
+            "overall": latency_summary([sample for operation in samples.values() for sample in operation]),
+            "operations": {operation: latency_summary(samples[operation]) for operation in MIX if samples[operation]}}
+
+
+def run(heroes: int = 10_000, users: int = 50, requests_per_user: int = 100):
+    idp = StubIdentityProvider()
+    use_stub_settings(TENANT_ID)
+    logging.disable(logging.CRITICAL)
+    try:
+        with serve_in_thread(idp.app) as authority_host:
+            from server.main import create_app
+            from server.services.auth_service import get_token_verifier
+            app = create_app()
+            get_token_verifier().jwks_cache.jwks_url = f"{authority_host}/{idp.tenant_id}/discovery/v2.0/keys"
+
+            results = asyncio.run(_load(app, idp, heroes, users, requests_per_user))
+    finally:
+        logging.disable(logging.NOTSET)
+    return {"heroes": heroes, "users": users, "requests_per_user": requests_per_user, **results}
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
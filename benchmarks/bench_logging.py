@@ -0,0 +1,119 @@
+# benchmarks/bench_logging.py
+"""
+Request latency of the server's hero endpoints under different logging setups:
+
+- disabled: logging switched off, the floor for the other cases
+- synchronous: the previous setup, a plain stream handler formatting and writing every
+  record on the request path
+- queued: the queue-based pipeline, JSON records formatted and written by a listener thread
+- queued_sampled: the same, keeping 1% of the hero service's INFO lines
+
+Each setup writes to a file on disk and to a slow sink that blocks for SLOW_WRITE_S per
+write, like a pipe to a log collector that is falling behind. The time the listener needed
+to drain its backlog after the requests is reported separately.
+
+    python -m benchmarks.bench_logging [requests]
+"""
+
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import emit, latency_summary, use_stub_settings
+from benchmarks.payloads import hero_payloads
+from benchmarks.stub_idp import TENANT_ID
+
+SLOW_WRITE_S = 0.0002
+
+
+class SlowSink:
+    """Text stream whose writes block, releasing the GIL as blocking I/O would."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text: str) -> int:
+        time.sleep(SLOW_WRITE_S)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def tell(self) -> int:
+        return self.stream.tell()
+
+
+def _synchronous(stream):
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    logging.getLogger().handlers[:] = [handler]
+
+
+async def _requests(app, payloads) -> dict:
+    results = {"create": [], "get": []}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://server") as client:
+        for payload in payloads:
+            started = time.perf_counter()
+            response = (await client.post("/api/heroes/", json=payload)).raise_for_status()
+            results["create"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            (await client.get(f"/api/heroes/{response.json()['id']}")).raise_for_status()
+            results["get"].append(time.perf_counter() - started)
+    return {name: latency_summary(samples) for name, samples in results.items()}
+
+
+def run(requests: int = 2_000):
+    use_stub_settings(TENANT_ID)
+    from server.logger import LoggingSettings, configure_logging
+    from server.main import create_app
+    from server.services.auth_service import get_current_claims
+
+    app = create_app()
+
+    setups = {
+        "disabled": None,
+        "synchronous": _synchronous,
+        "queued": lambda stream: configure_logging(LoggingSettings(LOG_FORMAT="json"), stream),
+        "queued_sampled": lambda stream: configure_logging(
+            LoggingSettings(LOG_FORMAT="json", LOG_SAMPLE_RATES={"server.heroes": 0.01}), stream),
+    }
+    payloads = hero_payloads(requests)
+    app.dependency_overrides[get_current_claims] = lambda: {"roles": ["Admin"]}
+    results = {"requests": requests, "slow_write_ms": SLOW_WRITE_S * 1000}
+    try:
+        for sink in ("file", "slow_sink"):
+            for name, setup in setups.items():
+                if setup is None and sink == "slow_sink":
+                    continue
+                with tempfile.TemporaryFile("w") as file:
+                    stream = file if sink == "file" else SlowSink(file)
+                    if setup is None:
+                        logging.disable(logging.CRITICAL)
+                        listener = None
+                    else:
+                        listener = setup(stream)
+                    result = asyncio.run(_requests(app, payloads))
+                    logging.disable(logging.NOTSET)
+                    if listener is not None:
+                        started = time.perf_counter()
+                        while not listener.queue.empty():
+                            time.sleep(0.001)
+                        result["drain_ms"] = (time.perf_counter() - started) * 1000
+                    logging.getLogger().handlers.clear()
+                    result["log_bytes"] = stream.tell()
+                results.setdefault(sink, {})[name] = result
+    finally:
+        app.dependency_overrides.clear()
+        logging.disable(logging.NOTSET)
+        configure_logging(LoggingSettings())
+    return results
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,82 @@
+# benchmarks/bench_login_callback.py
+"""
+Latency of the client's /auth/callback against a local stub token endpoint served over TLS,
+with a fresh httpx.AsyncClient per code exchange (the previous behaviour) versus the pooled
+client created by the application's lifespan handler.
+
+    python -m benchmarks.bench_login_callback [logins] [concurrency]
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import client_login_params, emit, latency_summary, serve_in_thread, use_stub_settings
+from benchmarks.stub_idp import StubIdentityProvider, TENANT_ID
+
+
+async def _per_request_client():
+    async with httpx.AsyncClient() as client:
+        yield client
+
+
+async def _logins(app, idp: StubIdentityProvider, logins: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def login(client: httpx.AsyncClient):
+        async with semaphore:
+            params = await client_login_params(client, idp)
+            started = time.perf_counter()
+            response = await client.get("/auth/callback", params=params)
+            response.raise_for_status()
+            samples.append(time.perf_counter() - started)
+
+    # The lifespan creates the pooled client even when a mode overrides it, as it would in production
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://client") as client:
+            await login(client)
+            samples.clear()
+            started = time.perf_counter()
+            await asyncio.gather(*(login(client) for _ in range(logins)))
+            elapsed = time.perf_counter() - started
+    return {**latency_summary(samples), "logins_per_sec": logins / elapsed}
+
+
+def run(logins: int = 300, concurrency: int = 10):
+    idp = StubIdentityProvider()
+    use_stub_settings(TENANT_ID)
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, keyfile = idp.write_tls_files(directory)
+        os.environ["SSL_CERT_FILE"] = certfile
+        try:
+            with serve_in_thread(idp.app, certfile=certfile, keyfile=keyfile) as authority_host:
+                os.environ["AUTHORITY_HOST"] = authority_host
+                from client.main import create_app
+                from client.services.http_client import get_http_client
+                app = create_app()
+
+                results = {"logins": logins, "concurrency": concurrency}
+                app.dependency_overrides[get_http_client] = _per_request_client
+                results["per_request_client"] = asyncio.run(_logins(app, idp, logins, concurrency))
+                app.dependency_overrides.clear()
+                results["pooled_client"] = asyncio.run(_logins(app, idp, logins, concurrency))
+                results["token_requests"] = idp.requests["token"]
+        finally:
+            del os.environ["SSL_CERT_FILE"]
+            logging.disable(logging.NOTSET)
+
+    results["speedup_p50"] = results["per_request_client"]["p50_ms"] / results["pooled_client"]["p50_ms"]
+    return results
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,159 @@
+# benchmarks/bench_metrics.py
+"""
+Overhead of the metrics instrumentation on the server's hero endpoints.
+
+End to end, the same requests are sent through the app with and without MetricsMiddleware
+and the named (timed) hero lock, in alternating rounds so that drift affects both alike.
+At these request times the end-to-end difference is within run-to-run noise, so each piece
+is also timed in isolation (the middleware around an empty ASGI app, a timed call, a timed
+lock guard) and their sum per GET is reported against the mean request time. The decorators
+on HeroService and the auth dependency cannot be switched off, so they are only measured so.
+
+    python -m benchmarks.bench_metrics [requests] [rounds]
+"""
+
+import asyncio
+import logging
+import statistics
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import emit, use_stub_settings
+from benchmarks.payloads import hero_payloads
+from benchmarks.stub_idp import TENANT_ID
+
+MICRO_ITERATIONS = 200_000
+
+
+async def _round(stack, hero_ids, requests: int) -> float:
+    transport = httpx.ASGITransport(app=stack)
+    async with httpx.AsyncClient(transport=transport, base_url="http://server") as client:
+        started = time.perf_counter()
+        for number in range(requests):
+            (await client.get(f"/api/heroes/{hero_ids[number % len(hero_ids)]}")).raise_for_status()
+        return (time.perf_counter() - started) / requests
+
+
+def _stack(app):
+    """The app's middleware stack, called as the app calls it, so that routes still find the app state."""
+    stack = app.build_middleware_stack()
+
+    async def asgi(scope, receive, send):
+        scope["app"] = app
+        await stack(scope, receive, send)
+    return asgi
+
+
+async def _end_to_end(app, hero_service, requests: int, rounds: int) -> dict:
+    from server.services.rw_lock import AsyncRWLock
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://server") as client:
+        created = await client.post("/api/heroes/bulk", json=hero_payloads(100))
+        hero_ids = [result["id"] for result in created.raise_for_status().json()["results"]]
+
+    instrumented_stack = _stack(app)
+    middleware = app.user_middleware
+    app.user_middleware = [entry for entry in middleware if entry.cls.__name__ != "MetricsMiddleware"]
+    bare_stack = _stack(app)
+    app.user_middleware = middleware
+
+    timed_lock, bare_lock = hero_service.lock, AsyncRWLock()
+    samples = {"instrumented": [], "bare": []}
+    try:
+        for _ in range(rounds):
+            hero_service.lock = timed_lock
+            samples["instrumented"].append(await _round(instrumented_stack, hero_ids, requests))
+            hero_service.lock = bare_lock
+            samples["bare"].append(await _round(bare_stack, hero_ids, requests))
+    finally:
+        hero_service.lock = timed_lock
+
+    instrumented, bare = (statistics.median(runs) for runs in (samples["instrumented"], samples["bare"]))
+    return {"requests": requests, "rounds": rounds, "instrumented_us": instrumented * 1e6,
+            "bare_us": bare * 1e6, "overhead_pct": (instrumented - bare) / bare * 100}
+
+
+def _micro_us(call, iterations: int = MICRO_ITERATIONS) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def _micro_async_us(call, iterations: int = MICRO_ITERATIONS) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await call()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def _micro() -> dict:
+    from server.services.metrics import Gauge, Histogram, MetricsMiddleware, Registry, timed
+    from server.services.rw_lock import AsyncRWLock
+
+    histogram = Histogram("bench_seconds", "Benchmark histogram.", ["label"], registry=Registry())
+    child = histogram.labels("bench")
+
+    async def noop():
+        pass
+
+    wrapped = timed(histogram, "bench")(noop)
+
+    async def asgi_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    registry = Registry()
+    middleware = MetricsMiddleware(asgi_app, Histogram("bench_request_seconds", "Benchmark histogram.",
+                                                       ["method", "route", "status"], registry=registry),
+                                   Gauge("bench_in_flight", "Benchmark gauge.", registry=registry))
+    scope = {"type": "http", "method": "GET"}
+    bare_lock, timed_lock = AsyncRWLock(), AsyncRWLock("bench")
+
+    async def read(lock):
+        async with lock.read():
+            pass
+
+    return {
+        "middleware_us": await _micro_async_us(lambda: middleware(scope, None, send))
+                         - await _micro_async_us(lambda: asgi_app(scope, None, send)),
+        "observe_us": _micro_us(lambda: child.observe(0.001)),
+        "labels_observe_us": _micro_us(lambda: histogram.labels("bench").observe(0.001)),
+        "timed_call_us": await _micro_async_us(wrapped) - await _micro_async_us(noop),
+        "timed_read_lock_us": await _micro_async_us(lambda: read(timed_lock))
+                              - await _micro_async_us(lambda: read(bare_lock)),
+    }
+
+
+def run(requests: int = 2_000, rounds: int = 7):
+    use_stub_settings(TENANT_ID)
+    from server.main import create_app
+    from server.services.auth_service import get_current_claims
+
+    app = create_app()
+    hero_service = app.state.hero_service
+    app.dependency_overrides[get_current_claims] = lambda: {"roles": ["Admin"]}
+    logging.disable(logging.CRITICAL)
+    try:
+        results = {"end_to_end": asyncio.run(_end_to_end(app, hero_service, requests, rounds)),
+                   "micro": asyncio.run(_micro())}
+    finally:
+        app.dependency_overrides.clear()
+        logging.disable(logging.NOTSET)
+
+    # A GET passes the middleware, the timed auth dependency, one timed HeroService call and a read lock
+    micro = results["micro"]
+    per_request_us = micro["middleware_us"] + 2 * micro["timed_call_us"] + micro["timed_read_lock_us"]
+    results["per_request_us"] = per_request_us
+    results["per_request_pct"] = per_request_us / results["end_to_end"]["bare_us"] * 100
+    return results
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
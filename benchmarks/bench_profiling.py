@@ -0,0 +1,75 @@
+# benchmarks/bench_profiling.py
+"""
+Cost of request profiling on the server's hero search endpoint:
+
+- disabled: the app as deployed by default, with no profiling middleware installed
+- enabled_unselected: ProfilingMiddleware installed with a zero sample rate and a secret,
+  so every request is checked for the signed header but none is profiled
+- sampling / cprofile: every request profiled, with the stack sampler or cProfile
+
+    python -m benchmarks.bench_profiling [requests]
+"""
+
+import asyncio
+import logging
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import emit, latency_summary, use_stub_settings
+from benchmarks.payloads import hero_payloads
+from benchmarks.stub_idp import TENANT_ID
+
+ROSTER = 2_000
+
+
+async def _requests(app, requests: int) -> dict:
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://server") as client:
+        for _ in range(requests):
+            started = time.perf_counter()
+            (await client.get("/api/heroes/search", params={"min_level": 10})).raise_for_status()
+            samples.append(time.perf_counter() - started)
+    return latency_summary(samples)
+
+
+async def _seed(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://server") as client:
+        (await client.post("/api/heroes/bulk", json=hero_payloads(ROSTER))).raise_for_status()
+
+
+def run(requests: int = 500):
+    use_stub_settings(TENANT_ID)
+    from server.main import create_app
+    from server.services.auth_service import get_current_claims
+    from server.services.profiling import ProfileStore, ProfilingMiddleware
+
+    app = create_app()
+
+    setups = {
+        "disabled": lambda: app,
+        "enabled_unselected": lambda: ProfilingMiddleware(app, ProfileStore(), secret="bench-secret"),
+        "sampling": lambda: ProfilingMiddleware(app, ProfileStore(), mode="sampling", sample_rate=1.0),
+        "cprofile": lambda: ProfilingMiddleware(app, ProfileStore(), mode="cprofile", sample_rate=1.0),
+    }
+    app.dependency_overrides[get_current_claims] = lambda: {"roles": ["Admin"]}
+    logging.disable(logging.CRITICAL)
+    try:
+        asyncio.run(_seed(app))
+        results = {"requests": requests, "roster": ROSTER}
+        for name, setup in setups.items():
+            stack = setup()
+            results[name] = asyncio.run(_requests(stack, requests))
+            if stack is not app:
+                results[name]["profiles_kept"] = len(stack.store.list())
+        return results
+    finally:
+        app.dependency_overrides.clear()
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
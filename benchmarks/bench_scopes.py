@@ -0,0 +1,124 @@
+# benchmarks/bench_scopes.py
+"""
+Authorization decisions per second: the previous has_required_scope of each app, walking
+ROLE_HIERARCHY with nested loops (the client's logging on every iteration), against the
+compiled ScopePolicy as routes use it through require_scopes: the token's claims reduced to
+a memoized mask, then one AND with the route's precompiled requirement.
+
+Cases are a token whose first scope grants access, one granted by a later scope, and one
+without any matching scope. Log records go through the queue to a discarded stream, as
+deployed, and each case is also run with logging disabled.
+
+    python -m benchmarks.bench_scopes [iterations]
+"""
+
+import logging
+import os
+import sys
+import time
+from typing import List
+
+from benchmarks.common import emit, use_stub_settings
+from benchmarks.stub_idp import TENANT_ID
+
+CASES = {
+    "first_scope_grants": ("Heroes.Read User.Read", ["Heroes.Read"]),
+    "later_scope_grants": ("openid profile email User.Read Heroes.Create", ["Heroes.Create"]),
+    "no_scope_grants": ("openid profile email User.Read Heroes.Read", ["Admin"]),
+}
+
+logger = logging.getLogger("server.bench")
+
+
+def previous_server_check(hierarchy):
+    def has_required_scope(token_scopes: List[str], required_scopes: List[str]) -> bool:
+        for token_scope in token_scopes:
+            granted_scopes = hierarchy.get(token_scope, [])
+            for required_scope in required_scopes:
+                if required_scope in granted_scopes:
+                    return True
+
+        logger.warning("No token scopes match the required scopes: %s", required_scopes)
+        return False
+
+    return has_required_scope
+
+
+def previous_client_check(hierarchy):
+    def has_required_scope(token_scopes: List[str], required_scopes: List[str]) -> bool:
+        logger.debug("Checking scopes: Token scopes: %s, Required scopes: %s", token_scopes, required_scopes)
+        for token_scope in token_scopes:
+            logger.debug("Checking token scope: %s", token_scope)
+            for required_scope in required_scopes:
+                if required_scope in hierarchy.get(token_scope, []):
+                    logger.info("Scope match: Token scope '%s' grants access to required scope '%s' "
+                                "based on the role hierarchy.", token_scope, required_scope)
+                    return True
+                else:
+                    logger.debug("Token scope '%s' does not grant access to required scope '%s'.", token_scope,
+                                 required_scope)
+
+        logger.warning("No token scopes match the required scopes: %s", required_scopes)
+        return False
+
+    return has_required_scope
+
+
+def _decisions_per_sec(decide, iterations: int) -> dict:
+    results = {}
+    for case, (scp, required_scopes) in CASES.items():
+        claims = {"scp": scp}
+        check = decide(required_scopes)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            check(claims)
+        results[case] = iterations / (time.perf_counter() - started)
+    return results
+
+
+def run(iterations: int = 100_000):
+    use_stub_settings(TENANT_ID)
+    from server.logger import LoggingSettings, configure_logging
+    from server.services.auth_service import ROLE_HIERARCHY, get_token_scopes, scope_policy
+
+    def previous(check):
+        return lambda required_scopes: lambda claims: check(get_token_scopes(claims), required_scopes)
+
+    def compiled(required_scopes):
+        requirement = scope_policy.requirement(*required_scopes)
+
+        # As require_scopes decides, logging denials
+        def check(claims):
+            if not scope_policy.allows(scope_policy.claims_mask(claims), requirement):
+                logger.warning("No token scopes match the required scopes: %s", required_scopes)
+                return False
+            return True
+
+        return check
+
+    deciders = {
+        "previous_server": previous(previous_server_check(ROLE_HIERARCHY)),
+        "previous_client": previous(previous_client_check(ROLE_HIERARCHY)),
+        "compiled": compiled,
+    }
+    results = {"iterations": iterations, "logging": {}, "logging_disabled": {}}
+    with open(os.devnull, "w") as devnull:
+        listener = configure_logging(LoggingSettings(LOG_FORMAT="json"), devnull)
+        try:
+            for name, decide in deciders.items():
+                results["logging"][name] = _decisions_per_sec(decide, iterations)
+            logging.disable(logging.CRITICAL)
+            for name, decide in deciders.items():
+                results["logging_disabled"][name] = _decisions_per_sec(decide, iterations)
+        finally:
+            logging.disable(logging.NOTSET)
+            configure_logging(LoggingSettings())
+            while not listener.queue.empty():
+                time.sleep(0.001)
+    results["speedup_vs_previous_server"] = {
+        case: results["logging"]["compiled"][case] / results["logging"]["previous_server"][case] for case in CASES}
+    return results
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
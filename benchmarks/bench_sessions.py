@@ -0,0 +1,75 @@
+# benchmarks/bench_sessions.py
+"""
+Session store lookups/sec and memory as the number of logged-in users grows past the
+configured capacity, for the in-memory LRU and the SQLite store.
+
+    python -m benchmarks.bench_sessions [users] [max_sessions]
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import emit, use_stub_settings
+from benchmarks.stub_idp import TENANT_ID
+
+
+def _session(index: int):
+    from client.models.session import Session
+    now = time.time()
+    return Session(id=f"session-{index}", access_token="x" * 1500, refresh_token="r" * 800,
+                   claims={"sub": str(index), "scp": "Heroes.Read", "exp": now + 3600},
+                   id_claims={"sub": str(index), "name": f"User {index}"},
+                   access_token_expires_at=now + 3600, created_at=now)
+
+
+async def _bench(store, users: int, lookups: int, concurrency: int):
+    tracemalloc.start()
+    started = time.perf_counter()
+    for index in range(users):
+        await store.put(_session(index))
+    put_rate = users / (time.perf_counter() - started)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Look up the most recent users, who are still within the store's capacity
+    recent = range(max(0, users - store.max_sessions), users)
+    ids = [f"session-{random.Random(index).choice(recent)}" for index in range(lookups)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def get(session_id):
+        async with semaphore:
+            assert await store.get(session_id) is not None
+
+    started = time.perf_counter()
+    await asyncio.gather(*(get(session_id) for session_id in ids))
+    get_rate = lookups / (time.perf_counter() - started)
+    await store.close()
+    return {"put_per_sec": put_rate, "get_per_sec": get_rate, "peak_alloc_mb": peak / 2 ** 20}
+
+
+def run(users: int = 50_000, max_sessions: int = 20_000, lookups: int = 20_000, concurrency: int = 1000):
+    use_stub_settings(TENANT_ID)
+    from client.services.session_store import InMemorySessionStore, SQLiteSessionStore
+
+    logging.disable(logging.INFO)
+    results = {"users": users, "max_sessions": max_sessions, "lookups": lookups, "concurrency": concurrency}
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            results["memory"] = asyncio.run(
+                _bench(InMemorySessionStore(3600, max_sessions), users, lookups, concurrency))
+            results["sqlite"] = asyncio.run(
+                _bench(SQLiteSessionStore(os.path.join(directory, "sessions.db"), 3600, max_sessions),
+                       users, lookups, concurrency))
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
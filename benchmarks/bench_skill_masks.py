@@ -0,0 +1,108 @@
+# benchmarks/bench_skill_masks.py
+"""
+Memory and query cost of skill proficiencies stored as one SkillProficiencies object of 18
+booleans per hero, against interned instances shared by bitmask and a column of masks.
+
+Memory is traced for the proficiency objects of the roster and for the in-memory skill index:
+a set of hero ids per skill, as the index kept before, against the SkillMaskColumn. Queries
+for heroes proficient in every one of a few skills are timed walking every hero object,
+intersecting the per-skill sets, and evaluating the mask column.
+
+    python -m benchmarks.bench_skill_masks [heroes] [repeats]
+"""
+
+import logging
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+from benchmarks.common import emit
+from benchmarks.payloads import SKILLS, make_roster
+
+QUERIES = (["stealth"], ["stealth", "perception"], ["arcana", "history", "investigation"])
+
+
+def _traced_bytes(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        return tracemalloc.get_traced_memory()[0] - before, kept
+    finally:
+        tracemalloc.stop()
+
+
+def _timed_ms(call, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = call()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, len(result)
+
+
+def run(heroes: int = 100_000, repeats: int = 20):
+    from server.models.skill_proficiencies import SkillProficiencies, skills_mask
+    from server.services.hero_index import SkillMaskColumn
+
+    logging.disable(logging.INFO)
+    try:
+        roster = make_roster(heroes)
+        dumps = [hero.skill_proficiencies.model_dump() for hero in roster]
+
+        objects_bytes, _ = _traced_bytes(lambda: [SkillProficiencies.model_validate(dump) for dump in dumps])
+        SkillProficiencies._interned.clear()
+        interned_bytes, _ = _traced_bytes(lambda: [SkillProficiencies.model_validate(dump).intern() for dump in dumps])
+
+        def build_sets():
+            by_skill = defaultdict(set)
+            for hero in roster:
+                for skill, proficient in hero.skill_proficiencies:
+                    if proficient:
+                        by_skill[skill].add(hero.id)
+            return by_skill
+
+        def build_column():
+            column = SkillMaskColumn()
+            for hero in roster:
+                column.add(hero.id, hero.skill_proficiencies.to_mask())
+            return column
+
+        sets_bytes, by_skill = _traced_bytes(build_sets)
+        column_bytes, column = _traced_bytes(build_column)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    per_100k = 100_000 / heroes
+    results = {
+        "heroes": heroes,
+        "distinct_skill_combinations": len(SkillProficiencies._interned),
+        "memory_per_100k_heroes_mb": {
+            "skill_objects": objects_bytes * per_100k / 1e6,
+            "interned_skill_objects": interned_bytes * per_100k / 1e6,
+            "per_skill_id_sets": sets_bytes * per_100k / 1e6,
+            "mask_column": column_bytes * per_100k / 1e6,
+        },
+        "queries": {},
+    }
+
+    random.Random(0).shuffle(roster)
+    for skills in QUERIES:
+        required = skills_mask(skills)
+        object_ms, matches = _timed_ms(
+            lambda: [hero for hero in roster if all(getattr(hero.skill_proficiencies, skill) for skill in skills)],
+            repeats)
+        sets_ms, _ = _timed_ms(lambda: set.intersection(*(by_skill[skill] for skill in skills)), repeats)
+        column_ms, _ = _timed_ms(lambda: column.match(required), repeats)
+        results["queries"]["+".join(skills)] = {
+            "matches": matches, "object_walk_ms": object_ms, "id_sets_ms": sets_ms, "mask_column_ms": column_ms,
+            "speedup_vs_object_walk": object_ms / column_ms,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
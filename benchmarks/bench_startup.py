@@ -0,0 +1,132 @@
+# benchmarks/bench_startup.py
+"""
+Startup latency of both apps, each measured in fresh interpreters so that nothing is
+already imported:
+
+- phases: importing the app module, create_app(), the lifespan handler's startup and the
+  first request (GET /metrics), timed inside one interpreter, and whether importing opened
+  a browser or loaded the OAuth settings
+- process_ready: a uvicorn process launched with --factory until it answers its first request
+- slowest_imports: the modules with the largest import time of their own, from -X importtime
+
+Medians over `runs` interpreters.
+
+    python -m benchmarks.bench_startup [runs]
+"""
+
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.common import emit, use_stub_settings
+from benchmarks.stub_idp import TENANT_ID
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = ["server", "client"]
+
+# Run in a fresh interpreter with the app's package name as its argument
+PHASES = """
+import asyncio, json, sys, time
+
+started = time.perf_counter()
+module = __import__(sys.argv[1] + ".main", fromlist=["create_app"])
+imported = time.perf_counter()
+config = sys.modules[sys.argv[1] + ".config.oauth"]
+side_effects = {"browser_imported": "webbrowser" in sys.modules,
+                "oauth_settings_loaded": config.get_oauth_settings.cache_info().currsize > 0}
+app = module.create_app()
+created = time.perf_counter()
+
+import httpx
+
+async def first_request():
+    async with app.router.lifespan_context(app):
+        started_up = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            (await client.get("/metrics")).raise_for_status()
+        return started_up, time.perf_counter()
+
+started_up, responded = asyncio.run(first_request())
+print(json.dumps({"import_ms": (imported - started) * 1000, "create_app_ms": (created - imported) * 1000,
+                  "startup_ms": (started_up - created) * 1000, "first_request_ms": (responded - started_up) * 1000,
+                  "total_ms": (responded - started) * 1000, **side_effects}))
+"""
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _phases(app: str) -> Dict:
+    process = subprocess.run([sys.executable, "-c", PHASES, app], capture_output=True, text=True, cwd=ROOT,
+                             check=True)
+    return json.loads(process.stdout)
+
+
+def _process_ready(app: str, timeout: float = 30.0) -> float:
+    """Seconds from launching uvicorn until the app answers GET /metrics."""
+    port = _free_port()
+    command = [sys.executable, "-m", "uvicorn", f"{app}.main:create_app", "--factory", "--port", str(port),
+               "--log-level", "warning"]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/metrics").status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            time.sleep(0.005)
+        raise RuntimeError(f"{app} did not answer within {timeout:.0f}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _slowest_imports(app: str, count: int = 10) -> Dict[str, float]:
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {app}.main"], capture_output=True,
+                             text=True, cwd=ROOT, check=True)
+    # Lines read "import time: <self us> | <cumulative us> | <indented module name>"
+    self_times = {}
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and not line.endswith("imported package"):
+            self_us, _, module = line[len("import time:"):].split("|")
+            self_times[module.strip()] = int(self_us) / 1000
+    return dict(sorted(self_times.items(), key=lambda item: item[1], reverse=True)[:count])
+
+
+def _median(samples: List[Dict], key: str) -> float:
+    return statistics.median(sample[key] for sample in samples)
+
+
+def run(runs: int = 10):
+    use_stub_settings(TENANT_ID)
+    results = {"runs": runs}
+    for app in APPS:
+        phases = [_phases(app) for _ in range(runs)]
+        results[app] = {
+            **{key: _median(phases, key) for key in
+               ("import_ms", "create_app_ms", "startup_ms", "first_request_ms", "total_ms")},
+            "browser_imported": any(sample["browser_imported"] for sample in phases),
+            "oauth_settings_loaded_on_import": any(sample["oauth_settings_loaded"] for sample in phases),
+            "process_ready_ms": statistics.median(_process_ready(app) for _ in range(runs)) * 1000,
+            "slowest_imports_ms": _slowest_imports(app),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,92 @@
+# benchmarks/bench_storage_engines.py
+"""
+Throughput of HeroService on the in-memory engine versus the SQLite engine: creates, point
+reads (issued concurrently), a full cursor walk, indexed queries and deletes.
+
+    python -m benchmarks.bench_storage_engines [heroes]
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.common import emit
+from benchmarks.payloads import make_heroes
+from server.models.hero_query import HeroQuery
+from server.services.hero_backend import InMemoryHeroBackend
+from server.services.hero_service import HeroService
+from server.services.sqlite_backend import SQLiteHeroBackend
+
+QUERIES = [
+    HeroQuery(spell="Fireball", max_armor_class=19),
+    HeroQuery(class_="Rogue", skills=["stealth"]),
+    HeroQuery(race="Elf", min_level=15),
+]
+
+
+def _rate(count: int, started: float) -> float:
+    return count / (time.perf_counter() - started)
+
+
+async def _bench(service: HeroService, heroes, concurrency: int):
+    await service.open()
+    results = {}
+    started = time.perf_counter()
+    for hero in heroes:
+        await service.create_hero(hero.model_copy())
+    results["create_per_sec"] = _rate(len(heroes), started)
+
+    hero_ids = [hero.id for hero in await service.list_heroes()]
+    sample = random.Random(3).sample(hero_ids, min(len(hero_ids), 5000))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def get(hero_id):
+        async with semaphore:
+            await service.get_hero(hero_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(get(hero_id) for hero_id in sample))
+    results["get_per_sec"] = _rate(len(sample), started)
+
+    started = time.perf_counter()
+    walked = 0
+    async for chunk in service.iter_heroes(1000):
+        walked += len(chunk)
+    results["page_walk_heroes_per_sec"] = _rate(walked, started)
+
+    started = time.perf_counter()
+    for query in QUERIES * 10:
+        await service.query_heroes(query)
+    results["query_per_sec"] = _rate(len(QUERIES) * 10, started)
+
+    started = time.perf_counter()
+    for hero_id in sample:
+        await service.delete_hero(hero_id)
+    results["delete_per_sec"] = _rate(len(sample), started)
+    return results
+
+
+def run(heroes: int = 20_000, concurrency: int = 50):
+    logging.disable(logging.INFO)
+    roster = make_heroes(heroes)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            results = {"heroes": heroes}
+            for name, backend in (("memory", InMemoryHeroBackend()),
+                                  ("sqlite", SQLiteHeroBackend(os.path.join(directory, "heroes.db")))):
+                service = HeroService(backend)
+                try:
+                    results[name] = asyncio.run(_bench(service, roster, concurrency))
+                finally:
+                    asyncio.run(service.close())
+            return results
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,97 @@
+# benchmarks/bench_token_refresh.py
+"""
+Calls to the token endpoint and request latency when many concurrent requests from one user
+hit an access token that is about to expire, or already has.
+
+Three cases are measured against a local stub token endpoint with simulated latency: every
+request redeeming the refresh token itself (no coalescing), the client's single-flight
+refresh for an already expired token, and the background refresh of a token within the
+refresh margin.
+
+    python -m benchmarks.bench_token_refresh [requests]
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import client_login_params, emit, latency_summary, serve_in_thread, use_stub_settings
+from benchmarks.stub_idp import StubIdentityProvider, TENANT_ID
+
+
+async def _timed(samples, call):
+    started = time.perf_counter()
+    await call()
+    samples.append(time.perf_counter() - started)
+
+
+async def _run(app, idp: StubIdentityProvider, requests: int):
+    from client.services.auth_service import refresh_access_token
+    from client.services.session_service import session_service
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://client") as client:
+            (await client.get("/auth/callback", params=await client_login_params(client, idp))).raise_for_status()
+            session_id = session_service.unsign(client.cookies.get(session_service.cookie_name))
+
+            async def set_expiry(seconds_left: float):
+                session = await session_service.store.get(session_id)
+                await session_service.store.put(
+                    session.model_copy(update={"access_token_expires_at": time.time() + seconds_left}))
+                # Forget earlier refreshes so that each case starts cold
+                session_service._refreshes.clear()
+                idp.requests.clear()
+
+            async def list_heroes():
+                (await client.get("/api/heroes/")).raise_for_status()
+
+            # Baseline: every request redeems the refresh token on its own
+            await set_expiry(-1)
+            session = await session_service.store.get(session_id)
+            samples = []
+            await asyncio.gather(*(_timed(samples, lambda: refresh_access_token(session, app.state.http_client))
+                                   for _ in range(requests)))
+            results["uncoalesced"] = {**latency_summary(samples), "token_calls": idp.requests["refresh_token"]}
+
+            for case, seconds_left in (("expired_single_flight", -1), ("expiring_background", 60)):
+                await set_expiry(seconds_left)
+                samples = []
+                await asyncio.gather(*(_timed(samples, list_heroes) for _ in range(requests)))
+                # Let a background refresh finish before counting
+                await asyncio.sleep(idp.token_latency * 4)
+                results[case] = {**latency_summary(samples), "token_calls": idp.requests["refresh_token"]}
+    return results
+
+
+def run(requests: int = 500, token_latency: float = 0.05):
+    idp = StubIdentityProvider(token_latency=token_latency)
+    use_stub_settings(TENANT_ID)
+    logging.disable(logging.WARNING)
+    try:
+        with serve_in_thread(idp.app) as authority_host:
+            # The client's hero routes forward to the server app, which checks the refreshed tokens
+            from server.main import create_app as create_server_app
+            from server.services.auth_service import get_token_verifier
+            server_app = create_server_app()
+            get_token_verifier().jwks_cache.jwks_url = f"{authority_host}/{idp.tenant_id}/discovery/v2.0/keys"
+
+            with serve_in_thread(server_app) as hero_api_base_url:
+                os.environ["AUTHORITY_HOST"] = authority_host
+                os.environ["HERO_API_BASE_URL"] = hero_api_base_url
+                from client.main import create_app
+                app = create_app()
+
+                results = asyncio.run(_run(app, idp, requests))
+    finally:
+        logging.disable(logging.NOTSET)
+    return {"requests": requests, "token_latency_ms": token_latency * 1000, **results}
+
+
+if __name__ == "__main__":
+    emit(run(*(int(arg) for arg in sys.argv[1:])))
@@ -0,0 +1,83 @@
+# benchmarks/common.py
+
+import json
+import logging
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import uvicorn
+
+# Per-request access lines from the HTTP client would otherwise dominate the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+@contextmanager
+def serve_in_thread(app, host: str = "127.0.0.1", certfile: Optional[str] = None, keyfile: Optional[str] = None):
+    """
+    Run an ASGI app on an ephemeral local port in a background thread and yield its base URL,
+    served over TLS when a certificate and key are given.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, 0))
+    port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="off",
+                                           ssl_certfile=certfile, ssl_keyfile=keyfile))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"{'https' if certfile else 'http'}://{host}:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
+
+
+def use_stub_settings(tenant_id: str, client_id: str = "bench-client-id"):
+    """Point the apps' settings at placeholder values so they import without a .env_oauth file."""
+    os.environ.update({
+        "AZURE_TENANT_ID": tenant_id,
+        "AZURE_CLIENT_ID": client_id,
+        "AZURE_CLIENT_SECRET": "bench-client-secret",
+        "API_SCOPE": f"api://{client_id}/Heroes.Read",
+        "REDIRECT_URI": "http://localhost:8000/auth/callback",
+    })
+
+
+async def client_login_params(client, idp) -> Dict[str, str]:
+    """
+    Start a login on the client app through `client`, which keeps the login cookie, and return
+    the query of its callback: a code that `idp` will redeem, as issued after a completed
+    login, and the login's state.
+    """
+    redirect = await client.get("/auth/login")
+    query = {key: values[0] for key, values in parse_qs(urlsplit(redirect.headers["location"]).query).items()}
+    return {"code": idp.issue_code(query["client_id"], query["redirect_uri"], query["nonce"]),
+            "state": query["state"]}
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """Summarise latency samples (in seconds) as milliseconds."""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
+
+
+def emit(results: Dict):
+    """Print benchmark results as JSON on stdout."""
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
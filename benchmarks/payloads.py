@@ -0,0 +1,80 @@
+# benchmarks/payloads.py
+
+import random
+from typing import Dict, List
+
+from server.models.dnd_hero import DnDHero
+from server.models.skill_proficiencies import SkillProficiencies
+
+RACES = ["Human", "Elf", "Dwarf", "Halfling", "Gnome", "Half-Orc", "Tiefling", "Dragonborn", "Half-Elf"]
+CLASSES = ["Wizard", "Sorcerer", "Warlock", "Cleric", "Druid", "Bard", "Fighter", "Rogue", "Ranger", "Paladin",
+           "Barbarian", "Monk"]
+ALIGNMENTS = ["Lawful Good", "Neutral Good", "Chaotic Good", "Lawful Neutral", "True Neutral", "Chaotic Neutral",
+              "Lawful Evil", "Neutral Evil", "Chaotic Evil"]
+SPELLCASTERS = {"Wizard", "Sorcerer", "Warlock", "Cleric", "Druid", "Bard", "Paladin", "Ranger"}
+SPELLS = [
+    {"name": "Fireball", "level": 3, "casting_time": "1 action", "range": "150 feet",
+     "components": ["V", "S", "M"], "duration": "Instantaneous"},
+    {"name": "Magic Missile", "level": 1, "casting_time": "1 action", "range": "120 feet",
+     "components": ["V", "S"], "duration": "Instantaneous"},
+    {"name": "Cure Wounds", "level": 1, "casting_time": "1 action", "range": "Touch",
+     "components": ["V", "S"], "duration": "Instantaneous"},
+    {"name": "Shield", "level": 1, "casting_time": "1 reaction", "range": "Self",
+     "components": ["V", "S"], "duration": "1 round"},
+    {"name": "Counterspell", "level": 3, "casting_time": "1 reaction", "range": "60 feet",
+     "components": ["S"], "duration": "Instantaneous"},
+    {"name": "Misty Step", "level": 2, "casting_time": "1 bonus action", "range": "Self",
+     "components": ["V"], "duration": "Instantaneous"},
+]
+WEAPONS = ["Longsword", "Shortbow", "Quarterstaff", "Dagger", "Warhammer", "Rapier", "Greataxe"]
+ARMORS = ["Leather", "Chain Mail", "Plate", "Scale Mail", None]
+ITEMS = ["Rope (50 ft)", "Torch", "Rations", "Healing Potion", "Thieves' Tools", "Spellbook", "Holy Symbol"]
+SKILLS = list(SkillProficiencies.model_fields)
+
+
+def hero_payload(index: int, rng: random.Random) -> Dict:
+    """Build the JSON body of a realistic, randomized hero."""
+    class_ = rng.choice(CLASSES)
+    spells = rng.sample(SPELLS, rng.randint(1, 4)) if class_ in SPELLCASTERS else None
+    return {
+        "id": str(index),
+        "name": f"Hero {index}",
+        "race": rng.choice(RACES),
+        "class_": class_,
+        "level": rng.randint(1, 20),
+        "background": rng.choice(["Acolyte", "Criminal", "Sage", "Soldier", "Outlander"]),
+        "alignment": rng.choice(ALIGNMENTS),
+        "ability_scores": {ability: rng.randint(3, 20) for ability in
+                           ("strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma")},
+        "skill_proficiencies": {skill: True for skill in rng.sample(SKILLS, rng.randint(2, 6))},
+        "equipment": {"weapon": rng.choice(WEAPONS), "armor": rng.choice(ARMORS),
+                      "items": rng.sample(ITEMS, rng.randint(0, 4))},
+        "spells": spells,
+        "hit_points": rng.randint(6, 200),
+        "armor_class": rng.randint(10, 22),
+        "speed": rng.choice([25, 30, 35]),
+        "personality_traits": "I am always calm, no matter what the situation.",
+        "ideals": "Knowledge is the path to power.",
+        "bonds": "I protect those who cannot protect themselves.",
+        "flaws": "I am too curious for my own good.",
+    }
+
+
+def hero_payloads(count: int, seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    return [hero_payload(index, rng) for index in range(count)]
+
+
+def make_heroes(count: int, seed: int = 42) -> List[DnDHero]:
+    rng = random.Random(seed)
+    return [DnDHero.model_validate(hero_payload(index, rng)) for index in range(count)]
+
+
+def make_roster(count: int, distinct: int = 1000, seed: int = 42) -> List[DnDHero]:
+    """
+    Build a large roster cheaply: `distinct` validated heroes are shallow-copied with fresh
+    names, so nested models are shared and a million heroes fit comfortably in memory.
+    """
+    templates = make_heroes(min(count, distinct), seed)
+    return [templates[index % len(templates)].model_copy(update={"id": str(index), "name": f"Hero {index}"})
+            for index in range(count)]
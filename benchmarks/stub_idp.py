@@ -0,0 +1,163 @@
+# benchmarks/stub_idp.py
+
+import asyncio
+import base64
+import datetime
+import ipaddress
+import os
+import time
+import uuid
+from collections import Counter
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlencode
+
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, RedirectResponse
+
+TENANT_ID = "00000000-0000-0000-0000-000000000000"
+
+
+def _b64url_uint(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+class StubIdentityProvider:
+    """
+    Offline stand-in for login.microsoftonline.com: authorize, token and JWKS endpoints, with
+    tokens signed by a local RSA key. Authorization codes are single use and bound to the
+    client and redirect URI they were issued for.
+    """
+
+    def __init__(self, tenant_id: str = TENANT_ID, max_age: int = 3600, token_lifetime: int = 3600,
+                 token_latency: float = 0.0):
+        self.tenant_id = tenant_id
+        self.max_age = max_age
+        self.token_lifetime = token_lifetime
+        # Simulated processing time of the token endpoint, in seconds
+        self.token_latency = token_latency
+        self.kid = uuid.uuid4().hex
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.requests: Counter = Counter()
+        # Authorization codes not yet redeemed, with the client and redirect URI they were issued
+        # for and the nonce of the login
+        self.codes: Dict[str, Tuple[str, str, Optional[str]]] = {}
+        self.app = self._build_app()
+
+    @property
+    def issuer(self) -> str:
+        return f"https://login.microsoftonline.com/{self.tenant_id}/v2.0"
+
+    def jwks(self) -> Dict:
+        numbers = self.private_key.public_key().public_numbers()
+        return {"keys": [{
+            "kty": "RSA",
+            "use": "sig",
+            "kid": self.kid,
+            "n": _b64url_uint(numbers.n),
+            "e": _b64url_uint(numbers.e),
+        }]}
+
+    def sign(self, audience: str, lifetime: int = 3600, **claims) -> str:
+        now = int(time.time())
+        payload = {"iss": self.issuer, "aud": audience, "iat": now, "nbf": now, "exp": now + lifetime,
+                   "sub": uuid.uuid4().hex, **claims}
+        return jwt.encode(payload, self.private_key, algorithm="RS256", headers={"kid": self.kid})
+
+    def issue_tokens(self, client_id: str, scope: str, nonce: Optional[str] = None) -> Dict:
+        """Token endpoint response: an ID token for the client and an access token for the requested API."""
+        api_scopes = [s for s in scope.split() if "/" in s]
+        api_audience = api_scopes[0].rsplit("/", 1)[0] if api_scopes else client_id
+        return {
+            "token_type": "Bearer",
+            "expires_in": self.token_lifetime,
+            "scope": scope,
+            "id_token": self.sign(client_id, self.token_lifetime, name="Bench User",
+                                  preferred_username="bench@example.com", **({"nonce": nonce} if nonce else {})),
+            "access_token": self.sign(api_audience, self.token_lifetime,
+                                      scp=" ".join(s.rsplit("/", 1)[1] for s in api_scopes)),
+            "refresh_token": uuid.uuid4().hex,
+        }
+
+    def issue_code(self, client_id: str, redirect_uri: str, nonce: Optional[str] = None) -> str:
+        """Authorization code as the authorize endpoint would issue it after the user signed in."""
+        code = uuid.uuid4().hex
+        self.codes[code] = (client_id, redirect_uri, nonce)
+        return code
+
+    def redeem_code(self, code: str, client_id: str, redirect_uri: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Consume a code, returning the OAuth error code if it cannot be redeemed by this client,
+        and the nonce of the login it was issued for.
+        """
+        client, redirect, nonce = self.codes.pop(code, (None, None, None))
+        if (client, redirect) != (client_id, redirect_uri):
+            return "invalid_grant", None
+        return None, nonce
+
+    def write_tls_files(self, directory: str, host: str = "127.0.0.1") -> Tuple[str, str]:
+        """Write a self-signed certificate for `host` and its key, returning (certfile, keyfile)."""
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, host)])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        certificate = (x509.CertificateBuilder()
+                       .subject_name(name).issuer_name(name)
+                       .public_key(key.public_key())
+                       .serial_number(x509.random_serial_number())
+                       .not_valid_before(now - datetime.timedelta(minutes=5))
+                       .not_valid_after(now + datetime.timedelta(days=1))
+                       .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address(host))]),
+                                      critical=False)
+                       .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+                       .sign(key, hashes.SHA256()))
+
+        certfile, keyfile = os.path.join(directory, "idp.crt"), os.path.join(directory, "idp.key")
+        with open(certfile, "wb") as file:
+            file.write(certificate.public_bytes(serialization.Encoding.PEM))
+        with open(keyfile, "wb") as file:
+            file.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+                                         serialization.NoEncryption()))
+        return certfile, keyfile
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/{tenant_id}/discovery/v2.0/keys")
+        async def keys(tenant_id: str, response: Response):
+            self.requests["jwks"] += 1
+            response.headers["Cache-Control"] = f"public, max-age={self.max_age}"
+            return self.jwks()
+
+        # Signs the user in without a login page and redirects back with a code, as after a completed login
+        @app.get("/{tenant_id}/oauth2/v2.0/authorize")
+        async def authorize(tenant_id: str, client_id: str, redirect_uri: str, response_type: str = "code",
+                            state: Optional[str] = None, nonce: Optional[str] = None):
+            self.requests["authorize"] += 1
+            if response_type != "code":
+                return JSONResponse({"error": "unsupported_response_type"}, status_code=400)
+            params = {"code": self.issue_code(client_id, redirect_uri, nonce)}
+            if state is not None:
+                params["state"] = state
+            return RedirectResponse(f"{redirect_uri}?{urlencode(params)}", status_code=302)
+
+        @app.post("/{tenant_id}/oauth2/v2.0/token")
+        async def token(tenant_id: str, request: Request):
+            self.requests["token"] += 1
+            form = {key: values[0] for key, values in parse_qs((await request.body()).decode()).items()}
+            self.requests[form.get("grant_type", "")] += 1
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            nonce = None
+            if form.get("grant_type") == "authorization_code":
+                error, nonce = self.redeem_code(form.get("code", ""), form.get("client_id", ""),
+                                                form.get("redirect_uri", ""))
+                if error:
+                    return JSONResponse({"error": error}, status_code=400)
+            return self.issue_tokens(form.get("client_id", ""), form.get("scope", ""), nonce)
+
+        return app
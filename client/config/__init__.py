@@ -1,5 +1,11 @@
 # client/config/__init__.py
 
-from .oauth import oauth_settings
+from .encoding import encoding_settings
+from .hero_api import hero_api_settings
+from .http import http_settings
+from .oauth import get_oauth_settings
+from .profiling import profiling_settings
+from .session import session_settings
 
-__all__ = ["oauth_settings"]
\ No newline at end of file
+__all__ = ["encoding_settings", "get_oauth_settings", "hero_api_settings", "http_settings", "profiling_settings",
+           "session_settings"]
\ No newline at end of file
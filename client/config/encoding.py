@@ -0,0 +1,24 @@
+# client/config/encoding.py
+
+from typing import List
+
+from dotenv import load_dotenv
+from pydantic_settings import BaseSettings
+
+load_dotenv()
+
+
+class EncodingSettings(BaseSettings):
+    """Content negotiation of hero responses: Accept picks JSON or MessagePack, Accept-Encoding a compression."""
+    # Compressions offered, in order of preference; br and zstd need the brotli and zstandard packages
+    RESPONSE_ENCODINGS: List[str] = ["zstd", "br", "gzip"]
+    # Bodies smaller than this are sent uncompressed, as compression would save next to nothing
+    RESPONSE_COMPRESSION_MIN_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+    ZSTD_LEVEL: int = 3
+    # Total size of the converted and compressed bodies kept for responses carrying an ETag
+    ENCODED_BODY_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+
+encoding_settings = EncodingSettings()
@@ -0,0 +1,17 @@
+# client/config/hero_api.py
+
+from dotenv import load_dotenv
+from pydantic_settings import BaseSettings
+
+load_dotenv()
+
+
+class HeroApiSettings(BaseSettings):
+    # Base URL of the server app the hero routes are forwarded to
+    HERO_API_BASE_URL: str = "http://localhost:8001"
+    # Number of cached GET responses, across all users, and the largest body worth caching
+    HERO_API_CACHE_SIZE: int = 10_000
+    HERO_API_CACHE_MAX_BODY: int = 1024 * 1024
+
+
+hero_api_settings = HeroApiSettings()
@@ -0,0 +1,22 @@
+# client/config/http.py
+
+from dotenv import load_dotenv
+from pydantic_settings import BaseSettings
+
+load_dotenv()
+
+
+class HttpSettings(BaseSettings):
+    """Tuning of the shared HTTP client used for every call to the identity provider."""
+    HTTP2: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 10.0
+    HTTP_RETRIES: int = 3
+    HTTP_BACKOFF_FACTOR: float = 0.25
+    HTTP_BACKOFF_MAX: float = 5.0
+
+
+http_settings = HttpSettings()
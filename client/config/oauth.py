@@ -1,5 +1,7 @@
 # client/config/oauth.py
 
+import functools
+
 from dotenv import load_dotenv
 from fastapi import HTTPException
 from pydantic_settings import BaseSettings
@@ -13,6 +15,7 @@ class OAuthSettings(BaseSettings):
     AZURE_TENANT_ID: str
     API_SCOPE: str
     REDIRECT_URI: str
+    AUTHORITY_HOST: str = "https://login.microsoftonline.com"
 
     class Config:
         env_file = ".env_oauth"
@@ -35,10 +38,12 @@ def initialize_oauth_settings():
         logger.logger.critical(".env file not found.")
         raise HTTPException(status_code=500, detail="Configuration error: .env file not found.")
     except Exception as e:
-        logger.logger.critical(f"Error loading OAuth settings: {e}")
+        logger.logger.critical("Error loading OAuth settings: %s", e)
         raise HTTPException(status_code=500,
                             detail="Configuration error: An error occurred while loading OAuth settings.")
 
 
-# Initialize OAuth settings
-oauth_settings = initialize_oauth_settings()
+# Loaded on first use rather than on import, so that the app can be imported and built without them
+@functools.lru_cache(maxsize=None)
+def get_oauth_settings() -> OAuthSettings:
+    return initialize_oauth_settings()
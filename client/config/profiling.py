@@ -0,0 +1,28 @@
+# client/config/profiling.py
+
+from typing import Literal, Optional
+
+from dotenv import load_dotenv
+from pydantic_settings import BaseSettings
+
+load_dotenv()
+
+
+class ProfilingSettings(BaseSettings):
+    """Opt-in request profiling; when disabled, no middleware or routes are installed."""
+    PROFILING_ENABLED: bool = False
+    # cprofile records every call (downloadable as pstats), sampling snapshots the stack every
+    # PROFILING_INTERVAL seconds (downloadable as collapsed stacks for flamegraphs)
+    PROFILING_MODE: Literal["cprofile", "sampling"] = "sampling"
+    PROFILING_INTERVAL: float = 0.001
+    # Fraction of requests profiled at random
+    PROFILING_SAMPLE_RATE: float = 0.0
+    # Key for signed X-Profile-Request headers, which profile the request that carries them
+    PROFILING_SECRET: Optional[str] = None
+    # Number of most recent profiles kept
+    PROFILING_BUFFER_SIZE: int = 50
+    # Profiles end after this many seconds, so streamed responses are only profiled while they start
+    PROFILING_MAX_DURATION: float = 30.0
+
+
+profiling_settings = ProfilingSettings()
@@ -0,0 +1,24 @@
+# client/config/session.py
+
+from typing import Literal, Optional
+
+from dotenv import load_dotenv
+from pydantic_settings import BaseSettings
+
+load_dotenv()
+
+
+class SessionSettings(BaseSettings):
+    # Key used to sign session cookies. Must be set, and identical, when several workers share sessions
+    SESSION_SECRET: Optional[str] = None
+    SESSION_COOKIE_NAME: str = "hero_session"
+    SESSION_COOKIE_SECURE: bool = False
+    SESSION_TTL: int = 8 * 3600
+    # Seconds before the access token expires at which it is refreshed in the background
+    SESSION_REFRESH_MARGIN: int = 300
+    SESSION_MAX_COUNT: int = 100_000
+    SESSION_STORE: Literal["memory", "sqlite"] = "memory"
+    SESSION_SQLITE_PATH: str = "sessions.db"
+
+
+session_settings = SessionSettings()
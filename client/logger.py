@@ -1,12 +1,175 @@
 # client/logger.py
 
+import atexit
+import json
 import logging
+import queue
+import random
+import re
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Literal, Optional, TextIO
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+from dotenv import load_dotenv
+from pydantic_settings import BaseSettings
+
+load_dotenv()
+
+
+# Kept here rather than in client.config, whose settings modules log through this one
+class LoggingSettings(BaseSettings):
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    # Fraction of INFO and DEBUG records kept per logger name, e.g. {"client.auth": 0.01};
+    # a name also applies to its child loggers. Warnings and errors are never sampled
+    LOG_SAMPLE_RATES: Dict[str, float] = {}
+
+
+# Secrets that must never reach the log output: bearer tokens, JWTs and credential fields
+REDACTIONS = (
+    (re.compile(r"(?i)\b(bearer\s+)[\w\-.~+/]+=*"), r"\1[REDACTED]"),
+    (re.compile(r"\beyJ[\w-]*\.[\w-]*\.[\w-]*"), "[REDACTED]"),
+    (re.compile(r"(?i)(\b(?:access_token|refresh_token|id_token|client_secret|password)['\"]?\s*[:=]\s*['\"]?)"
+                r"[^'\"\s,&}]+"), r"\1[REDACTED]"),
+    # Authorization codes, in query strings and quoted keys only, so that "status code: 200" survives
+    (re.compile(r"(?i)((?:[?&]|['\"])code['\"]?\s*[:=]\s*['\"]?)[^'\"\s,&}]+"), r"\1[REDACTED]"),
 )
 
+# Field names whose values are secrets, wherever they appear in fields passed through `extra`
+SECRET_KEYS = frozenset({"access_token", "refresh_token", "id_token", "client_secret", "password", "code",
+                         "authorization", "cookie"})
+
+# Attributes every LogRecord has; anything else was passed through `extra` and is emitted as a field
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def redact(text: str) -> str:
+    for pattern, replacement in REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def redact_field(key: str, value):
+    """A field passed through `extra`, redacted like the message, with nested secret fields replaced whole."""
+    if str(key).lower() in SECRET_KEYS:
+        return "[REDACTED]"
+    if isinstance(value, str):
+        return redact(value)
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        return {item_key: redact_field(item_key, item) for item_key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [redact_field("", item) for item in value]
+    return redact(str(value))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with secrets redacted from the message, traceback and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+        }
+        entry.update((key, redact_field(key, value)) for key, value in vars(record).items()
+                     if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exception"] = redact(self.formatException(record.exc_info))
+        return json.dumps(entry, default=str)
+
+
+class RedactingFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a configured fraction of INFO and DEBUG records per logger, and every warning or error."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        rate = self._resolved.get(record.name)
+        if rate is None:
+            rate = self._resolved[record.name] = self._rate(record.name)
+        return rate >= 1 or random.random() < rate
+
+    def _rate(self, name: str) -> float:
+        # The most specific configured ancestor wins
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Enqueue records as they are, so that formatting (%-style arguments, JSON encoding,
+    redaction) happens on the listener thread instead of in the request. Log arguments
+    should therefore be values that are not modified afterwards.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(settings: LoggingSettings, stream: Optional[TextIO] = None) -> QueueListener:
+    """
+    Route every record through an in-memory queue to a listener thread that formats and
+    writes it to `stream` (stderr by default), so logging calls never block on I/O.
+    Replaces the root logger's handlers.
+    """
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else
+                        RedactingFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    # Flush what is still queued when the process exits, unless stop_logging() did so first
+    atexit.register(listener.stop)
+    return listener
+
+
+def stop_logging(listener: QueueListener):
+    """
+    Flush what `listener` still has queued and stop its thread. Its queue handler is removed
+    from the root logger, so records logged afterwards go to the last-resort handler rather
+    than to a queue nobody reads.
+    """
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, QueueHandler) and handler.queue is listener.queue:
+            root.removeHandler(handler)
+    atexit.unregister(listener.stop)
+    # Before Python 3.12, stopping a listener twice fails, as when an app is started and stopped again
+    if listener._thread is not None:
+        listener.stop()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Child of the application logger, e.g. get_logger("auth") for "client.auth"."""
+    return logger.getChild(name)
+
+
 # Create a logger object that can be imported across the application
-logger = logging.getLogger(__name__)
+logger = logging.getLogger("client")
@@ -1,14 +1,84 @@
 # client/main.py
 
+import os
+from contextlib import asynccontextmanager
+
+import uvicorn
 from fastapi import FastAPI
-from client.routers import auth, heroes
+from client.config import http_settings, profiling_settings, session_settings
+from client.logger import LoggingSettings, configure_logging, stop_logging
+from client.routers import auth, heroes, metrics, profiling
+from client.services.auth_service import get_jwks_cache
+from client.services.http_client import create_http_client
+from client.services.metrics import MetricsMiddleware
+from client.services.profiling import ProfilingMiddleware
+from client.services.session_service import session_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the OAuth settings at startup, so that a missing setting stops the worker here
+    # rather than failing its first login
+    jwks_cache = get_jwks_cache()
+    # One pooled client for every call to the identity provider, so that token exchanges and
+    # key fetches reuse warm connections instead of paying a TCP and TLS handshake each
+    async with create_http_client(http_settings) as http_client:
+        app.state.http_client = http_client
+        jwks_cache.http_client = http_client
+        try:
+            yield
+        finally:
+            await jwks_cache.stop()
+            jwks_cache.http_client = None
+            await session_service.close()
+            stop_logging(app.state.log_listener)
+
+
+def create_app() -> FastAPI:
+    """
+    Build the application. Nothing is loaded or connected on import; logging is configured
+    here, and settings read and shared resources created by the lifespan handler, once per
+    worker process. Users sign in by opening /auth/login.
+    """
+    app = FastAPI(
+        title="Hero API",
+        description="An API to manage heroes secure by OAuth 2.0 auth code flow",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+    app.state.log_listener = configure_logging(LoggingSettings())
+
+    # Register the oauth and heroes router
+    app.include_router(auth.router, prefix="/auth", tags=["OAuth2 Back-channel"])
+    app.include_router(heroes.router, prefix="/api", tags=["Heroes"])
+    app.include_router(metrics.router)
+
+    # Per-route latency and in-flight requests, exposed at /metrics
+    app.add_middleware(MetricsMiddleware)
+
+    # Opt-in profiling of sampled or explicitly requested requests; nothing is installed unless enabled
+    if profiling_settings.PROFILING_ENABLED:
+        app.add_middleware(ProfilingMiddleware, store=profiling.profile_store, mode=profiling_settings.PROFILING_MODE,
+                           interval=profiling_settings.PROFILING_INTERVAL,
+                           sample_rate=profiling_settings.PROFILING_SAMPLE_RATE,
+                           secret=profiling_settings.PROFILING_SECRET,
+                           max_duration=profiling_settings.PROFILING_MAX_DURATION)
+        app.include_router(profiling.router, prefix="/debug", tags=["Profiling"])
+
+    return app
+
+
+def worker_count() -> int:
+    """
+    WEB_CONCURRENCY, 1 by default. Workers share nothing in memory, so more than one is only
+    allowed when they share sessions through SQLite and sign cookies with the same secret.
+    """
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    if workers > 1 and (session_settings.SESSION_STORE != "sqlite" or not session_settings.SESSION_SECRET):
+        raise SystemExit(f"WEB_CONCURRENCY={workers} requires SESSION_STORE=sqlite and SESSION_SECRET, "
+                         f"or a session would only be valid in the worker that started it")
+    return workers
 
-app = FastAPI(
-    title="Hero API",
-    description="An API to manage heroes secure by OAuth 2.0 auth code flow",
-    version="1.0.0"
-)
 
-# Register the oauth and heroes router
-app.include_router(auth.router, prefix="/auth", tags=["OAuth2 Back-channel"])
-app.include_router(heroes.router, prefix="/api", tags=["Heroes"])
+if __name__ == '__main__':
+    uvicorn.run('client.main:create_app', factory=True, host='0.0.0.0', port=8000, workers=worker_count())
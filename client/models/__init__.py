@@ -1,5 +1,7 @@
 # client/models/__init__.py
 
 from .dnd_hero import DnDHero, AbilityScores, SkillProficiencies, Equipment, Spell
+from .hero_query import HeroQuery
+from .session import Session
 
-__all__ = ["DnDHero", "AbilityScores", "SkillProficiencies", "Equipment", "Spell"]
\ No newline at end of file
+__all__ = ["DnDHero", "AbilityScores", "SkillProficiencies", "Equipment", "Spell", "HeroQuery", "Session"]
\ No newline at end of file
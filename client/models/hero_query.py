@@ -0,0 +1,21 @@
+# client/models/hero_query.py
+
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class HeroQuery(BaseModel):
+    spell: Optional[str] = None
+    class_: Optional[str] = None
+    race: Optional[str] = None
+
+    # Inclusive ranges
+    min_level: Optional[int] = None
+    max_level: Optional[int] = None
+    min_armor_class: Optional[int] = None
+    max_armor_class: Optional[int] = None
+    min_hit_points: Optional[int] = None
+    max_hit_points: Optional[int] = None
+
+    # Heroes must be proficient in every listed skill
+    skills: List[str] = []
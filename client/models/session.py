@@ -0,0 +1,19 @@
+# client/models/session.py
+
+from typing import Optional
+from pydantic import BaseModel
+
+
+class Session(BaseModel):
+    """Server-side record of a logged-in user, referenced by the signed session cookie."""
+    id: str = ""
+    access_token: str
+    refresh_token: Optional[str] = None
+
+    # Decoded claims of the access and ID tokens
+    claims: dict
+    id_claims: dict
+
+    # Unix timestamps: when the access token expires, and when the session itself was created
+    access_token_expires_at: float
+    created_at: float
@@ -1,3 +1,3 @@
 # client/routers/__init__.py
 
-__all__ = ["heroes", "auth"]
+__all__ = ["heroes", "auth", "metrics", "profiling"]
@@ -1,19 +1,35 @@
 # client/routers/auth.py
 
-from http.client import HTTPException
-from fastapi import APIRouter, HTTPException, Request
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import RedirectResponse
 from client.logger import logger
-from client.services.auth_service import handle_openid_connect_flow
+from client.services.auth_service import build_login_url, handle_openid_connect_flow
+from client.services.http_client import get_http_client
+from client.services.session_service import session_service
 
 router = APIRouter()
 
 
+# Login: send the browser to the identity provider, which redirects back to /auth/callback
+@router.get("/login")
+async def login():
+    state, nonce = session_service.new_login()
+    response = RedirectResponse(build_login_url(state, nonce), status_code=302)
+    session_service.set_login_cookie(response, state, nonce)
+    return response
+
+
 # Example usage in the callback route
 @router.get("/callback")
-async def auth_callback(request: Request):
-    """Callback handler for OpenID Connect flow."""
+async def auth_callback(request: Request, response: Response,
+                        http_client: httpx.AsyncClient = Depends(get_http_client)):
+    """Callback handler for OpenID Connect flow. Starts a session and sets its signed cookie."""
     logger.info("Received callback request on /auth/callback")
 
+    # Only complete a login this browser started, so that no one can log it into their own account
+    nonce = session_service.finish_login(request, response, request.query_params.get("state"))
+
     # Extract the authorization code from the query params
     code = request.query_params.get("code")
 
@@ -24,9 +40,22 @@ async def auth_callback(request: Request):
     # Call the OpenID Connect handler function
     try:
         logger.info("Initiating OpenID Connect flow handling")
-        result = await handle_openid_connect_flow(code)
+        session = await handle_openid_connect_flow(code, http_client, nonce)
+        await session_service.create_session(session, response)
         logger.info("OpenID Connect flow completed successfully")
-        return result
+        return {
+            "access_token": session.claims,
+            "id_token": session.id_claims
+        }
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"An error occurred during OpenID Connect flow: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error during OpenID Connect flow")
\ No newline at end of file
+        logger.error("An error occurred during OpenID Connect flow: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error during OpenID Connect flow")
+
+
+# Logout: forget the session and clear its cookie
+@router.post("/logout")
+async def logout(request: Request, response: Response):
+    await session_service.delete_session(request, response)
+    return {"message": "Logged out"}
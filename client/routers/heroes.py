@@ -1,53 +1,111 @@
 # client/routers/heroes.py
 
-from http.client import HTTPException
-from typing import List
+from typing import Annotated, List
 
-from fastapi import APIRouter
-from fastapi import HTTPException
+import httpx
+from fastapi import APIRouter, Depends, Query, Request, Response
 
+from client.config import encoding_settings, hero_api_settings
 from client.models.dnd_hero import DnDHero
-from client.services.auth_service import verify_scope
-from client.services.hero_service import HeroService
+from client.models.hero_query import HeroQuery
+from client.models.session import Session
+from client.services.content_negotiation import (JSON_MEDIA_TYPE, VARY, ContentNegotiator, representation_etag,
+                                                 wire_etag)
+from client.services.hero_api_client import HeroApiClient, UpstreamResponse
+from client.services.http_client import get_http_client
+from client.services.session_service import get_current_session, require_scopes
 
 router = APIRouter()
-hero_service = HeroService()
+hero_api = HeroApiClient(hero_api_settings.HERO_API_BASE_URL, hero_api_settings.HERO_API_CACHE_SIZE,
+                         hero_api_settings.HERO_API_CACHE_MAX_BODY)
+negotiator = ContentNegotiator(encoding_settings.RESPONSE_ENCODINGS, encoding_settings.RESPONSE_COMPRESSION_MIN_SIZE,
+                               encoding_settings.GZIP_LEVEL, encoding_settings.BROTLI_QUALITY,
+                               encoding_settings.ZSTD_LEVEL, encoding_settings.ENCODED_BODY_CACHE_MAX_BYTES)
+
+# Every hero route forwards to the server app on behalf of the logged-in user
+SessionDep = Annotated[Session, Depends(get_current_session)]
+HttpClientDep = Annotated[httpx.AsyncClient, Depends(get_http_client)]
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+async def _to_response(upstream: UpstreamResponse, request: Request) -> Response:
+    """
+    Relay an upstream response, answering the browser's own If-None-Match from its ETag. JSON
+    bodies are sent in the format and compression the browser negotiated; those with an ETag
+    are converted and compressed once per version, whichever user asks.
+    """
+    if upstream.status_code != 200 or not (upstream.media_type or "").startswith(JSON_MEDIA_TYPE):
+        headers = {"ETag": upstream.etag} if upstream.etag else {}
+        return Response(content=upstream.content, status_code=upstream.status_code, media_type=upstream.media_type,
+                        headers=headers)
+
+    media_type = negotiator.media_type(request.headers.get("accept"))
+    headers = {"Vary": VARY}
+    etag = None
+    if upstream.etag:
+        # The upstream body was compressed on the way here, and decoded by the HTTP client
+        etag = representation_etag(upstream.etag.removeprefix("W/"), media_type)
+        if _not_modified(request, etag):
+            return Response(status_code=304, headers={"ETag": etag, **headers})
+
+    encoding = negotiator.encoding(request.headers.get("accept-encoding"), len(upstream.content))
+    cache_key = (request.url.path, request.url.query, etag) if etag is not None else None
+    content = await negotiator.render(upstream.content, media_type, encoding, cache_key)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if etag is not None:
+        headers["ETag"] = wire_etag(etag, encoding)
+    return Response(content=content, media_type=media_type, headers=headers)
 
 
 # POST: Create a new Hero
-@router.post("/heroes/", response_model=DnDHero)
-async def create_hero(hero: DnDHero):
-    return await hero_service.create_hero(hero)
+@router.post("/heroes/", response_model=DnDHero, dependencies=[Depends(require_scopes("Heroes.Create"))])
+async def create_hero(hero: DnDHero, request: Request, session: SessionDep, http_client: HttpClientDep):
+    upstream = await hero_api.send(http_client, session, "POST", "/api/heroes/", hero.model_dump_json().encode())
+    return await _to_response(upstream, request)
+
+
+# GET: Search heroes by spell, class, race, skills and level, armor class or hit point ranges
+@router.get("/heroes/search", response_model=List[DnDHero], dependencies=[Depends(require_scopes("Heroes.Read"))])
+async def search_heroes(query: Annotated[HeroQuery, Query()], request: Request, session: SessionDep,
+                        http_client: HttpClientDep):
+    params = query.model_dump(exclude_defaults=True)
+    upstream = await hero_api.get(http_client, session, "/api/heroes/search", params)
+    return await _to_response(upstream, request)
 
 
 # GET: Retrieve a hero by ID
-@router.get("/heroes/{hero_id}", response_model=DnDHero)
-async def read_hero(hero_id: str):
-    hero = await hero_service.get_hero(hero_id)
-    if hero:
-        return hero
-    else:
-        raise HTTPException(status_code=404, detail="Hero not found")
+@router.get("/heroes/{hero_id}", response_model=DnDHero, dependencies=[Depends(require_scopes("Heroes.Read"))])
+async def read_hero(hero_id: str, request: Request, session: SessionDep, http_client: HttpClientDep):
+    upstream = await hero_api.get(http_client, session, f"/api/heroes/{hero_id}")
+    return await _to_response(upstream, request)
 
 
 # GET: Retrieve all heroes
-@router.get("/heroes/", response_model=List[DnDHero])
-async def read_heroes():
-    await verify_scope(["Heroes.Read"])
-    return await hero_service.list_heroes()
+@router.get("/heroes/", response_model=List[DnDHero], dependencies=[Depends(require_scopes("Heroes.Read"))])
+async def read_heroes(request: Request, session: SessionDep, http_client: HttpClientDep):
+    upstream = await hero_api.get(http_client, session, "/api/heroes/")
+    return await _to_response(upstream, request)
 
 
 # DELETE: Delete a hero by ID
-@router.delete("/heroes/{hero_id}", response_model=dict)
-async def delete_hero(hero_id: str):
-    success = await hero_service.delete_hero(hero_id)
-    if success:
-        return {"message": f"Hero with id '{hero_id}' deleted successfully"}
-    else:
-        raise HTTPException(status_code=404, detail="Hero not found")
+@router.delete("/heroes/{hero_id}", response_model=dict, dependencies=[Depends(require_scopes("Admin"))])
+async def delete_hero(hero_id: str, request: Request, session: SessionDep, http_client: HttpClientDep):
+    upstream = await hero_api.send(http_client, session, "DELETE", f"/api/heroes/{hero_id}")
+    return await _to_response(upstream, request)
 
 
 # GET: Custom query to retrieve heroes with Fireball spell and AC < 20
-@router.get("/heroes-fireball-low-ac", response_model=List[DnDHero])
-async def get_fireball_heroes_with_low_ac():
-    return await hero_service.query_heroes_fireball_low_ac()
+@router.get("/heroes-fireball-low-ac", response_model=List[DnDHero],
+            dependencies=[Depends(require_scopes("Heroes.Read"))])
+async def get_fireball_heroes_with_low_ac(request: Request, session: SessionDep, http_client: HttpClientDep):
+    upstream = await hero_api.get(http_client, session, "/api/heroes-fireball-low-ac")
+    return await _to_response(upstream, request)
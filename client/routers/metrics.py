@@ -0,0 +1,14 @@
+# client/routers/metrics.py
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from client.services.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter()
+
+
+# Prometheus scrape endpoint, unauthenticated like a health check; keep it off public ingress
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,23 +1,28 @@
 # client/services/auth_service.py
 
-# Set up constants for OAuth2
-import webbrowser
-from typing import List
+import functools
+import hmac
+import time
+from typing import List, NamedTuple, Optional
 from urllib.parse import urlencode
 
 import httpx
 import jwt
 from fastapi import HTTPException
-from fastapi.security import OAuth2AuthorizationCodeBearer
 
-from client.config import oauth_settings
-from client.logger import logger
-from client.services.token_storage import DECODED_TOKEN
+from client.config import get_oauth_settings
+from client.logger import get_logger
+from client.models.session import Session
+from client.services.jwks_cache import JWKSCache
+from client.services.metrics import Counter, Histogram, timed
+from client.services.scope_policy import ScopePolicy
 
-AUTHORITY = f"https://login.microsoftonline.com/{oauth_settings.AZURE_TENANT_ID}"
-AUTH_URL = f"{AUTHORITY}/oauth2/v2.0/authorize"
-TOKEN_URL = f"{AUTHORITY}/oauth2/v2.0/token"
-JWKS_URL = f"https://login.microsoftonline.com/{oauth_settings.AZURE_TENANT_ID}/discovery/v2.0/keys"
+# Logins and token refreshes log on every call; sample them with LOG_SAMPLE_RATES={"client.auth": ...}
+logger = get_logger("auth")
+
+# Calls to the identity provider, by operation; per-attempt HTTP timings are kept by RetryTransport
+AUTH_SECONDS = Histogram("auth_seconds", "Duration of authentication operations.", ["operation"])
+AUTH_ERRORS = Counter("auth_errors_total", "Authentication operations that failed.", ["operation"])
 
 # Role hierarchy mapping: which roles can fulfill which scopes
 ROLE_HIERARCHY = {
@@ -26,37 +31,59 @@ ROLE_HIERARCHY = {
     'Heroes.Read': ['Heroes.Read']
 }
 
-# OAuth2AuthorizationCodeBearer scheme
-oauth2_scheme = OAuth2AuthorizationCodeBearer(
-    authorizationUrl=AUTH_URL,
-    tokenUrl=TOKEN_URL
-)
-
-# Prepare the parameters for the OAuth2 authorization URL
-query_params = {
-    "client_id": oauth_settings.AZURE_CLIENT_ID,
-    "response_type": "code",
-    "redirect_uri": oauth_settings.REDIRECT_URI,
-    "scope": "openid profile email User.Read",
-    "response_mode": "query"
-}
+# The hierarchy compiled into bitmasks, once at startup
+scope_policy = ScopePolicy(ROLE_HIERARCHY)
+
+
+class IdentityEndpoints(NamedTuple):
+    authorize: str
+    token: str
+    jwks: str
+
+
+# The tenant's endpoints, built from the OAuth settings on first use
+@functools.lru_cache(maxsize=None)
+def get_endpoints() -> IdentityEndpoints:
+    settings = get_oauth_settings()
+    authority = f"{settings.AUTHORITY_HOST}/{settings.AZURE_TENANT_ID}"
+    return IdentityEndpoints(f"{authority}/oauth2/v2.0/authorize", f"{authority}/oauth2/v2.0/token",
+                             f"{authority}/discovery/v2.0/keys")
 
-# Encode the query parameters and construct the full authorization URL
-login_url = f"https://login.microsoftonline.com/{oauth_settings.AZURE_TENANT_ID}/oauth2/v2.0/authorize?{urlencode(query_params)} "
 
-# Open the login URL in the default web browser
-webbrowser.open_new_tab(login_url)  # This opens the login URL in a new browser tab
+# Process-wide cache of the tenant's signing keys, fetched through the shared HTTP client once
+# the application's lifespan handler has created it
+@functools.lru_cache(maxsize=None)
+def get_jwks_cache() -> JWKSCache:
+    return JWKSCache(get_endpoints().jwks)
 
 
-async def handle_openid_connect_flow(code: str):
+def build_login_url(state: str, nonce: str) -> str:
+    """
+    URL of the authorization request the user's browser is sent to for signing in. The
+    identity provider returns `state` to the callback and puts `nonce` in the ID token.
+    """
+    settings = get_oauth_settings()
+    query_params = {
+        "client_id": settings.AZURE_CLIENT_ID,
+        "response_type": "code",
+        "redirect_uri": settings.REDIRECT_URI,
+        "scope": "openid profile email offline_access User.Read",
+        "response_mode": "query",
+        "state": state,
+        "nonce": nonce,
+    }
+    return f"{get_endpoints().authorize}?{urlencode(query_params)}"
+
+
+async def handle_openid_connect_flow(code: str, http_client: httpx.AsyncClient, nonce: str):
     """
     Handle OpenID Connect flow by exchanging the authorization code for tokens,
-    decoding the ID token, and verifying the token.
+    decoding the ID token, and verifying the token. Returns the session record to store.
     """
     # Exchange the authorization code for access and ID tokens
     try:
         logger.info("Attempting to request access token")
-        token = await get_access_token(code)  # Function that exchanges code for token
+        token = await get_access_token(code, http_client)  # Function that exchanges code for token
         logger.info("Attempting to fetch id_token from token")
         id_token = token.get("id_token")
         logger.info("Attempting to fetch access_token from token")
@@ -65,54 +92,53 @@ async def handle_openid_connect_flow(code: str):
         if not id_token:
             raise HTTPException(status_code=400, detail="ID token not found in response")
 
-        # Decode the ID token without verifying the signature first
-        decoded_id_token = jwt.decode(id_token, options={"verify_signature": False}, algorithms=["RS256"])
-        print("Decoded ID Token:", decoded_id_token)
+        # Verify the ID token signature and its claims before trusting the subject
+        decoded_id_token = await verify_id_token(id_token, nonce)
 
-        # Decode the access token without verifying the signature first
+        # The access token is meant for the API, which verifies it; read its claims only
         decoded_access_token = jwt.decode(access_token, options={"verify_signature": False}, algorithms=["RS256"])
-        print("Decoded access Token:", decoded_access_token)
-
-        # Verify the ID token signature and its claims
-        # verified_token = await verify_id_token(id_token)
-        # print("Verified ID Token:", verified_token)
-
-        return {
-            "access_token": decoded_access_token,
-            "id_token": decoded_id_token
-        }
+        logger.info("Tokens issued for subject %s", decoded_id_token.get("sub"))
+
+        return Session(
+            access_token=access_token,
+            refresh_token=token.get("refresh_token"),
+            claims=decoded_access_token,
+            id_claims=decoded_id_token,
+            access_token_expires_at=_expires_at(token, decoded_access_token),
+            created_at=time.time(),
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
-async def verify_id_token(id_token: str):
+@timed(AUTH_SECONDS, "verify_id_token", errors=AUTH_ERRORS)
+async def verify_id_token(id_token: str, nonce: str):
     """
-    Verify the ID token using the JWKS from the Microsoft Identity platform.
+    Verify the ID token using the JWKS from the Microsoft Identity platform, and check that it
+    carries the nonce of the login it answers.
     """
     logger.info("Starting ID token verification.")
 
     try:
-        # Fetch the JWKS (JSON Web Key Set) asynchronously from the provider
-        logger.info("Fetching JWKS from %s", JWKS_URL)
-        async with httpx.AsyncClient() as client:
-            response = await client.get(JWKS_URL)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            jwks = response.json()
-            logger.info("Successfully fetched JWKS: %s", jwks)  # Log the JWKS data (consider redacting sensitive info)
-
         # Get the public key ID from the token header
-        logger.info("Extracting 'kid' from the token header.")
         kid = jwt.get_unverified_header(id_token)["kid"]
         logger.info("Public key ID (kid): %s", kid)
 
-        # Find the corresponding public key in the JWKS
-        logger.info("Searching for matching key in JWKS.")
-        rsa_key = next(key for key in jwks["keys"] if key["kid"] == kid)
-        logger.info("Found matching key for kid: %s", kid)
+        # Look up the corresponding public key in the cached JWKS
+        public_key = await get_jwks_cache().get_signing_key(kid)
+        if public_key is None:
+            logger.error("No signing key found for kid: %s", kid)
+            raise HTTPException(status_code=403, detail="Could not validate credentials.")
 
         # Use the RSA public key to verify the token's signature and validate claims
         logger.info("Verifying the ID token signature and validating claims.")
-        verified_token = jwt.decode(id_token, rsa_key, algorithms=["RS256"], audience=oauth_settings.AZURE_CLIENT_ID)
+        verified_token = jwt.decode(id_token, public_key, algorithms=["RS256"],
+                                    audience=get_oauth_settings().AZURE_CLIENT_ID, options={"require": ["nonce"]})
+        if not hmac.compare_digest(str(verified_token["nonce"]), nonce):
+            logger.error("ID token nonce does not match the login")
+            raise HTTPException(status_code=403, detail="Invalid claims in ID token.")
         logger.info("ID token verified successfully.")
 
         return verified_token
@@ -120,105 +146,122 @@ async def verify_id_token(id_token: str):
     except jwt.ExpiredSignatureError:
         logger.error("ID token has expired.")
         raise HTTPException(status_code=403, detail="ID token has expired.")
-    except jwt.JWTClaimsError as claims_error:
+    except (jwt.InvalidAudienceError, jwt.InvalidIssuerError, jwt.MissingRequiredClaimError) as claims_error:
         logger.error("Invalid claims in ID token: %s", claims_error)
         raise HTTPException(status_code=403, detail="Invalid claims in ID token.")
-    except httpx.HTTPStatusError as http_error:
-        logger.error("HTTP error while fetching JWKS: %s", http_error)
-        raise HTTPException(status_code=403, detail="Could not validate credentials.")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("An unexpected error occurred during ID token verification: %s", str(e))
         raise HTTPException(status_code=403, detail="Could not validate credentials.")
 
 
-async def get_access_token(code: str):
-    """Exchange authorization code for an access token."""
+@timed(AUTH_SECONDS, "token_exchange", errors=AUTH_ERRORS)
+async def get_access_token(code: str, http_client: httpx.AsyncClient):
+    """Exchange authorization code for an access token over the shared, pooled HTTP client."""
 
     logger.info("Starting authorization code exchange for access token")
+    settings = get_oauth_settings()
 
-    async with httpx.AsyncClient() as client:
-        try:
-            # Make the POST request to the token URL
-            response = await client.post(
-                TOKEN_URL,
-                data={
-                    'client_id': oauth_settings.AZURE_CLIENT_ID,
-                    'client_secret': oauth_settings.AZURE_CLIENT_SECRET,
-                    'code': code,
-                    'grant_type': 'authorization_code',
-                    'redirect_uri': oauth_settings.REDIRECT_URI,
-                    'scope': oauth_settings.API_SCOPE,
-                },
-            )
-
-            # Log the status of the token request response
-            logger.info(f"Token endpoint responded with status code: {response.status_code}")
+    try:
+        # Make the POST request to the token URL
+        response = await http_client.post(
+            get_endpoints().token,
+            data={
+                'client_id': settings.AZURE_CLIENT_ID,
+                'client_secret': settings.AZURE_CLIENT_SECRET,
+                'code': code,
+                'grant_type': 'authorization_code',
+                'redirect_uri': settings.REDIRECT_URI,
+                'scope': f"{settings.API_SCOPE} offline_access",
+            },
+        )
+
+        # Log the status of the token request response
+        logger.info("Token endpoint responded with status code: %d", response.status_code)
+
+        # Parse the response JSON
+        response_data = response.json()
+
+        # Check if the response contains an error. Only the error code is logged, never the
+        # response itself, which carries the tokens on success
+        if response.status_code != 200:
+            logger.error("Failed to exchange code for token. Error: %s", response_data.get("error"))
+            raise HTTPException(status_code=response.status_code, detail=response_data)
+
+        return response_data
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        # Log any exceptions that occur during the process
+        logger.exception("An error occurred during token exchange: %s", e)
+        raise HTTPException(status_code=500, detail="An error occurred during the token exchange process")
 
-            # Parse the response JSON
-            response_data = response.json()
 
-            logger.info(f"Response data: {response_data}")
+@timed(AUTH_SECONDS, "token_refresh", errors=AUTH_ERRORS)
+async def refresh_access_token(session: Session, http_client: httpx.AsyncClient) -> Session:
+    """Redeem the session's refresh token for a new access token, returning the updated session."""
+    logger.info("Refreshing access token for subject %s", session.id_claims.get("sub"))
+    settings = get_oauth_settings()
 
-            # Check if the response contains an error
-            if response.status_code != 200:
-                logger.error(f"Failed to exchange code for token. Error: {response_data}")
-                raise HTTPException(status_code=response.status_code, detail=response_data)
+    try:
+        response = await http_client.post(
+            get_endpoints().token,
+            data={
+                'client_id': settings.AZURE_CLIENT_ID,
+                'client_secret': settings.AZURE_CLIENT_SECRET,
+                'grant_type': 'refresh_token',
+                'refresh_token': session.refresh_token,
+                'scope': f"{settings.API_SCOPE} offline_access",
+            },
+        )
+
+        # A rejected grant (revoked, expired or already rotated refresh token) ends the session,
+        # anything else is a transient failure of the identity provider
+        if response.status_code in (400, 401):
+            logger.warning("Refresh token rejected with status %d", response.status_code)
+            raise HTTPException(status_code=401, detail="Session expired, please log in again")
+        if response.status_code != 200:
+            logger.error("Token refresh failed with status %d", response.status_code)
+            raise HTTPException(status_code=502, detail="Could not refresh the access token")
+
+        token = response.json()
+        decoded_access_token = jwt.decode(token["access_token"], options={"verify_signature": False},
+                                          algorithms=["RS256"])
+        id_token = token.get("id_token")
+        return session.model_copy(update={
+            "access_token": token["access_token"],
+            # The identity provider may rotate the refresh token; keep the old one if it did not
+            "refresh_token": token.get("refresh_token") or session.refresh_token,
+            "claims": decoded_access_token,
+            "id_claims": jwt.decode(id_token, options={"verify_signature": False}) if id_token else session.id_claims,
+            "access_token_expires_at": _expires_at(token, decoded_access_token),
+        })
+    except (httpx.HTTPError, ValueError, KeyError, TypeError, jwt.PyJWTError) as e:
+        # The identity provider could not be reached, or answered with something other than a
+        # token response; only the error is logged, never the response, which may carry tokens
+        logger.error("Token refresh failed: %s: %s", type(e).__name__, e)
+        raise HTTPException(status_code=502, detail="Could not refresh the access token")
 
-            return response_data
 
-        except Exception as e:
-            # Log any exceptions that occur during the process
-            logger.exception(f"An error occurred during token exchange: {str(e)}")
-            raise HTTPException(status_code=500, detail="An error occurred during the token exchange process")
+def _expires_at(token: dict, decoded_access_token: dict) -> float:
+    return float(decoded_access_token.get("exp") or time.time() + float(token.get("expires_in", 3600)))
 
 
 # Function to check if the token contains the required scopes, based on role hierarchy
 def has_required_scope(token_scopes: List[str], required_scopes: List[str]) -> bool:
     """Check if any of the token's scopes fulfill the required scopes based on the role hierarchy."""
-    logger.debug(f"Checking scopes: Token scopes: {token_scopes}, Required scopes: {required_scopes}")
-
-    for token_scope in token_scopes:
-        # Log which role (token scope) is being checked
-        logger.debug(f"Checking token scope: {token_scope}")
-
-        # Check if the token scope can fulfill the required scope using the role hierarchy
-        for required_scope in required_scopes:
-            if required_scope in ROLE_HIERARCHY.get(token_scope, []):
-                logger.info(
-                    f"Scope match: Token scope '{token_scope}' grants access to required scope '{required_scope}' "
-                    f"based on the role hierarchy.")
-                return True
-            else:
-                logger.debug(f"Token scope '{token_scope}' does not grant access to required scope '{required_scope}'.")
-
-    # If no scopes satisfy the requirement, return False
-    logger.warning(f"No token scopes match the required scopes: {required_scopes}")
+    if scope_policy.allows(scope_policy.mask(token_scopes), scope_policy.requirement(*required_scopes)):
+        return True
+    logger.warning("No token scopes match the required scopes: %s", required_scopes)
     return False
 
 
-# Dependency to validate that the user has the required scope
-async def verify_scope(required_scopes: List[str]):
-    logger.info("Starting scope verification")
-
-    try:
-        # Ensure there's a decoded token available for verification
-        if DECODED_TOKEN is None:
-            logger.error("No token stored for scope verification")
-            raise HTTPException(status_code=401, detail="No token available for verification")
-
-        # Extract the scopes from the stored decoded token (from 'scp' field)
-        token_scopes = DECODED_TOKEN.get("scp", "").split()
-        logger.debug(f"Token scopes extracted: {token_scopes}")
-        logger.debug(f"Required scopes for operation: {required_scopes}")
-
-        # Check if the token has the required scope based on role hierarchy
-        if has_required_scope(token_scopes, required_scopes):
-            logger.info(f"Scope verification successful. Token has the required scopes for the operation.")
-            return DECODED_TOKEN
-        else:
-            logger.warning(f"Scope verification failed. Required: {required_scopes}, Found: {token_scopes}")
-            raise HTTPException(status_code=403, detail="Insufficient scope for this operation")
-
-    except Exception as e:
-        logger.error(f"Error during scope verification: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to verify scope")
+# Validate that the session's access token has the required scope. Routes declare their
+# requirements with session_service.require_scopes instead
+async def verify_scope(session: Session, required_scopes: List[str]):
+    if not scope_policy.allows(scope_policy.claims_mask(session.claims), scope_policy.requirement(*required_scopes)):
+        logger.warning("Scope verification failed. Required: %s", required_scopes)
+        raise HTTPException(status_code=403, detail="Insufficient scope for this operation")
+    return session.claims
@@ -0,0 +1,105 @@
+# client/services/hero_api_client.py
+
+import asyncio
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from client.logger import logger
+from client.models.session import Session
+
+
+class UpstreamResponse(NamedTuple):
+    status_code: int
+    content: bytes
+    media_type: Optional[str]
+    etag: Optional[str]
+
+
+class HeroApiClient:
+    """
+    Forwards hero calls to the server app with the user's access token.
+
+    GET responses carrying an ETag are cached per user and always revalidated with
+    If-None-Match, so the server still authorizes every request but an unchanged payload is
+    answered with an empty 304 and served from the cache. Identical GETs from the same user
+    that arrive while one is in flight share its upstream request.
+    """
+
+    def __init__(self, base_url: str, cache_size: int = 10_000, max_cached_body: int = 1024 * 1024):
+        self.base_url = base_url.rstrip("/")
+        self.cache_size = cache_size
+        self.max_cached_body = max_cached_body
+        self._cache: "OrderedDict[Tuple[str, str], UpstreamResponse]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    @staticmethod
+    def _user(session: Session) -> str:
+        # Azure AD's object id is stable across applications, fall back to the subject
+        return session.claims.get("oid") or session.claims.get("sub") or session.id
+
+    @staticmethod
+    def _authorization(session: Session) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {session.access_token}"}
+
+    async def get(self, http_client: httpx.AsyncClient, session: Session, path: str,
+                  params=None) -> UpstreamResponse:
+        url = str(httpx.URL(f"{self.base_url}{path}", params=params))
+        key = (self._user(session), url)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._revalidate(http_client, session, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so that one caller disconnecting does not cancel the request for the others
+        return await asyncio.shield(task)
+
+    async def send(self, http_client: httpx.AsyncClient, session: Session, method: str, path: str,
+                   content: Optional[bytes] = None) -> UpstreamResponse:
+        headers = self._authorization(session)
+        if content is not None:
+            headers["Content-Type"] = "application/json"
+        response = await self._request(http_client, method, f"{self.base_url}{path}", headers, content)
+        return self._upstream_response(response)
+
+    def clear(self):
+        self._cache.clear()
+
+    async def _revalidate(self, http_client: httpx.AsyncClient, session: Session,
+                          key: Tuple[str, str]) -> UpstreamResponse:
+        headers = self._authorization(session)
+        cached = self._cache.get(key)
+        if cached is not None:
+            headers["If-None-Match"] = cached.etag
+
+        response = await self._request(http_client, "GET", key[1], headers)
+        if response.status_code == 304 and cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        upstream = self._upstream_response(response)
+        if upstream.status_code == 200 and upstream.etag and len(upstream.content) <= self.max_cached_body:
+            self._cache[key] = upstream
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.pop(key, None)
+        return upstream
+
+    @staticmethod
+    async def _request(http_client: httpx.AsyncClient, method: str, url: str, headers: Dict[str, str],
+                       content: Optional[bytes] = None) -> httpx.Response:
+        try:
+            return await http_client.request(method, url, headers=headers, content=content)
+        except httpx.HTTPError as e:
+            logger.error("Hero API request %s %s failed: %s", method, url, e)
+            raise HTTPException(status_code=502, detail="Hero API unavailable")
+
+    @staticmethod
+    def _upstream_response(response: httpx.Response) -> UpstreamResponse:
+        return UpstreamResponse(response.status_code, response.content, response.headers.get("content-type"),
+                                response.headers.get("etag"))
@@ -0,0 +1,107 @@
+# client/services/http_client.py
+
+import asyncio
+import random
+import time
+from typing import Optional
+
+import httpx
+from fastapi import Request
+
+from client.logger import logger
+from client.services.metrics import Counter, Histogram
+
+OUTBOUND_SECONDS = Histogram("http_client_request_seconds",
+                             "Latency of outbound HTTP attempts, up to the response headers.", ["host", "method"])
+# Reason is the exception class for failed connections, or the status of a retryable response
+OUTBOUND_ERRORS = Counter("http_client_errors_total", "Outbound HTTP attempts that failed.", ["host", "reason"])
+
+# Statuses worth retrying: throttling and transient server-side failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Statuses after which the request is known not to have been processed, so that even
+# non-idempotent requests such as the authorization code exchange may be retried
+NOT_PROCESSED_STATUSES = {429, 503}
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """
+    Transport wrapper that retries transient failures with exponential backoff and full jitter.
+
+    Connection failures are always retried since the request never reached the server. Error
+    responses are retried for idempotent methods, and for other methods only when the status
+    guarantees the request was not processed. A Retry-After header, when present, replaces the
+    computed delay up to `backoff_max`.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, retries: int = 3, backoff_factor: float = 0.25,
+                 backoff_max: float = 5.0):
+        self.transport = transport
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                OUTBOUND_ERRORS.labels(request.url.host, type(e).__name__).inc()
+                if attempt >= self.retries or not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning("%s %s failed to connect (%s), retrying in %.2fs", request.method, request.url, e, delay)
+            else:
+                OUTBOUND_SECONDS.labels(request.url.host, request.method).observe(time.perf_counter() - started)
+                if response.status_code in RETRY_STATUSES:
+                    OUTBOUND_ERRORS.labels(request.url.host, str(response.status_code)).inc()
+                if attempt >= self.retries or not self._should_retry(request, response):
+                    return response
+                delay = self._retry_after(response) or self._backoff(attempt)
+                await response.aclose()
+                logger.warning("%s %s returned %d, retrying in %.2fs",
+                               request.method, request.url, response.status_code, delay)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    @staticmethod
+    def _should_retry(request: httpx.Request, response: httpx.Response) -> bool:
+        if request.method in IDEMPOTENT_METHODS:
+            return response.status_code in RETRY_STATUSES
+        return response.status_code in NOT_PROCESSED_STATUSES
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * 2 ** attempt))
+
+    def _retry_after(self, response: httpx.Response) -> Optional[float]:
+        retry_after = response.headers.get("retry-after", "")
+        if not retry_after.isdigit():
+            return None
+        return min(float(retry_after), self.backoff_max)
+
+
+def create_http_client(settings) -> httpx.AsyncClient:
+    """Build the application-scoped client: pooled keep-alive connections, HTTP/2, timeouts and retries."""
+    transport = httpx.AsyncHTTPTransport(
+        http2=settings.HTTP2,
+        limits=httpx.Limits(max_connections=settings.HTTP_MAX_CONNECTIONS,
+                            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY),
+    )
+    return httpx.AsyncClient(
+        transport=RetryTransport(transport, retries=settings.HTTP_RETRIES,
+                                 backoff_factor=settings.HTTP_BACKOFF_FACTOR, backoff_max=settings.HTTP_BACKOFF_MAX),
+        timeout=httpx.Timeout(settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    """Dependency returning the client created by the application's lifespan handler."""
+    return request.app.state.http_client
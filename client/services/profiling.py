@@ -0,0 +1,221 @@
+# client/services/profiling.py
+
+import asyncio
+import cProfile
+import hashlib
+import hmac
+import itertools
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Union
+
+# Header carrying a signed request to profile, see sign_profile_request
+PROFILE_HEADER = b"x-profile-request"
+# Responses that stay open for as long as their client listens
+EVENT_STREAM_MEDIA_TYPE = b"text/event-stream"
+
+
+class RecordedProfile(NamedTuple):
+    id: int
+    kind: str
+    method: str
+    path: str
+    status: int
+    started_at: float
+    duration_ms: float
+    # Marshalled pstats data for cprofile, sample counts per collapsed stack for sampling
+    data: Union[bytes, Dict[str, int]]
+
+
+class ProfileStore:
+    """Ring buffer of the most recent request profiles."""
+
+    def __init__(self, size: int = 50):
+        self._profiles: Deque[RecordedProfile] = deque(maxlen=size)
+        self._ids = itertools.count(1)
+
+    def add(self, kind: str, method: str, path: str, status: int, started_at: float, duration_ms: float,
+            data: Union[bytes, Dict[str, int]]) -> RecordedProfile:
+        profile = RecordedProfile(next(self._ids), kind, method, path, status, started_at, duration_ms, data)
+        self._profiles.append(profile)
+        return profile
+
+    def get(self, profile_id: int) -> Optional[RecordedProfile]:
+        return next((profile for profile in self._profiles if profile.id == profile_id), None)
+
+    def list(self) -> List[RecordedProfile]:
+        return list(reversed(self._profiles))
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread every `interval` seconds from a background thread and
+    counts the samples per stack.
+
+    A busy thread only lets the sampler run once per switch interval (5ms by default), so the
+    switch interval is lowered to `interval` while sampling.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._thread_id: Optional[int] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._switch_interval = sys.getswitchinterval()
+
+    def start(self):
+        # Sample the thread that started the sampler, i.e. the event loop's
+        self._thread_id = threading.get_ident()
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self.interval, self._switch_interval))
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict[str, int]:
+        self._stopped.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+        return dict(self.stacks)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+
+class CallProfiler:
+    """cProfile around a request, with the same start/stop interface as StackSampler."""
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self) -> bytes:
+        self._profile.disable()
+        # Same format as pstats.Stats.dump_stats, loadable with pstats.Stats(path)
+        return marshal.dumps(pstats.Stats(self._profile).stats)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling a random `sample_rate` fraction of requests, and every request
+    carrying a valid signed X-Profile-Request header, into `store`.
+
+    Profiles cover the event loop thread while the request is in flight, so work done for
+    other requests at the same time shows up as well. One request is profiled at a time;
+    requests selected while another is being profiled run unprofiled. A profile ends once
+    `max_duration` seconds have passed, or as soon as a Server-Sent Events response starts,
+    so that long-lived streams neither hold the profiler nor keep the switch interval lowered.
+    """
+
+    def __init__(self, app, store: ProfileStore, mode: str = "sampling", interval: float = 0.001,
+                 sample_rate: float = 0.0, secret: Optional[str] = None, max_duration: float = 30.0):
+        self.app = app
+        self.store = store
+        self.mode = mode
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.max_duration = max_duration
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            deadline.cancel()
+            data = profiler.stop()
+            duration_ms = (time.perf_counter() - started) * 1000
+            self._active = False
+            self.store.add(self.mode, scope["method"], scope["path"], status, started_at, duration_ms, data)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if _is_event_stream(message):
+                    finish()
+            await send(message)
+
+        self._active = True
+        profiler = StackSampler(self.interval) if self.mode == "sampling" else CallProfiler()
+        started_at, started = time.time(), time.perf_counter()
+        profiler.start()
+        deadline = asyncio.get_running_loop().call_later(self.max_duration, finish)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            finish()
+
+    def _selected(self, scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if self.secret:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return verify_profile_request(self.secret, value.decode("latin-1"))
+        return False
+
+
+def sign_profile_request(secret: str, ttl: float = 300.0) -> str:
+    """X-Profile-Request header value valid for `ttl` seconds."""
+    expires = str(int(time.time() + ttl))
+    return f"{expires}.{_signature(secret, expires)}"
+
+
+def verify_profile_request(secret: str, value: str) -> bool:
+    expires, _, signature = value.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(secret, expires))
+
+
+def to_collapsed(profile: RecordedProfile) -> str:
+    """Sampled stacks in the collapsed format read by flamegraph.pl and speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(profile.data.items()))
+
+
+def _is_event_stream(message) -> bool:
+    return any(name == b"content-type" and value.split(b";")[0].strip().lower() == EVENT_STREAM_MEDIA_TYPE
+               for name, value in message.get("headers", ()))
+
+
+def _signature(secret: str, expires: str) -> str:
+    return hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+if __name__ == "__main__":
+    # Print a header value for profiling one request, e.g.
+    #   curl -H "X-Profile-Request: $(python -m client.services.profiling)" ...
+    from client.config.profiling import profiling_settings
+
+    if not profiling_settings.PROFILING_SECRET:
+        sys.exit("PROFILING_SECRET is not set")
+    print(sign_profile_request(profiling_settings.PROFILING_SECRET))
@@ -0,0 +1,227 @@
+# client/services/session_service.py
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+from fastapi import Depends, HTTPException, Request, Response
+
+from client.config import session_settings
+from client.logger import logger
+from client.models.session import Session
+from client.services.auth_service import refresh_access_token, scope_policy
+from client.services.http_client import get_http_client
+from client.services.session_store import SessionStore, create_session_store
+
+# Seconds a finished refresh is remembered, so that requests which loaded the session before
+# the refreshed record was stored reuse its result instead of redeeming the refresh token again
+REFRESH_RESULT_GRACE = 30.0
+
+# Seconds a login may spend at the identity provider before its callback is refused
+LOGIN_TTL = 600
+
+
+class SessionService:
+    """
+    Creates and resolves user sessions, and keeps their access tokens fresh.
+
+    The cookie only carries a random session id and an HMAC-SHA256 signature of it; tokens and
+    claims stay in the server-side store. Cookies with a bad signature are rejected before the
+    store is consulted.
+
+    A login is bound to the browser that started it: its state and nonce travel in a signed
+    cookie, named after the state so that logins in several tabs do not overwrite each other,
+    and the callback is refused unless it returns that state within LOGIN_TTL seconds.
+
+    Access tokens are refreshed in the background once they are within `refresh_margin` seconds
+    of expiry, while requests keep using the still valid token. Refreshes are single-flight per
+    session: concurrent requests share one in-flight call to the token endpoint, and only
+    requests holding an already expired token wait for it. Coalescing is per process; workers
+    sharing a SQLite store may each refresh once.
+    """
+
+    def __init__(self, store: SessionStore, secret: bytes, cookie_name: str, cookie_secure: bool,
+                 refresh_margin: float = 300.0):
+        self.store = store
+        self.cookie_name = cookie_name
+        self.cookie_secure = cookie_secure
+        self.refresh_margin = refresh_margin
+        self._secret = secret
+        self._refreshes: Dict[str, asyncio.Task] = {}
+
+    def _signature(self, session_id: str) -> str:
+        digest = hmac.new(self._secret, session_id.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+    def sign(self, session_id: str) -> str:
+        return f"{session_id}.{self._signature(session_id)}"
+
+    def unsign(self, cookie: str) -> Optional[str]:
+        """Return the session id carried by a cookie value, or None if its signature does not match."""
+        session_id, _, signature = cookie.rpartition(".")
+        if not session_id or not hmac.compare_digest(signature, self._signature(session_id)):
+            return None
+        return session_id
+
+    async def create_session(self, session: Session, response: Response) -> Session:
+        session.id = secrets.token_urlsafe(32)
+        session.created_at = time.time()
+        await self.store.put(session)
+        response.set_cookie(self.cookie_name, self.sign(session.id), max_age=self.store.ttl,
+                            httponly=True, secure=self.cookie_secure, samesite="lax")
+        logger.info("Session created for subject %s", session.id_claims.get("sub"))
+        return session
+
+    def _login_cookie_name(self, state: str) -> str:
+        return f"{self.cookie_name}_login_{state[:16]}"
+
+    @staticmethod
+    def new_login() -> Tuple[str, str]:
+        """Draw the state and nonce of a new login."""
+        return secrets.token_urlsafe(32), secrets.token_urlsafe(32)
+
+    def set_login_cookie(self, response: Response, state: str, nonce: str):
+        """Bind a login's state and nonce to the browser with a short-lived signed cookie."""
+        value = self.sign(f"login:{state}:{nonce}:{int(time.time()) + LOGIN_TTL}")
+        response.set_cookie(self._login_cookie_name(state), value, max_age=LOGIN_TTL,
+                            httponly=True, secure=self.cookie_secure, samesite="lax")
+
+    def finish_login(self, request: Request, response: Response, state: Optional[str]) -> str:
+        """
+        Check that a callback returns the state of a login this browser started and clear its
+        cookie, returning the nonce the ID token must carry. Fails with 400 otherwise.
+        """
+        if state:
+            cookie_name = self._login_cookie_name(state)
+            cookie = request.cookies.get(cookie_name)
+            value = self.unsign(cookie) if cookie else None
+            response.delete_cookie(cookie_name, httponly=True, secure=self.cookie_secure, samesite="lax")
+            # Session cookies are signed with the same key, hence the prefix
+            fields = value.split(":") if value is not None else []
+            if len(fields) == 4 and fields[0] == "login":
+                _, expected_state, nonce, expires = fields
+                if hmac.compare_digest(expected_state, state) and int(expires) > time.time():
+                    return nonce
+        logger.warning("Rejected login callback without the state of a login started by this browser")
+        raise HTTPException(status_code=400, detail="Login state does not match, please log in again")
+
+    async def get_session(self, request: Request) -> Optional[Session]:
+        cookie = request.cookies.get(self.cookie_name)
+        if not cookie:
+            return None
+        session_id = self.unsign(cookie)
+        if session_id is None:
+            logger.warning("Rejected session cookie with an invalid signature")
+            return None
+        return await self.store.get(session_id)
+
+    async def delete_session(self, request: Request, response: Response):
+        session = await self.get_session(request)
+        if session is not None:
+            await self.store.delete(session.id)
+        response.delete_cookie(self.cookie_name, httponly=True, secure=self.cookie_secure, samesite="lax")
+
+    async def ensure_fresh(self, session: Session, http_client: httpx.AsyncClient) -> Session:
+        """Return a session whose access token is valid, refreshing it if it is expired or about to be."""
+        remaining = session.access_token_expires_at - time.time()
+        if remaining > self.refresh_margin:
+            return session
+        if not session.refresh_token:
+            if remaining > 0:
+                return session
+            await self.store.delete(session.id)
+            raise HTTPException(status_code=401, detail="Session expired, please log in again")
+
+        task = self._refreshes.get(session.id)
+        if task is not None and task.done():
+            failed = task.cancelled() or task.exception() is not None
+            if not failed and task.result().access_token_expires_at - time.time() > self.refresh_margin:
+                # Recently refreshed, the caller just loaded the record from before the refresh
+                return task.result()
+            if failed and remaining > 0:
+                # The last attempt failed moments ago, keep using the current token rather than retry
+                return session
+            task = None
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._refresh(session, http_client))
+            self._refreshes[session.id] = task
+            task.add_done_callback(lambda done: self._refresh_done(session.id, done))
+
+        if remaining > 0:
+            return session
+        # Shielded so that a client disconnecting does not cancel the refresh for everyone else
+        return await asyncio.shield(task)
+
+    async def _refresh(self, session: Session, http_client: httpx.AsyncClient) -> Session:
+        try:
+            refreshed = await refresh_access_token(session, http_client)
+        except HTTPException as e:
+            if e.status_code == 401:
+                await self.store.delete(session.id)
+            raise
+        # The session may have ended while the token endpoint was answering, by logging out or expiring
+        if not await self.store.replace(refreshed):
+            raise HTTPException(status_code=401, detail="Session ended, please log in again")
+        return refreshed
+
+    def _refresh_done(self, session_id: str, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background token refresh failed: %s", task.exception())
+
+        def forget():
+            if self._refreshes.get(session_id) is task:
+                del self._refreshes[session_id]
+
+        asyncio.get_running_loop().call_later(REFRESH_RESULT_GRACE, forget)
+
+    async def close(self):
+        for task in self._refreshes.values():
+            task.cancel()
+        self._refreshes.clear()
+        await self.store.close()
+
+
+def _session_secret() -> bytes:
+    if session_settings.SESSION_SECRET:
+        return session_settings.SESSION_SECRET.encode()
+    logger.warning("SESSION_SECRET is not set, session cookies are only valid for this process")
+    return secrets.token_bytes(32)
+
+
+session_service = SessionService(
+    create_session_store(session_settings),
+    _session_secret(),
+    session_settings.SESSION_COOKIE_NAME,
+    session_settings.SESSION_COOKIE_SECURE,
+    session_settings.SESSION_REFRESH_MARGIN,
+)
+
+
+async def get_current_session(request: Request, http_client: httpx.AsyncClient = Depends(get_http_client)) -> Session:
+    """Dependency resolving the session of the calling user, with a valid access token, or failing with 401."""
+    session = await session_service.get_session(request)
+    if session is None:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    return await session_service.ensure_fresh(session, http_client)
+
+
+def require_scopes(*required_scopes: str):
+    """
+    Build a dependency that resolves the caller's session and rejects it unless its access
+    token grants any of `required_scopes`. The requirement is compiled when the route is
+    declared; each request costs one AND.
+    """
+    requirement = scope_policy.requirement(*required_scopes)
+
+    async def dependency(session: Session = Depends(get_current_session)) -> Session:
+        if not scope_policy.allows(scope_policy.claims_mask(session.claims), requirement):
+            logger.warning("No token scopes match the required scopes: %s", required_scopes)
+            raise HTTPException(status_code=403, detail="Insufficient scope for this operation")
+        return session
+
+    return dependency
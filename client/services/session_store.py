@@ -0,0 +1,202 @@
+# client/services/session_store.py
+
+import asyncio
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from client.logger import logger
+from client.models.session import Session
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+"""
+
+UPSERT_SESSION = "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)"
+SELECT_SESSION = "SELECT data FROM sessions WHERE id = ? AND expires_at > ?"
+UPDATE_SESSION = "UPDATE sessions SET data = ? WHERE id = ? AND expires_at > ?"
+DELETE_SESSION = "DELETE FROM sessions WHERE id = ?"
+DELETE_EXPIRED = "DELETE FROM sessions WHERE expires_at <= ?"
+# Keeps the `max_sessions` sessions that expire last, i.e. the most recently created ones
+DELETE_OVERFLOW = """
+DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)
+"""
+
+# Number of writes between two sweeps of expired and surplus sessions in the SQLite store
+PRUNE_EVERY = 256
+
+
+class SessionStore(ABC):
+    """
+    Storage for server-side session records, keyed by session id.
+
+    Sessions expire `ttl` seconds after they were first stored; updating a session, e.g. after
+    a token refresh, keeps its original expiry. At most `max_sessions` sessions are kept.
+    """
+
+    def __init__(self, ttl: float, max_sessions: int):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[Session]:
+        ...
+
+    @abstractmethod
+    async def put(self, session: Session):
+        ...
+
+    @abstractmethod
+    async def replace(self, session: Session) -> bool:
+        """Update a session still stored, returning False, and storing nothing, once it is gone."""
+
+    @abstractmethod
+    async def delete(self, session_id: str):
+        ...
+
+    async def close(self):
+        pass
+
+    def _expires_at(self, session: Session) -> float:
+        return session.created_at + self.ttl
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Default store: an LRU of sessions in process memory.
+
+    Lookups are a dict access; once `max_sessions` is reached the least recently used session
+    is evicted, so memory stays bounded however many users log in. Sessions are private to
+    the worker process that created them.
+    """
+
+    def __init__(self, ttl: float, max_sessions: int):
+        super().__init__(ttl, max_sessions)
+        self._sessions: "OrderedDict[str, Tuple[float, Session]]" = OrderedDict()
+
+    async def get(self, session_id: str) -> Optional[Session]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+
+        expires_at, session = entry
+        if time.time() >= expires_at:
+            del self._sessions[session_id]
+            return None
+
+        self._sessions.move_to_end(session_id)
+        return session
+
+    async def put(self, session: Session):
+        self._sessions[session.id] = (self._expires_at(session), session)
+        self._sessions.move_to_end(session.id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    async def replace(self, session: Session) -> bool:
+        entry = self._sessions.get(session.id)
+        if entry is None or time.time() >= entry[0]:
+            return False
+        self._sessions[session.id] = (entry[0], session)
+        return True
+
+    async def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite database file, shared by every worker process pointed at it.
+
+    Lookups go through the primary key. Expired sessions, and the oldest sessions beyond
+    `max_sessions`, are swept every PRUNE_EVERY writes rather than on each request. Calls run
+    on a small thread pool, each worker holding its own connection.
+    """
+
+    def __init__(self, path: str, ttl: float, max_sessions: int, pool_size: int = 4):
+        super().__init__(ttl, max_sessions)
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._writes = 0
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="session-sqlite")
+
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+        logger.info("SQLite session store ready at %s", path)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("PRAGMA busy_timeout = 5000")
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def get(self, session_id: str) -> Optional[Session]:
+        return await self._run(self._get, session_id)
+
+    async def put(self, session: Session):
+        self._writes += 1
+        await self._run(self._put, session, self._writes % PRUNE_EVERY == 0)
+
+    async def replace(self, session: Session) -> bool:
+        # A single statement, so a session deleted by any worker in the meantime is never written back
+        return await self._run(lambda: self._connection().execute(
+            UPDATE_SESSION, (session.model_dump_json(), session.id, time.time())).rowcount == 1)
+
+    async def delete(self, session_id: str):
+        await self._run(lambda: self._connection().execute(DELETE_SESSION, (session_id,)))
+
+    async def close(self):
+        # Wait for calls still running on the pool without blocking the event loop
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+    def _get(self, session_id: str) -> Optional[Session]:
+        row = self._connection().execute(SELECT_SESSION, (session_id, time.time())).fetchone()
+        return Session.model_validate_json(row[0]) if row else None
+
+    def _put(self, session: Session, prune: bool):
+        connection = self._connection()
+        connection.execute(UPSERT_SESSION, (session.id, session.model_dump_json(), self._expires_at(session)))
+        if prune:
+            expired = connection.execute(DELETE_EXPIRED, (time.time(),)).rowcount
+            evicted = connection.execute(DELETE_OVERFLOW, (self.max_sessions,)).rowcount
+            logger.info("Pruned %d expired and %d surplus sessions", expired, evicted)
+
+
+def create_session_store(settings) -> SessionStore:
+    """Build the store selected by SESSION_STORE."""
+    if settings.SESSION_STORE == "sqlite":
+        return SQLiteSessionStore(settings.SESSION_SQLITE_PATH, settings.SESSION_TTL, settings.SESSION_MAX_COUNT)
+    return InMemorySessionStore(settings.SESSION_TTL, settings.SESSION_MAX_COUNT)
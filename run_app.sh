@@ -26,4 +26,4 @@ pip install -r server/requirements.txt
 
 # Run the FastAPI application using uvicorn
 echo "Starting FastAPI application..."
-python -m uvicorn server.main:app
\ No newline at end of file
+python -m uvicorn server.main:create_app --factory
\ No newline at end of file
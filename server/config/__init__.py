@@ -0,0 +1,9 @@
+# server/config/__init__.py
+
+from .encoding import encoding_settings
+from .events import events_settings
+from .oauth import get_oauth_settings
+from .profiling import profiling_settings
+from .storage import storage_settings
+
+__all__ = ["encoding_settings", "events_settings", "get_oauth_settings", "profiling_settings", "storage_settings"]
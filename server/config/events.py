@@ -0,0 +1,19 @@
+# server/config/events.py
+
+from dotenv import load_dotenv
+from pydantic_settings import BaseSettings
+
+load_dotenv()
+
+
+class EventSettings(BaseSettings):
+    """The hero change feed served at /api/heroes/events."""
+    # Most recent events kept for subscribers resuming with Last-Event-ID
+    HERO_EVENTS_REPLAY_SIZE: int = 10_000
+    # Events a subscriber may fall behind before it is told to resync and disconnected
+    HERO_EVENTS_MAX_BACKLOG: int = 1_000
+    # Seconds between keepalive comments on an idle stream
+    HERO_EVENTS_KEEPALIVE: float = 15.0
+
+
+events_settings = EventSettings()
@@ -0,0 +1,49 @@
+# server/config/oauth.py
+
+import functools
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from pydantic_settings import BaseSettings
+from server import logger
+
+load_dotenv()
+
+class OAuthSettings(BaseSettings):
+    AZURE_TENANT_ID: str
+    AZURE_CLIENT_ID: str  # Application (client) ID of the API's app registration
+    API_AUDIENCE: Optional[str] = None  # Defaults to api://<AZURE_CLIENT_ID>
+    CLAIMS_CACHE_SIZE: int = 10000
+
+    class Config:
+        env_file = ".env_oauth"
+        extra = "ignore"
+
+
+def initialize_oauth_settings():
+    try:
+        # Create an instance of OAuthSettings
+        internal_oauth_settings = OAuthSettings()
+
+        # Check if the required OAuth fields are set
+        if not internal_oauth_settings.AZURE_TENANT_ID or not internal_oauth_settings.AZURE_CLIENT_ID:
+            logger.logger.error("One or more required OAuth environment variables are missing.")
+            raise HTTPException(status_code=500,
+                                detail="Configuration error: Required OAuth environment variables are missing.")
+
+        logger.logger.info("OAuth settings loaded successfully.")
+        return internal_oauth_settings
+    except FileNotFoundError:
+        logger.logger.critical(".env file not found.")
+        raise HTTPException(status_code=500, detail="Configuration error: .env file not found.")
+    except Exception as e:
+        logger.logger.critical("Error loading OAuth settings: %s", e)
+        raise HTTPException(status_code=500,
+                            detail="Configuration error: An error occurred while loading OAuth settings.")
+
+
+# Loaded on first use rather than on import, so that the app can be imported and built without them
+@functools.lru_cache(maxsize=None)
+def get_oauth_settings() -> OAuthSettings:
+    return initialize_oauth_settings()
@@ -0,0 +1,25 @@
+# server/config/storage.py
+
+from typing import Literal
+
+from dotenv import load_dotenv
+from pydantic_settings import BaseSettings
+
+load_dotenv()
+
+
+class StorageSettings(BaseSettings):
+    HERO_STORAGE_BACKEND: Literal["memory", "journal", "sqlite"] = "memory"
+    HERO_SQLITE_PATH: str = "heroes.db"
+    HERO_SQLITE_POOL_SIZE: int = 4
+    # Directory of the journal and snapshots, when to fsync journal writes, and the number of
+    # journaled creates and deletes between snapshots
+    HERO_JOURNAL_DIR: str = "hero_journal"
+    HERO_JOURNAL_FSYNC: Literal["always", "batch", "never"] = "batch"
+    HERO_JOURNAL_SNAPSHOT_EVERY: int = 100_000
+    # Heroes whose JSON encoding is kept, and the largest full-roster response body kept
+    HERO_ENCODED_CACHE_SIZE: int = 100_000
+    HERO_LIST_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+
+storage_settings = StorageSettings()
@@ -1,17 +1,93 @@
 # server/main.py
 
+import os
+from contextlib import asynccontextmanager
+
+import httpx
 import uvicorn
 from fastapi import FastAPI
 
-from server.routers import heroes
+from server.config import events_settings, profiling_settings, storage_settings
+from server.logger import LoggingSettings, configure_logging, stop_logging
+from server.routers import heroes, metrics, profiling
+from server.services.auth_service import get_token_verifier
+from server.services.hero_backend import create_hero_backend
+from server.services.hero_events import HeroEventHub
+from server.services.hero_service import HeroService
+from server.services.metrics import MetricsMiddleware
+from server.services.profiling import ProfilingMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the OAuth settings and build the token verifier at startup, so that a missing
+    # setting stops the worker here rather than failing its first request
+    jwks_cache = get_token_verifier().jwks_cache
+    # Load the roster from durable storage, e.g. replay the hero journal
+    await app.state.hero_service.open()
+    # One pooled client for every signing key fetch, instead of a new connection each time
+    async with httpx.AsyncClient() as http_client:
+        jwks_cache.http_client = http_client
+        try:
+            yield
+        finally:
+            await jwks_cache.stop()
+            jwks_cache.http_client = None
+            # Release the hero storage engine, e.g. the SQLite connection pool, or snapshot the journal
+            await app.state.hero_service.close()
+            stop_logging(app.state.log_listener)
+
+
+def create_app() -> FastAPI:
+    """
+    Build the application. Nothing is loaded or connected on import; logging is configured and
+    the hero service built here, and storage opened and shared resources created by the
+    lifespan handler, once per worker process.
+    """
+    app = FastAPI(
+        title="Hero API",
+        description="An API to manage heroes secure by OAuth 2.0 auth code flow",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+    app.state.log_listener = configure_logging(LoggingSettings())
+
+    # Resolved by routes through heroes.get_hero_service; the storage engine connects in open()
+    app.state.hero_service = HeroService(
+        create_hero_backend(storage_settings), storage_settings.HERO_ENCODED_CACHE_SIZE,
+        storage_settings.HERO_LIST_CACHE_MAX_BYTES,
+        HeroEventHub(events_settings.HERO_EVENTS_REPLAY_SIZE, events_settings.HERO_EVENTS_MAX_BACKLOG,
+                     events_settings.HERO_EVENTS_KEEPALIVE))
+
+    app.include_router(heroes.router, prefix="/api", tags=["Heroes"])
+    app.include_router(metrics.router)
+
+    # Per-route latency and in-flight requests, exposed at /metrics
+    app.add_middleware(MetricsMiddleware)
+
+    # Opt-in profiling of sampled or explicitly requested requests; nothing is installed unless enabled
+    if profiling_settings.PROFILING_ENABLED:
+        app.add_middleware(ProfilingMiddleware, store=profiling.profile_store, mode=profiling_settings.PROFILING_MODE,
+                           interval=profiling_settings.PROFILING_INTERVAL,
+                           sample_rate=profiling_settings.PROFILING_SAMPLE_RATE,
+                           secret=profiling_settings.PROFILING_SECRET,
+                           max_duration=profiling_settings.PROFILING_MAX_DURATION)
+        app.include_router(profiling.router, prefix="/debug", tags=["Profiling"])
+
+    return app
+
 
-app = FastAPI(
-    title="Hero API",
-    description="An API to manage heroes secure by OAuth 2.0 auth code flow",
-    version="1.0.0"
-)
+def worker_count() -> int:
+    """
+    WEB_CONCURRENCY, 1 by default. Workers share nothing in memory, so more than one is only
+    allowed when they share the roster through SQLite; a journal is locked by a single process.
+    """
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    if workers > 1 and storage_settings.HERO_STORAGE_BACKEND != "sqlite":
+        raise SystemExit(f"WEB_CONCURRENCY={workers} requires HERO_STORAGE_BACKEND=sqlite, "
+                         f"or each worker would serve its own roster")
+    return workers
 
-app.include_router(heroes.router, prefix="/api", tags=["Heroes"])
 
 if __name__ == '__main__':
-    uvicorn.run('main:app', host='0.0.0.0', port=8000)
+    uvicorn.run('server.main:create_app', factory=True, host='0.0.0.0', port=8000, workers=worker_count())
@@ -1,5 +1,6 @@
 # server/models/__init__.py
 
 from .dnd_hero import DnDHero, AbilityScores, SkillProficiencies, Equipment, Spell
+from .hero_query import HeroQuery
 
-__all__ = ["DnDHero", "AbilityScores", "SkillProficiencies", "Equipment", "Spell"]
\ No newline at end of file
+__all__ = ["DnDHero", "AbilityScores", "SkillProficiencies", "Equipment", "Spell", "HeroQuery"]
\ No newline at end of file
@@ -1,11 +1,11 @@
 # server/models/dnd_hero.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import List, Optional
-from client.models.ability_scores import AbilityScores
-from client.models.equipment import Equipment
-from client.models.skill_proficiencies import SkillProficiencies
-from client.models.spell import Spell
+from server.models.ability_scores import AbilityScores
+from server.models.equipment import Equipment
+from server.models.skill_proficiencies import SkillProficiencies
+from server.models.spell import Spell
 
 
 class DnDHero(BaseModel):
@@ -32,3 +32,9 @@ class DnDHero(BaseModel):
     ideals: Optional[str] = None
     bonds: Optional[str] = None
     flaws: Optional[str] = None
+
+    # Heroes with the same proficiencies share one immutable instance rather than 18 booleans each
+    @field_validator("skill_proficiencies")
+    @classmethod
+    def intern_skill_proficiencies(cls, skills: SkillProficiencies) -> SkillProficiencies:
+        return skills.intern()
@@ -1,9 +1,14 @@
 # server/models/skill_proficiencies.py
 
-from pydantic import BaseModel
+from typing import ClassVar, Dict, List
+
+from pydantic import BaseModel, ConfigDict
 
 
 class SkillProficiencies(BaseModel):
+    # Immutable, so that heroes with the same proficiencies can share one instance
+    model_config = ConfigDict(frozen=True)
+
     acrobatics: bool = False
     animal_handling: bool = False
     arcana: bool = False
@@ -22,3 +27,32 @@ class SkillProficiencies(BaseModel):
     sleight_of_hand: bool = False
     stealth: bool = False
     survival: bool = False
+
+    # One instance per distinct combination, by bitmask; there are at most 2 ** 18 of them
+    _interned: ClassVar[Dict[int, "SkillProficiencies"]] = {}
+
+    def to_mask(self) -> int:
+        """Encode the proficiencies as a bitmask, bit i set for the i-th skill in field order."""
+        return sum(1 << bit for bit, skill in enumerate(SKILLS) if getattr(self, skill))
+
+    @classmethod
+    def from_mask(cls, mask: int) -> "SkillProficiencies":
+        """The shared instance holding the proficiencies encoded by `mask`."""
+        skills = cls._interned.get(mask)
+        if skills is None:
+            skills = cls.model_construct(**{skill: bool(mask >> bit & 1) for bit, skill in enumerate(SKILLS)})
+            cls._interned[mask] = skills
+        return skills
+
+    def intern(self) -> "SkillProficiencies":
+        return self.from_mask(self.to_mask())
+
+
+# Skill names in bit order
+SKILLS = tuple(SkillProficiencies.model_fields)
+SKILL_BITS = {skill: bit for bit, skill in enumerate(SKILLS)}
+
+
+def skills_mask(skills: List[str]) -> int:
+    """Bitmask requiring every named skill; raises KeyError for an unknown skill."""
+    return sum(1 << SKILL_BITS[skill] for skill in set(skills))
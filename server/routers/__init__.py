@@ -1,3 +1,3 @@
 # server/routers/__init__.py
 
-__all__ = ["heroes"]
+__all__ = ["heroes", "metrics", "profiling"]
@@ -1,41 +1,389 @@
 # server/routers/heroes.py
 
+import json
 from http.client import HTTPException
-from typing import List
-from fastapi import APIRouter
+from typing import Annotated, AsyncIterator, Dict, List, Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
 from fastapi import HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import Field, TypeAdapter, ValidationError
 from server.models.dnd_hero import DnDHero
-from server.services.hero_service import HeroService
+from server.config import encoding_settings
+from server.models.hero_query import HeroQuery
+from server.services.auth_service import require_scopes
+from server.services.content_negotiation import (MSGPACK_MEDIA_TYPES, VARY, BodyTooLargeError, ContentNegotiator,
+                                                 UnsupportedEncodingError, decode_msgpack, decompress,
+                                                 representation_etag, wire_etag)
+from server.services.hero_analytics import CategoricalField, NumericField
+from server.services.hero_service import HeroService, decode_cursor
 
 router = APIRouter()
-hero_service = HeroService()
+negotiator = ContentNegotiator(encoding_settings.RESPONSE_ENCODINGS, encoding_settings.RESPONSE_COMPRESSION_MIN_SIZE,
+                               encoding_settings.GZIP_LEVEL, encoding_settings.BROTLI_QUALITY,
+                               encoding_settings.ZSTD_LEVEL, encoding_settings.ENCODED_BODY_CACHE_MAX_BYTES)
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BULK_ITEMS = 10000
+MAX_PERCENTILES = 20
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Capped, so that validating an oversized batch stops as soon as it passes the limit
+hero_list_adapter = TypeAdapter(Annotated[List[DnDHero], Field(max_length=MAX_BULK_ITEMS)])
+hero_id_list_adapter = TypeAdapter(Annotated[List[str], Field(max_length=MAX_BULK_ITEMS)])
+hero_id_adapter = TypeAdapter(str)
+
+
+async def get_hero_service(request: Request) -> HeroService:
+    """
+    Dependency resolving the HeroService that create_app() keeps on the application state.
+    Declared async so that it runs on the event loop rather than in the thread pool.
+    """
+    return request.app.state.hero_service
+
+
+# Hero responses are encoded straight to bytes by HeroService.encode_hero, reusing the cached
+# encoding of unchanged heroes. Heroes were validated when they were created, so re-validating
+# them through response_model on the way out would only repeat that work; the response models
+# declared on the routes document the payloads. The JSON is then converted to MessagePack and
+# compressed as the request's Accept and Accept-Encoding ask, and bulk uploads may be sent as
+# MessagePack and compressed too.
 
 # POST: Create a new Hero
-@router.post("/heroes/", response_model=DnDHero)
-async def create_hero(hero: DnDHero):
-    return await hero_service.create_hero(hero)
+@router.post("/heroes/", response_model=DnDHero, dependencies=[Depends(require_scopes("Heroes.Create"))])
+async def create_hero(hero: DnDHero, request: Request, hero_service: HeroService = Depends(get_hero_service)):
+    return await _hero_response(request, hero_service.encode_hero(await hero_service.create_hero(hero)))
+
+
+# POST: Create many heroes from a JSON array, an NDJSON stream or a MessagePack array, reporting the outcome per item
+@router.post("/heroes/bulk", response_model=dict, dependencies=[Depends(require_scopes("Heroes.Create"))])
+async def create_heroes(request: Request, hero_service: HeroService = Depends(get_hero_service)):
+    payload_format = _payload_format(request)
+    heroes, errors = _validate_heroes(await _read_body(request), payload_format)
+    created = await hero_service.create_heroes([hero for _, hero in heroes])
+
+    # Items of an NDJSON stream are reported by line number, those of an array by index
+    key = "line" if payload_format == "ndjson" else "index"
+    results = [{key: index, "status": "created", "id": hero.id} for (index, _), hero in zip(heroes, created)]
+    results.extend({key: index, "status": "invalid", "errors": item_errors} for index, item_errors in errors.items())
+    results.sort(key=lambda result: result[key])
+    return await _hero_response(request, JSONResponse({"created": len(created), "failed": len(errors),
+                                                       "results": results}).body)
+
+
+# DELETE: Delete many heroes given a JSON array, an NDJSON stream or a MessagePack array of ids
+@router.delete("/heroes/bulk", response_model=dict, dependencies=[Depends(require_scopes("Admin"))])
+async def delete_heroes(request: Request, hero_service: HeroService = Depends(get_hero_service)):
+    body = await _read_body(request)
+    payload_format = _payload_format(request)
+    try:
+        if payload_format == "msgpack":
+            hero_ids = hero_id_list_adapter.validate_python(_decode_msgpack(body))
+        elif payload_format == "ndjson":
+            hero_ids = _ndjson_hero_ids(body)
+        else:
+            hero_ids = hero_id_list_adapter.validate_json(body)
+    except ValidationError as error:
+        _check_too_long(error)
+        raise HTTPException(status_code=400, detail="Request body must be a list of hero ids")
+
+    removed = await hero_service.delete_heroes(hero_ids)
+    return await _hero_response(request, JSONResponse({
+        "deleted": sum(removed), "not_found": len(removed) - sum(removed),
+        "results": [{"id": hero_id, "status": "deleted" if was_removed else "not_found"}
+                    for hero_id, was_removed in zip(hero_ids, removed)]}).body)
+
+
+async def _read_body(request: Request) -> bytes:
+    """The request body, decompressed as its Content-Encoding says, and at most MAX_DECOMPRESSED_BODY bytes."""
+    limit = encoding_settings.MAX_DECOMPRESSED_BODY
+    too_large = HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+    # Refused before it is read when its declared length is already too large
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise too_large
+    body = await request.body()
+    content_encoding = request.headers.get("content-encoding")
+    if not content_encoding:
+        if len(body) > limit:
+            raise too_large
+        return body
+    try:
+        return decompress(body, content_encoding, limit)
+    except UnsupportedEncodingError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except BodyTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _payload_format(request: Request) -> Literal["json", "ndjson", "msgpack"]:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == NDJSON_MEDIA_TYPE:
+        return "ndjson"
+    if content_type in MSGPACK_MEDIA_TYPES:
+        return "msgpack"
+    return "json"
+
+
+def _decode_msgpack(body: bytes):
+    try:
+        return decode_msgpack(body)
+    except UnsupportedEncodingError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _ndjson_lines(body: bytes) -> List[Tuple[int, bytes]]:
+    """The non-blank lines of an NDJSON body with their line numbers, counted from 1."""
+    return [(number, line) for number, line in enumerate(body.splitlines(), 1) if line.strip()]
+
+
+def _ndjson_hero_ids(body: bytes) -> List[str]:
+    lines = _ndjson_lines(body)
+    _check_bulk_size(len(lines))
+    hero_ids = []
+    for number, line in lines:
+        try:
+            hero_ids.append(hero_id_adapter.validate_json(line))
+        except ValidationError:
+            raise HTTPException(status_code=400, detail=f"Line {number} must be a single JSON string hero id")
+    return hero_ids
+
+
+def _check_bulk_size(count: int):
+    if count > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} items per bulk request")
+
+
+def _check_too_long(error: ValidationError):
+    """Answer 413 when a batch failed validation for holding more than MAX_BULK_ITEMS items."""
+    errors = error.errors(include_url=False, include_input=False)
+    if any(err["type"] == "too_long" and not err["loc"] for err in errors):
+        _check_bulk_size(MAX_BULK_ITEMS + 1)
+
+
+def _errors(error: ValidationError) -> List[dict]:
+    return [{"loc": list(err["loc"]), "msg": err["msg"], "type": err["type"]}
+            for err in error.errors(include_url=False, include_input=False)]
+
+
+def _item_errors(error: ValidationError) -> Dict[int, List[dict]]:
+    """Group the errors of a list validation by item position, dropping the position from each loc."""
+    errors: Dict[int, List[dict]] = {}
+    for err in error.errors(include_url=False, include_input=False):
+        errors.setdefault(err["loc"][0], []).append(
+            {"loc": list(err["loc"][1:]), "msg": err["msg"], "type": err["type"]})
+    return errors
+
+
+def _validate_heroes(body: bytes, payload_format: str) -> Tuple[List[Tuple[int, DnDHero]], Dict[int, List[dict]]]:
+    """
+    Validate a bulk payload, returning the valid heroes with their positions and the errors of the rest.
+
+    A JSON batch is parsed and validated in one pass; only when some items are invalid is the
+    payload decoded again so the valid items can be kept. A MessagePack batch is decoded first.
+    Each NDJSON line is parsed and validated on its own, and must hold exactly one JSON value;
+    its items are keyed by line number. Items are counted before they are validated, so an
+    oversized batch is refused up front.
+    """
+    if payload_format == "ndjson":
+        lines = _ndjson_lines(body)
+        _check_bulk_size(len(lines))
+        valid: List[Tuple[int, DnDHero]] = []
+        invalid: Dict[int, List[dict]] = {}
+        for number, line in lines:
+            try:
+                valid.append((number, DnDHero.model_validate_json(line)))
+            except ValidationError as error:
+                invalid[number] = _errors(error)
+        return valid, invalid
+
+    if payload_format == "json":
+        try:
+            return list(enumerate(hero_list_adapter.validate_json(body))), {}
+        except ValidationError as error:
+            _check_too_long(error)
+            # Without a position the payload itself is unusable: not JSON, or not an array
+            if any(not err["loc"] for err in error.errors(include_url=False, include_input=False)):
+                raise HTTPException(status_code=400, detail="Request body must be a JSON array of heroes")
+
+    # Decode every item so the valid ones can be kept
+    errors: Dict[int, List[dict]] = {}
+    if payload_format == "msgpack":
+        decoded = _decode_msgpack(body)
+        if not isinstance(decoded, list):
+            raise HTTPException(status_code=400, detail="Request body must be a MessagePack array of heroes")
+        _check_bulk_size(len(decoded))
+        items = list(enumerate(decoded))
+    else:
+        items = list(enumerate(json.loads(body)))
+        _check_bulk_size(len(items))
+
+    try:
+        heroes = hero_list_adapter.validate_python([item for _, item in items])
+    except ValidationError as error:
+        item_errors = _item_errors(error)
+        errors.update((items[position][0], errs) for position, errs in item_errors.items())
+        items = [item for position, item in enumerate(items) if position not in item_errors]
+        heroes = hero_list_adapter.validate_python([item for _, item in items])
+    return [(index, hero) for (index, _), hero in zip(items, heroes)], errors
+
+
+# GET: Search heroes by spell, class, race, skills and level, armor class or hit point ranges
+@router.get("/heroes/search", response_model=List[DnDHero], dependencies=[Depends(require_scopes("Heroes.Read"))])
+async def search_heroes(query: Annotated[HeroQuery, Query()], request: Request,
+                        hero_service: HeroService = Depends(get_hero_service)):
+    return await _hero_response(request, hero_service.encode_heroes(await hero_service.query_heroes(query)))
+
+
+# GET: Count, mean, min, max and percentiles of a numeric field, overall or grouped by race, class or alignment
+@router.get("/heroes/stats/{field}", response_model=dict, dependencies=[Depends(require_scopes("Heroes.Read"))])
+async def hero_stats(field: NumericField, group_by: Optional[CategoricalField] = None,
+                     percentiles: List[float] = Query([25, 50, 75], max_length=MAX_PERCENTILES),
+                     hero_service: HeroService = Depends(get_hero_service)):
+    if any(not 0 <= q <= 100 for q in percentiles):
+        raise HTTPException(status_code=422, detail="Percentiles must be between 0 and 100")
+    groups = await hero_service.hero_stats(field, group_by, percentiles)
+    return JSONResponse({"field": field, "group_by": group_by, "groups": groups})
+
+
+# GET: Histogram of a numeric field in fixed-width bins, overall or grouped by race, class or alignment
+@router.get("/heroes/stats/{field}/distribution", response_model=dict,
+            dependencies=[Depends(require_scopes("Heroes.Read"))])
+async def hero_distribution(field: NumericField, bin_width: int = Query(1, ge=1),
+                            group_by: Optional[CategoricalField] = None,
+                            hero_service: HeroService = Depends(get_hero_service)):
+    try:
+        groups = await hero_service.hero_distribution(field, bin_width, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse({"field": field, "bin_width": bin_width, "group_by": group_by, "groups": groups})
+
+
+# GET: Stream all heroes as NDJSON or as a JSON array, so memory is bounded by the chunk size
+@router.get("/heroes/stream", dependencies=[Depends(require_scopes("Heroes.Read"))])
+async def stream_heroes(output_format: Literal["ndjson", "json"] = Query("ndjson", alias="format"),
+                        chunk_size: int = Query(500, ge=1, le=10000),
+                        hero_service: HeroService = Depends(get_hero_service)):
+    if output_format == "ndjson":
+        return StreamingResponse(_ndjson_chunks(hero_service, chunk_size), media_type="application/x-ndjson")
+    return StreamingResponse(_json_array_chunks(hero_service, chunk_size), media_type="application/json")
+
+
+async def _ndjson_chunks(hero_service: HeroService, chunk_size: int) -> AsyncIterator[bytes]:
+    async for heroes in hero_service.iter_heroes(chunk_size):
+        yield b"".join(hero_service.encode_hero(hero) + b"\n" for hero in heroes)
+
+
+async def _json_array_chunks(hero_service: HeroService, chunk_size: int) -> AsyncIterator[bytes]:
+    yield b"["
+    separator = b""
+    async for heroes in hero_service.iter_heroes(chunk_size):
+        # Splice the encoded chunks into one array
+        yield separator + b",".join(map(hero_service.encode_hero, heroes))
+        separator = b","
+    yield b"]"
+
+
+# GET: Stream hero creates and deletes as Server-Sent Events, resuming after the Last-Event-ID header when given.
+# A "resync" event asks the client to reload the roster, when it fell behind or missed events no longer kept
+@router.get("/heroes/events", dependencies=[Depends(require_scopes("Heroes.Read"))])
+async def hero_events(last_event_id: Optional[str] = Header(None),
+                      hero_service: HeroService = Depends(get_hero_service)):
+    return StreamingResponse(hero_service.events.subscribe(last_event_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _etag(request: Request, kind: str, version: int) -> str:
+    """
+    Strong ETag for a hero ("h") or the roster ("c") at a version, scoped to the storage instance,
+    in the format the request negotiated.
+    """
+    return representation_etag(f'"{kind}{version}-{request.app.state.hero_service.backend.instance_id}"',
+                               negotiator.media_type(request.headers.get("accept")))
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+def _not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Vary": VARY})
+
+
+async def _hero_response(request: Request, body: bytes, etag: Optional[str] = None,
+                         headers: Optional[dict] = None) -> Response:
+    """
+    Send a JSON body in the format and compression the request negotiated. A body with an ETag
+    never changes under it, so its converted and compressed forms are cached by URL and ETag.
+    """
+    media_type = negotiator.media_type(request.headers.get("accept"))
+    encoding = negotiator.encoding(request.headers.get("accept-encoding"), len(body))
+    cache_key = (request.url.path, request.url.query, etag) if etag is not None else None
+    content = await negotiator.render(body, media_type, encoding, cache_key)
+
+    headers = dict(headers or {})
+    headers["Vary"] = VARY
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if etag is not None:
+        headers["ETag"] = wire_etag(etag, encoding)
+    return Response(content=content, media_type=media_type, headers=headers)
 
 
 # GET: Retrieve a hero by ID
-@router.get("/heroes/{hero_id}", response_model=DnDHero)
-async def read_hero(hero_id: str):
+@router.get("/heroes/{hero_id}", response_model=DnDHero, dependencies=[Depends(require_scopes("Heroes.Read"))])
+async def read_hero(hero_id: str, request: Request, hero_service: HeroService = Depends(get_hero_service)):
     hero = await hero_service.get_hero(hero_id)
-    if hero:
-        return hero
-    else:
+    if not hero:
         raise HTTPException(status_code=404, detail="Hero not found")
 
+    etag = _etag(request, "h", hero_service.hero_version(hero_id))
+    if _not_modified(request, etag):
+        return _not_modified_response(etag)
+    return await _hero_response(request, hero_service.encode_hero(hero), etag)
+
+
+# GET: Retrieve all heroes, or one page of them when a limit or cursor is given
+@router.get("/heroes/", response_model=List[DnDHero], dependencies=[Depends(require_scopes("Heroes.Read"))])
+async def read_heroes(request: Request,
+                      limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                      cursor: Optional[str] = None,
+                      hero_service: HeroService = Depends(get_hero_service)):
+    if cursor is not None:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # The version is read before the heroes, so an ETag never claims a newer roster than its body
+    etag = _etag(request, "c", await hero_service.collection_version())
+    if _not_modified(request, etag):
+        return _not_modified_response(etag)
+
+    if limit is None and cursor is None:
+        body, version = await hero_service.list_heroes_json()
+        return await _hero_response(request, body, _etag(request, "c", version))
 
-# GET: Retrieve all heroes
-@router.get("/heroes/", response_model=List[DnDHero])
-async def read_heroes():
-    return await hero_service.list_heroes()
+    limit = limit or DEFAULT_PAGE_SIZE
+    heroes, next_cursor = await hero_service.list_heroes_page(limit, cursor)
+    headers = {}
+    if next_cursor is not None:
+        headers["Link"] = f'<{request.url.include_query_params(limit=limit, cursor=next_cursor)}>; rel="next"'
+    return await _hero_response(request, hero_service.encode_heroes(heroes), etag, headers)
 
 
 # DELETE: Delete a hero by ID
-@router.delete("/heroes/{hero_id}", response_model=dict)
-async def delete_hero(hero_id: str):
+@router.delete("/heroes/{hero_id}", response_model=dict, dependencies=[Depends(require_scopes("Admin"))])
+async def delete_hero(hero_id: str, hero_service: HeroService = Depends(get_hero_service)):
     success = await hero_service.delete_hero(hero_id)
     if success:
         return {"message": f"Hero with id '{hero_id}' deleted successfully"}
@@ -44,6 +392,7 @@ async def delete_hero(hero_id: str):
 
 
 # GET: Custom query to retrieve heroes with Fireball spell and AC < 20
-@router.get("/heroes-fireball-low-ac", response_model=List[DnDHero])
-async def get_fireball_heroes_with_low_ac():
-    return await hero_service.query_heroes_fireball_low_ac()
+@router.get("/heroes-fireball-low-ac", response_model=List[DnDHero],
+            dependencies=[Depends(require_scopes("Heroes.Read"))])
+async def get_fireball_heroes_with_low_ac(request: Request, hero_service: HeroService = Depends(get_hero_service)):
+    return await _hero_response(request, hero_service.encode_heroes(await hero_service.query_heroes_fireball_low_ac()))
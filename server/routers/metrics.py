@@ -0,0 +1,17 @@
+# server/routers/metrics.py
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from server.routers.heroes import get_hero_service
+from server.services.hero_service import ROSTER_SIZE, HeroService
+from server.services.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter()
+
+
+# Prometheus scrape endpoint, unauthenticated like a health check; keep it off public ingress
+@router.get("/metrics", include_in_schema=False)
+async def metrics(hero_service: HeroService = Depends(get_hero_service)) -> PlainTextResponse:
+    ROSTER_SIZE.set(await hero_service.count_heroes())
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,40 @@
+# server/routers/profiling.py
+
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from server.config import profiling_settings
+from server.services.auth_service import require_scopes
+from server.services.profiling import ProfileStore, to_collapsed
+
+# Only included when PROFILING_ENABLED is set
+router = APIRouter(dependencies=[Depends(require_scopes("Admin"))])
+profile_store = ProfileStore(profiling_settings.PROFILING_BUFFER_SIZE)
+
+# Download format of each kind of profile
+FORMATS = {"cprofile": "pstats", "sampling": "collapsed"}
+
+
+@router.get("/profiles", response_model=List[dict])
+async def list_profiles():
+    return [{"id": profile.id, "kind": profile.kind, "method": profile.method, "path": profile.path,
+             "status": profile.status, "started_at": profile.started_at, "duration_ms": profile.duration_ms,
+             "format": FORMATS[profile.kind]}
+            for profile in profile_store.list()]
+
+
+# GET: A profile as a pstats dump (open with pstats.Stats or snakeviz) or as collapsed stacks (flamegraph.pl)
+@router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: int, format: Optional[Literal["pstats", "collapsed"]] = None):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format is not None and format != FORMATS[profile.kind]:
+        raise HTTPException(status_code=400, detail=f"Profile {profile_id} is only available as {FORMATS[profile.kind]}")
+
+    if profile.kind == "cprofile":
+        return Response(profile.data, media_type="application/octet-stream",
+                        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'})
+    return Response(to_collapsed(profile), media_type="text/plain; charset=utf-8",
+                    headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.collapsed"'})
@@ -0,0 +1,105 @@
+# server/services/auth_service.py
+
+import functools
+from typing import List, Optional
+
+import jwt
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from server.config import get_oauth_settings
+from server.config.oauth import OAuthSettings
+from server.logger import logger
+from server.services.claims_cache import ClaimsCache
+from server.services.jwks_cache import JWKSCache
+from server.services.metrics import Counter, Histogram, timed
+from server.services.scope_policy import ScopePolicy
+from server.services.token_verifier import TokenVerifier
+
+AUTHORITY_HOST = "https://login.microsoftonline.com"
+
+AUTH_SECONDS = Histogram("auth_seconds", "Duration of authentication operations.", ["operation"])
+AUTH_ERRORS = Counter("auth_errors_total", "Authentication operations that failed.", ["operation"])
+
+# Role hierarchy mapping: which roles can fulfill which scopes
+ROLE_HIERARCHY = {
+    'Admin': ['Heroes.Read', 'Heroes.Create', 'Admin'],
+    'Heroes.Create': ['Heroes.Read', 'Heroes.Create'],
+    'Heroes.Read': ['Heroes.Read']
+}
+
+# The hierarchy compiled into bitmasks, once at startup
+scope_policy = ScopePolicy(ROLE_HIERARCHY)
+
+
+def token_issuers(settings: OAuthSettings) -> List[str]:
+    """Access tokens are issued by the v2.0 endpoint, or by sts.windows.net for APIs still on v1 tokens."""
+    return [f"{AUTHORITY_HOST}/{settings.AZURE_TENANT_ID}/v2.0", f"https://sts.windows.net/{settings.AZURE_TENANT_ID}/"]
+
+
+def token_audiences(settings: OAuthSettings) -> List[str]:
+    return [settings.AZURE_CLIENT_ID, settings.API_AUDIENCE or f"api://{settings.AZURE_CLIENT_ID}"]
+
+
+# Process-wide verifier shared by every request, built from the OAuth settings on first use
+@functools.lru_cache(maxsize=None)
+def get_token_verifier() -> TokenVerifier:
+    settings = get_oauth_settings()
+    return TokenVerifier(
+        jwks_cache=JWKSCache(f"{AUTHORITY_HOST}/{settings.AZURE_TENANT_ID}/discovery/v2.0/keys"),
+        issuers=token_issuers(settings),
+        audiences=token_audiences(settings),
+        claims_cache=ClaimsCache(settings.CLAIMS_CACHE_SIZE),
+    )
+
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+# Function to check if the token contains the required scopes, based on role hierarchy
+def has_required_scope(token_scopes: List[str], required_scopes: List[str]) -> bool:
+    """Check if any of the token's scopes fulfill the required scopes based on the role hierarchy."""
+    if scope_policy.allows(scope_policy.mask(token_scopes), scope_policy.requirement(*required_scopes)):
+        return True
+    logger.warning("No token scopes match the required scopes: %s", required_scopes)
+    return False
+
+
+def get_token_scopes(claims: dict) -> List[str]:
+    """Delegated tokens carry their scopes in 'scp', application tokens their roles in 'roles'."""
+    return claims.get("scp", "").split() + claims.get("roles", [])
+
+
+# Dependency that validates the bearer token and returns its claims
+@timed(AUTH_SECONDS, "verify_token", errors=AUTH_ERRORS)
+async def get_current_claims(
+        credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> dict:
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+
+    try:
+        return await get_token_verifier().verify(credentials.credentials)
+    except jwt.ExpiredSignatureError:
+        logger.warning("Rejected expired access token")
+        raise HTTPException(status_code=401, detail="Token has expired",
+                            headers={"WWW-Authenticate": 'Bearer error="invalid_token"'})
+    except jwt.InvalidTokenError as e:
+        logger.warning("Rejected invalid access token: %s", e)
+        raise HTTPException(status_code=401, detail="Could not validate credentials",
+                            headers={"WWW-Authenticate": 'Bearer error="invalid_token"'})
+
+
+def require_scopes(*required_scopes: str):
+    """
+    Build a dependency that rejects tokens not granting any of `required_scopes`. The
+    requirement is compiled when the route is declared; each request costs one AND.
+    """
+    requirement = scope_policy.requirement(*required_scopes)
+
+    async def dependency(claims: dict = Depends(get_current_claims)) -> dict:
+        if not scope_policy.allows(scope_policy.claims_mask(claims), requirement):
+            logger.warning("No token scopes match the required scopes: %s", required_scopes)
+            raise HTTPException(status_code=403, detail="Insufficient scope for this operation")
+        return claims
+
+    return dependency
@@ -0,0 +1,53 @@
+# server/services/claims_cache.py
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class ClaimsCache:
+    """
+    Bounded LRU of verified token claims, keyed by a SHA-256 digest of the raw token.
+
+    Entries expire at the token's `exp` claim, so a token that is used repeatedly costs a
+    hash and a dict lookup instead of an RSA signature verification per request.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, claims = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return claims
+
+    def put(self, token: str, claims: dict):
+        if "exp" not in claims or self.max_size <= 0:
+            return
+
+        key = self._key(token)
+        self._entries[key] = (float(claims["exp"]), claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
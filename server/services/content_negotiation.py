@@ -0,0 +1,276 @@
+# server/services/content_negotiation.py
+
+import asyncio
+import functools
+import gzip
+import json
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+from server.services.metrics import Counter, Histogram
+
+# Optional codecs: without them br and zstd are neither offered nor accepted, and hero routes
+# answer in JSON only
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# Names MessagePack clients send it under, the registered one first
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/vnd.msgpack", "application/x-msgpack")
+VARY = "Accept, Accept-Encoding"
+
+# Bodies larger than this are converted and compressed on a worker thread rather than on the
+# event loop; zlib, brotli and zstandard release the GIL while they compress
+OFFLOAD_SIZE = 256 * 1024
+
+ENCODE_SECONDS = Histogram("response_encode_seconds", "Time spent converting and compressing response bodies.",
+                           ["media_type", "encoding"])
+# Source bytes are the JSON body a response was made from, wire bytes the body actually sent
+RESPONSE_SOURCE_BYTES = Counter("response_source_bytes_total", "JSON bytes of negotiated response bodies.",
+                                ["media_type", "encoding"])
+RESPONSE_WIRE_BYTES = Counter("response_wire_bytes_total", "Bytes of negotiated response bodies as sent.",
+                              ["media_type", "encoding"])
+ENCODED_BODY_CACHE = Counter("encoded_body_cache_total", "Lookups of converted and compressed bodies.", ["result"])
+
+
+class UnsupportedEncodingError(ValueError):
+    pass
+
+
+class BodyTooLargeError(ValueError):
+    pass
+
+
+def _weights(header: str) -> Dict[str, float]:
+    """The tokens of an Accept or Accept-Encoding header, lower-cased, with their q-values."""
+    weights: Dict[str, float] = {}
+    for part in header.split(","):
+        token, *params = part.split(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[token] = max(weight, weights.get(token, 0.0))
+    return weights
+
+
+def _compressors(gzip_level: int, brotli_quality: int, zstd_level: int) -> Dict[str, Callable[[bytes], bytes]]:
+    compressors = {"gzip": functools.partial(gzip.compress, compresslevel=gzip_level, mtime=0)}
+    if brotli is not None:
+        compressors["br"] = functools.partial(brotli.compress, quality=brotli_quality)
+    if zstandard is not None:
+        # A compressor must not be shared between threads, so each body gets its own
+        compressors["zstd"] = lambda body: zstandard.ZstdCompressor(level=zstd_level).compress(body)
+    return compressors
+
+
+def json_to_msgpack(body: bytes) -> bytes:
+    return msgpack.packb(json.loads(body))
+
+
+def decode_msgpack(body: bytes):
+    """Decode a MessagePack request body, raising ValueError when it is malformed."""
+    if msgpack is None:
+        raise UnsupportedEncodingError("MessagePack is not supported")
+    try:
+        return msgpack.unpackb(body)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Malformed MessagePack body: {e}")
+
+
+def is_msgpack(content_type: Optional[str]) -> bool:
+    return (content_type or "").split(";")[0].strip().lower() in MSGPACK_MEDIA_TYPES
+
+
+def decompress(body: bytes, encoding: str, limit: int) -> bytes:
+    """
+    Decode a request body sent with a Content-Encoding. Raises UnsupportedEncodingError for
+    codings this process cannot decode, BodyTooLargeError once the decoded body exceeds `limit`
+    bytes, so that a small compressed body cannot inflate without bound, and ValueError for
+    corrupt data.
+    """
+    encoding = encoding.strip().lower()
+    if encoding in ("", "identity"):
+        return body
+    try:
+        if encoding in ("gzip", "x-gzip"):
+            decompressor = zlib.decompressobj(wbits=31)
+            decoded = decompressor.decompress(body, limit + 1)
+            if len(decoded) > limit:
+                raise BodyTooLargeError(f"Decompressed body exceeds {limit} bytes")
+            if not decompressor.eof:
+                raise ValueError("Truncated gzip body")
+            return decoded
+        if encoding == "br" and brotli is not None:
+            decompressor = brotli.Decompressor()
+            chunks = []
+            size = 0
+            # Fed in small pieces so that the limit is checked as the body inflates
+            for start in range(0, len(body), 4096):
+                chunk = decompressor.process(body[start:start + 4096])
+                size += len(chunk)
+                if size > limit:
+                    raise BodyTooLargeError(f"Decompressed body exceeds {limit} bytes")
+                chunks.append(chunk)
+            if not decompressor.is_finished():
+                raise ValueError("Truncated brotli body")
+            return b"".join(chunks)
+        if encoding == "zstd" and zstandard is not None:
+            decompressor = zstandard.ZstdDecompressor().decompressobj()
+            chunks = []
+            size = 0
+            # Fed in pieces small enough that none can inflate far past the limit before it is
+            # checked; a stream reader would hide a truncated frame, which only the decompressor's
+            # eof reveals
+            for start in range(0, len(body), 256):
+                chunk = decompressor.decompress(body[start:start + 256])
+                size += len(chunk)
+                if size > limit:
+                    raise BodyTooLargeError(f"Decompressed body exceeds {limit} bytes")
+                chunks.append(chunk)
+                if decompressor.eof:
+                    break
+            if not decompressor.eof:
+                raise ValueError("Truncated zstd body")
+            return b"".join(chunks)
+    except ValueError:
+        raise
+    except Exception as e:
+        # zlib.error, brotli.error and zstandard.ZstdError
+        raise ValueError(f"Corrupt {encoding} body: {e}")
+    raise UnsupportedEncodingError(f"Unsupported Content-Encoding: {encoding}")
+
+
+def representation_etag(etag: str, media_type: str) -> str:
+    """The ETag of a JSON response in `media_type`; a MessagePack body differs, so its ETag must too."""
+    if media_type == JSON_MEDIA_TYPE:
+        return etag
+    return f'{etag[:-1]}-msgpack"'
+
+
+def wire_etag(etag: str, encoding: Optional[str]) -> str:
+    """
+    A compressed body is not byte-identical to the representation its strong ETag names, so it
+    is sent with the weak form, as nginx does; If-None-Match compares weakly, so either form
+    revalidates.
+    """
+    return f"W/{etag}" if encoding else etag
+
+
+class ContentNegotiator:
+    """
+    Chooses the format (JSON or MessagePack, from Accept) and compression (from
+    Accept-Encoding) of JSON response bodies, and produces them.
+
+    Converted and compressed bodies of responses that carry an ETag are kept, by cache key and
+    representation, up to `cache_max_bytes`, so an unchanged roster is compressed once rather
+    than on every request.
+    """
+
+    def __init__(self, encodings: Sequence[str] = ("zstd", "br", "gzip"), min_size: int = 1024,
+                 gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3,
+                 cache_max_bytes: int = 64 * 1024 * 1024):
+        compressors = _compressors(gzip_level, brotli_quality, zstd_level)
+        # Available compressions in order of preference
+        self.compressors = {encoding: compressors[encoding] for encoding in encodings if encoding in compressors}
+        self.min_size = min_size
+        self.cache_max_bytes = cache_max_bytes
+        self._cache: "OrderedDict[Tuple[Hashable, str, Optional[str]], bytes]" = OrderedDict()
+        self._cache_bytes = 0
+
+    def media_type(self, accept: Optional[str]) -> str:
+        """MessagePack when the client prefers it to JSON, JSON otherwise, even when it accepts neither."""
+        if not accept or msgpack is None:
+            return JSON_MEDIA_TYPE
+        weights = _weights(accept)
+        msgpack_weight = max(weights.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+        json_weight = weights.get(JSON_MEDIA_TYPE, weights.get("application/*", weights.get("*/*", 0.0)))
+        return MSGPACK_MEDIA_TYPE if msgpack_weight > json_weight else JSON_MEDIA_TYPE
+
+    def encoding(self, accept_encoding: Optional[str], size: int) -> Optional[str]:
+        """The preferred compression the client accepts, or None to send the body as is."""
+        if not accept_encoding or size < self.min_size:
+            return None
+        weights = _weights(accept_encoding)
+        default = weights.get("*", 0.0)
+        chosen, chosen_weight = None, 0.0
+        # Ties go to the compression listed first in our order of preference
+        for encoding in self.compressors:
+            weight = weights.get(encoding, default)
+            if weight > chosen_weight:
+                chosen, chosen_weight = encoding, weight
+        return chosen
+
+    async def render(self, body: bytes, media_type: str, encoding: Optional[str],
+                     cache_key: Optional[Hashable] = None) -> bytes:
+        """
+        `body`, a JSON document, converted to `media_type` and compressed with `encoding`. Pass
+        a `cache_key`, such as the URL and ETag, only for bodies that never change under it.
+        """
+        labels = ("msgpack" if media_type == MSGPACK_MEDIA_TYPE else "json", encoding or "identity")
+        RESPONSE_SOURCE_BYTES.labels(*labels).inc(len(body))
+        if media_type == JSON_MEDIA_TYPE and encoding is None:
+            RESPONSE_WIRE_BYTES.labels(*labels).inc(len(body))
+            return body
+
+        key = (cache_key, media_type, encoding)
+        if cache_key is not None:
+            encoded = self._cache.get(key)
+            ENCODED_BODY_CACHE.labels("hit" if encoded is not None else "miss").inc()
+            if encoded is not None:
+                self._cache.move_to_end(key)
+                RESPONSE_WIRE_BYTES.labels(*labels).inc(len(encoded))
+                return encoded
+
+        started = time.perf_counter()
+        if len(body) > OFFLOAD_SIZE:
+            encoded = await asyncio.get_running_loop().run_in_executor(None, self._encode, body, media_type, encoding)
+        else:
+            encoded = self._encode(body, media_type, encoding)
+        ENCODE_SECONDS.labels(*labels).observe(time.perf_counter() - started)
+        RESPONSE_WIRE_BYTES.labels(*labels).inc(len(encoded))
+
+        if cache_key is not None and len(encoded) <= self.cache_max_bytes:
+            self._store(key, encoded)
+        return encoded
+
+    def _encode(self, body: bytes, media_type: str, encoding: Optional[str]) -> bytes:
+        if media_type == MSGPACK_MEDIA_TYPE:
+            body = json_to_msgpack(body)
+        if encoding is not None:
+            body = self.compressors[encoding](body)
+        return body
+
+    def _store(self, key: Tuple[Hashable, str, Optional[str]], encoded: bytes):
+        previous = self._cache.pop(key, None)
+        if previous is not None:
+            self._cache_bytes -= len(previous)
+        self._cache[key] = encoded
+        self._cache_bytes += len(encoded)
+        while self._cache_bytes > self.cache_max_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+    def clear(self):
+        self._cache.clear()
+        self._cache_bytes = 0
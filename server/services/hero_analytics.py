@@ -0,0 +1,178 @@
+# server/services/hero_analytics.py
+
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
+
+import numpy as np
+
+from server.models.ability_scores import AbilityScores
+from server.models.dnd_hero import DnDHero
+
+ABILITIES = tuple(AbilityScores.model_fields)
+
+# Numeric hero fields kept as columns, and the categorical fields they can be grouped by
+NUMERIC_FIELDS = ("level", "hit_points", "armor_class", "speed", *ABILITIES)
+CATEGORICAL_FIELDS = ("race", "class_", "alignment")
+NumericField = Literal[NUMERIC_FIELDS]
+CategoricalField = Literal[CATEGORICAL_FIELDS]
+
+# Column values are clamped to the int32 range
+INT32_MIN, INT32_MAX = -(1 << 31), (1 << 31) - 1
+
+# Largest (groups x distinct values) histogram counted; beyond it, summaries sort each group instead
+MAX_HISTOGRAM_CELLS = 1 << 22
+
+
+class HeroAnalytics:
+    """
+    Columnar copy of the roster's numeric and categorical fields for aggregate queries.
+
+    Numeric fields live in one int32 row per field and categorical ones as int32 codes into
+    per-field label lists, so each column is a contiguous array over all heroes. Heroes are
+    added and removed incrementally; a removed hero's slot is filled with the last one, which
+    keeps the columns dense without compaction.
+
+    Field values are small integers (levels, hit points, ability scores), so group-bys count
+    (group, value) pairs with a single bincount, and means, extremes and percentiles are read
+    off the resulting histograms rather than sorting the columns.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._values = np.zeros((len(NUMERIC_FIELDS), capacity), dtype=np.int32)
+        self._codes = np.zeros((len(CATEGORICAL_FIELDS), capacity), dtype=np.int32)
+        self._labels: Dict[str, List[Optional[str]]] = {field: [] for field in CATEGORICAL_FIELDS}
+        self._label_codes: Dict[str, Dict[Optional[str], int]] = {field: {} for field in CATEGORICAL_FIELDS}
+        self._ids: List[str] = []
+        self._slots: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, hero: DnDHero):
+        if hero.id in self._slots:
+            self.remove(hero.id)
+        slot = len(self._ids)
+        if slot == self._values.shape[1]:
+            self._grow()
+        scores = hero.ability_scores
+        row = (hero.level, hero.hit_points, hero.armor_class, hero.speed,
+               *(getattr(scores, ability) for ability in ABILITIES))
+        self._values[:, slot] = [min(max(value, INT32_MIN), INT32_MAX) for value in row]
+        self._codes[:, slot] = [self._code(field, getattr(hero, field)) for field in CATEGORICAL_FIELDS]
+        self._ids.append(hero.id)
+        self._slots[hero.id] = slot
+
+    def remove(self, hero_id: str):
+        slot = self._slots.pop(hero_id, None)
+        if slot is None:
+            return
+        last = len(self._ids) - 1
+        if slot != last:
+            # Move the last hero into the freed slot
+            self._values[:, slot] = self._values[:, last]
+            self._codes[:, slot] = self._codes[:, last]
+            self._ids[slot] = self._ids[last]
+            self._slots[self._ids[slot]] = slot
+        self._ids.pop()
+
+    def summary(self, field: str, group_by: Optional[str] = None,
+                percentiles: Sequence[float] = (25, 50, 75)) -> List[dict]:
+        """Count, mean, min, max and percentiles of `field`, overall or per group."""
+        labels, values, codes = self._columns(field, group_by)
+        if len(values) == 0:
+            if group_by is not None:
+                return []
+            return [{"group": None, "count": 0, "mean": None, "min": None, "max": None,
+                     "percentiles": {_key(q): None for q in percentiles}}]
+
+        low, high = int(values.min()), int(values.max())
+        if len(labels) * (high - low + 1) > MAX_HISTOGRAM_CELLS:
+            return self._sorted_summary(labels, values, codes, percentiles)
+
+        counts = _grouped_counts(values - low, codes, len(labels), high - low + 1)
+        axis = np.arange(low, high + 1)
+        present = np.flatnonzero(counts.sum(axis=1))
+        counts = counts[present]
+        totals = counts.sum(axis=1)
+        cumulative = counts.cumsum(axis=1)
+        nonzero = counts > 0
+        minima = axis[nonzero.argmax(axis=1)]
+        maxima = axis[len(axis) - 1 - nonzero[:, ::-1].argmax(axis=1)]
+        means = counts @ axis / totals
+
+        # Linear interpolation between the two closest ranks, as numpy.percentile does
+        quantiles = {}
+        for q in percentiles:
+            rank = q / 100 * (totals - 1)
+            below, above = np.floor(rank), np.ceil(rank)
+            value_below = axis[(cumulative > below[:, None]).argmax(axis=1)]
+            value_above = axis[(cumulative > above[:, None]).argmax(axis=1)]
+            quantiles[_key(q)] = value_below + (value_above - value_below) * (rank - below)
+
+        return [{"group": labels[code], "count": int(totals[row]), "mean": float(means[row]),
+                 "min": int(minima[row]), "max": int(maxima[row]),
+                 "percentiles": {key: float(by_row[row]) for key, by_row in quantiles.items()}}
+                for row, code in enumerate(present)]
+
+    def distribution(self, field: str, bin_width: int = 1, group_by: Optional[str] = None) -> List[dict]:
+        """Counts of `field` in bins of `bin_width` aligned to zero, overall or per group; empty bins are left out."""
+        labels, values, codes = self._columns(field, group_by)
+        if len(values) == 0:
+            return [{"group": None, "bins": []}] if group_by is None else []
+
+        first_bin = int(values.min()) // bin_width
+        bins = values // bin_width - first_bin
+        span = int(bins.max()) + 1
+        if len(labels) * span > MAX_HISTOGRAM_CELLS:
+            raise ValueError("Too many bins, use a larger bin width")
+
+        counts = _grouped_counts(bins, codes, len(labels), span)
+        groups = []
+        for code in np.flatnonzero(counts.sum(axis=1)):
+            filled = np.flatnonzero(counts[code])
+            groups.append({"group": labels[code],
+                           "bins": [{"start": int(first_bin + index) * bin_width, "count": int(counts[code, index])}
+                                    for index in filled]})
+        return groups
+
+    def _columns(self, field: str, group_by: Optional[str]) -> Tuple[List[Optional[str]], np.ndarray,
+                                                                       Optional[np.ndarray]]:
+        size = len(self._ids)
+        values = self._values[NUMERIC_FIELDS.index(field), :size]
+        if group_by is None:
+            return [None], values, None
+        return self._labels[group_by], values, self._codes[CATEGORICAL_FIELDS.index(group_by), :size]
+
+    @staticmethod
+    def _sorted_summary(labels, values: np.ndarray, codes: Optional[np.ndarray],
+                        percentiles: Sequence[float]) -> List[dict]:
+        groups = []
+        for code, label in enumerate(labels):
+            group = np.sort(values if codes is None else values[codes == code])
+            if len(group):
+                groups.append({"group": label, "count": len(group), "mean": float(group.mean()),
+                               "min": int(group[0]), "max": int(group[-1]),
+                               "percentiles": {_key(q): float(np.percentile(group, q)) for q in percentiles}})
+        return groups
+
+    def _code(self, field: str, label: Optional[str]) -> int:
+        codes = self._label_codes[field]
+        code = codes.get(label)
+        if code is None:
+            code = codes[label] = len(self._labels[field])
+            self._labels[field].append(label)
+        return code
+
+    def _grow(self):
+        self._values = np.concatenate((self._values, np.zeros_like(self._values)), axis=1)
+        self._codes = np.concatenate((self._codes, np.zeros_like(self._codes)), axis=1)
+
+
+def _grouped_counts(offsets: np.ndarray, codes: Optional[np.ndarray], groups: int, span: int) -> np.ndarray:
+    """(groups x span) matrix counting each non-negative offset below `span`, per group code."""
+    if codes is None:
+        return np.bincount(offsets, minlength=span)[None, :]
+    return np.bincount(codes.astype(np.intp) * span + offsets, minlength=groups * span).reshape(groups, span)
+
+
+def _key(q: float) -> str:
+    return f"{q:g}"
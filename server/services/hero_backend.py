@@ -0,0 +1,146 @@
+# server/services/hero_backend.py
+
+import uuid
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+from server.models.dnd_hero import DnDHero
+from server.models.hero_query import HeroQuery
+from server.services.hero_index import HeroIndex
+from server.services.hero_store import HeroStore
+
+
+class HeroBackend(ABC):
+    """
+    Storage engine behind HeroService.
+
+    Engines are not expected to be safe for concurrent writes; HeroService serializes
+    writes with its readers-writer lock. Pages are addressed by a per-hero sequence number
+    that increases with insertion order.
+
+    Each engine also keeps a collection version that increases with every hero added or
+    removed, and an `instance_id` naming the data set, which together identify a state of
+    the roster for ETags.
+    """
+
+    instance_id: str
+
+    async def open(self):
+        """Load or connect to the stored roster; called once at startup, before any other method."""
+
+    @abstractmethod
+    async def add(self, hero: DnDHero):
+        ...
+
+    async def add_many(self, heroes: List[DnDHero]):
+        for hero in heroes:
+            await self.add(hero)
+
+    @abstractmethod
+    async def get(self, hero_id: str) -> Optional[DnDHero]:
+        ...
+
+    @abstractmethod
+    async def remove(self, hero_id: str) -> bool:
+        ...
+
+    async def remove_many(self, hero_ids: List[str]) -> List[bool]:
+        return [await self.remove(hero_id) for hero_id in hero_ids]
+
+    @abstractmethod
+    async def list_all(self) -> List[DnDHero]:
+        ...
+
+    @abstractmethod
+    async def page(self, after: Optional[int], limit: int) -> Tuple[List[DnDHero], Optional[int]]:
+        """Return up to `limit` heroes inserted after sequence number `after`, and where to resume."""
+
+    @abstractmethod
+    async def query(self, query: HeroQuery) -> List[DnDHero]:
+        ...
+
+    @abstractmethod
+    async def count(self) -> int:
+        ...
+
+    @abstractmethod
+    async def version(self) -> int:
+        ...
+
+    async def sync(self):
+        """Wait until every write made so far is durable; engines that are durable on write return at once."""
+
+    async def close(self):
+        pass
+
+
+class InMemoryHeroBackend(HeroBackend):
+    """Default engine: a HeroStore plus its secondary indexes, living in process memory."""
+
+    def __init__(self):
+        self.store = HeroStore()
+        self.index = HeroIndex()
+        # The roster lives and dies with this process, so each instance is its own data set
+        self.instance_id = uuid.uuid4().hex[:12]
+        self._version = 0
+
+    async def add(self, hero: DnDHero):
+        self.store.add(hero)
+        self.index.add(hero)
+        self._version += 1
+
+    async def add_many(self, heroes: List[DnDHero]):
+        for hero in heroes:
+            self.store.add(hero)
+        self.index.add_many(heroes)
+        self._version += len(heroes)
+
+    async def get(self, hero_id: str) -> Optional[DnDHero]:
+        return self.store.get(hero_id)
+
+    async def remove(self, hero_id: str) -> bool:
+        hero = self.store.remove(hero_id)
+        if hero is None:
+            return False
+        self.index.remove(hero)
+        self._version += 1
+        return True
+
+    async def remove_many(self, hero_ids: List[str]) -> List[bool]:
+        removed = []
+        for hero_id in hero_ids:
+            hero = self.store.remove(hero_id)
+            if hero is not None:
+                self.index.remove(hero)
+            removed.append(hero is not None)
+        self._version += sum(removed)
+        return removed
+
+    async def list_all(self) -> List[DnDHero]:
+        return self.store.values()
+
+    async def page(self, after: Optional[int], limit: int) -> Tuple[List[DnDHero], Optional[int]]:
+        return self.store.page(after, limit)
+
+    async def query(self, query: HeroQuery) -> List[DnDHero]:
+        results = self.index.search(query, self.store.get)
+        return self.store.values() if results is None else results
+
+    async def count(self) -> int:
+        return len(self.store)
+
+    async def version(self) -> int:
+        return self._version
+
+
+def create_hero_backend(settings) -> HeroBackend:
+    """Build the engine selected by HERO_STORAGE_BACKEND."""
+    if settings.HERO_STORAGE_BACKEND == "sqlite":
+        # Imported lazily so the default in-memory deployment never touches sqlite3
+        from server.services.sqlite_backend import SQLiteHeroBackend
+        return SQLiteHeroBackend(settings.HERO_SQLITE_PATH, pool_size=settings.HERO_SQLITE_POOL_SIZE)
+    if settings.HERO_STORAGE_BACKEND == "journal":
+        from server.services.hero_journal import JournaledHeroBackend
+        return JournaledHeroBackend(settings.HERO_JOURNAL_DIR, fsync=settings.HERO_JOURNAL_FSYNC,
+                                    snapshot_every=settings.HERO_JOURNAL_SNAPSHOT_EVERY)
+    return InMemoryHeroBackend()
@@ -0,0 +1,165 @@
+# server/services/hero_events.py
+
+import asyncio
+import uuid
+from typing import AsyncIterator, Callable, List, Optional
+
+from server.services.metrics import Counter, Gauge
+
+HERO_EVENT_SUBSCRIBERS = Gauge("hero_event_subscribers", "Clients streaming the hero change feed.")
+HERO_EVENTS_PUBLISHED = Counter("hero_events_published_total", "Hero change events published.", ["event"])
+HERO_EVENT_RESYNCS = Counter("hero_event_resyncs_total", "Subscribers told to resync, by reason.", ["reason"])
+
+# A comment line, ignored by EventSource, that keeps proxies from closing an idle stream
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+class _Event:
+    """A published event, encoded into its SSE frame on first delivery rather than when published."""
+    __slots__ = ("seq", "name", "encode", "_frame")
+
+    def __init__(self, seq: int, name: str, encode: Callable[[], bytes]):
+        self.seq = seq
+        self.name = name
+        self.encode = encode
+        self._frame: Optional[bytes] = None
+
+    def frame(self, epoch: bytes) -> bytes:
+        if self._frame is None:
+            self._frame = b"id: %s-%d\nevent: %s\ndata: %s\n\n" % (epoch, self.seq, self.name.encode(), self.encode())
+            self.encode = None
+        return self._frame
+
+
+class HeroEventHub:
+    """
+    In-process broadcast of hero creates and deletes to Server-Sent Events subscribers.
+
+    The `replay_size` most recent events are kept in a ring, which is both the replay buffer
+    and every subscriber's queue: a subscriber is a cursor into the ring, so publishing takes
+    constant time however many clients are connected, and each event is encoded once, its
+    bytes shared by all of them. A subscriber that falls more than `max_backlog` events behind
+    is sent a resync event and disconnected, and one resuming from an event no longer kept is
+    sent a resync event in place of the events it missed. Writers never wait for subscribers.
+
+    Event ids read "<epoch>-<sequence number>". The epoch is drawn anew by every process, so an
+    id issued before a restart, or by another worker, resyncs rather than resuming.
+    """
+
+    def __init__(self, replay_size: int = 10_000, max_backlog: int = 1_000, keepalive: Optional[float] = 15.0):
+        self.replay_size = replay_size
+        # Backlog is read from the ring, so it cannot exceed it
+        self.max_backlog = min(max_backlog, replay_size)
+        self.keepalive = keepalive
+        self.epoch = uuid.uuid4().hex[:8].encode()
+        self.seq = 0
+        self.subscribers = 0
+        self._ring: List[Optional[_Event]] = [None] * replay_size
+        # Resolved by the next publish, or by the keepalive timer, waking every waiting subscriber at once
+        self._waiter: Optional[asyncio.Future] = None
+        self._wake_scheduled = False
+        self._keepalive_timer: Optional[asyncio.TimerHandle] = None
+
+    def publish(self, name: str, encode: Callable[[], bytes]) -> int:
+        """
+        Publish an event whose data is the single-line JSON returned by `encode`, called when
+        the event is first delivered, if ever. Returns the event's sequence number.
+        """
+        self.seq += 1
+        self._ring[self.seq % self.replay_size] = _Event(self.seq, name, encode)
+        HERO_EVENTS_PUBLISHED.labels(name).inc()
+        # Subscribers are woken once the writer's step is over: waking schedules a callback per
+        # subscriber, which would otherwise add to the write, and events published in the same
+        # step are delivered together
+        if self._waiter is not None and not self._wake_scheduled:
+            self._wake_scheduled = True
+            self._waiter.get_loop().call_soon(self._wake)
+        return self.seq
+
+    def publish_resync(self, reason: str) -> int:
+        """
+        Ask every subscriber to reload the roster, as when writes already published were rolled
+        back. Several in a row are sent as one.
+        """
+        last = self._ring[self.seq % self.replay_size]
+        if last is not None and last.name == "resync":
+            return self.seq
+        HERO_EVENT_RESYNCS.labels(reason).inc()
+        return self.publish("resync", lambda: b'{"reason": "%s"}' % reason.encode())
+
+    async def subscribe(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Yield SSE frames for every event published from now on, preceded by the events after
+        `last_event_id` when given and still kept. Several events may arrive in one chunk.
+        """
+        cursor = self.seq
+        if last_event_id is not None:
+            resume = self._resume_point(last_event_id)
+            if resume is None:
+                yield self._resync("replay")
+            else:
+                cursor = resume
+
+        self.subscribers += 1
+        HERO_EVENT_SUBSCRIBERS.inc()
+        try:
+            # Missed events are replayed in one go, however many of them the ring still holds
+            if cursor < self.seq:
+                start, cursor = cursor, self.seq
+                yield self._frames(start, cursor)
+            while True:
+                if cursor == self.seq:
+                    # Shielded, as cancelling a disconnected subscriber would otherwise cancel the shared waiter
+                    await asyncio.shield(self._next())
+                    if cursor == self.seq:
+                        yield KEEPALIVE_FRAME
+                    continue
+                if self.seq - cursor > self.max_backlog:
+                    yield self._resync("backlog")
+                    return
+                start, cursor = cursor, self.seq
+                yield self._frames(start, cursor)
+        finally:
+            self.subscribers -= 1
+            HERO_EVENT_SUBSCRIBERS.dec()
+
+    def _resume_point(self, last_event_id: str) -> Optional[int]:
+        """The sequence number of `last_event_id`, or None when the events after it cannot be replayed."""
+        epoch, _, seq = last_event_id.strip().partition("-")
+        if epoch.encode() != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > self.seq or self.seq - seq > self.replay_size:
+            return None
+        return seq
+
+    def _frames(self, after: int, last: int) -> bytes:
+        ring, size, epoch = self._ring, self.replay_size, self.epoch
+        return b"".join(ring[seq % size].frame(epoch) for seq in range(after + 1, last + 1))
+
+    def _resync(self, reason: str) -> bytes:
+        """
+        Tell a subscriber to reload the roster. The frame carries the current event id, so that
+        reconnecting with it resumes right after the roster it reloads.
+        """
+        HERO_EVENT_RESYNCS.labels(reason).inc()
+        return b'id: %s-%d\nevent: resync\ndata: {"reason": "%s"}\n\n' % (self.epoch, self.seq, reason.encode())
+
+    def _next(self) -> asyncio.Future:
+        if self._waiter is None:
+            loop = asyncio.get_running_loop()
+            self._waiter = loop.create_future()
+            if self.keepalive:
+                self._keepalive_timer = loop.call_later(self.keepalive, self._wake)
+        return self._waiter
+
+    def _wake(self):
+        self._wake_scheduled = False
+        waiter, self._waiter = self._waiter, None
+        if waiter is None:
+            return
+        if self._keepalive_timer is not None:
+            self._keepalive_timer.cancel()
+            self._keepalive_timer = None
+        if not waiter.done():
+            waiter.set_result(None)
@@ -0,0 +1,251 @@
+# server/services/hero_index.py
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from server.models.dnd_hero import DnDHero
+from server.models.hero_query import HeroQuery
+from server.models.skill_proficiencies import SKILL_BITS, SKILLS, skills_mask
+
+# Numeric fields indexed for range queries
+RANGE_FIELDS = ("level", "armor_class", "hit_points")
+
+
+def _key(value: str) -> str:
+    return value.casefold()
+
+
+class RangeIndex:
+    """
+    Sorted distinct values, each mapped to the set of hero ids holding it.
+
+    The indexed fields have few distinct values (levels 1-20, armor classes in the teens),
+    so inserts and deletes are O(1) set operations, and only a previously unseen value
+    costs a bisect insertion into the short list of distinct values.
+    """
+
+    def __init__(self):
+        self._values: List[int] = []
+        self._buckets: Dict[int, Set[str]] = {}
+
+    def add(self, value: int, hero_id: str):
+        bucket = self._buckets.get(value)
+        if bucket is None:
+            insort(self._values, value)
+            bucket = self._buckets[value] = set()
+        bucket.add(hero_id)
+
+    def remove(self, value: int, hero_id: str):
+        bucket = self._buckets.get(value)
+        if bucket is None:
+            return
+        bucket.discard(hero_id)
+        if not bucket:
+            del self._buckets[value]
+            del self._values[bisect_left(self._values, value)]
+
+    def buckets(self, low: Optional[int], high: Optional[int]) -> List[Set[str]]:
+        """Return the id sets of every value within the inclusive range."""
+        start = bisect_left(self._values, low) if low is not None else 0
+        stop = bisect_right(self._values, high) if high is not None else len(self._values)
+        return [self._buckets[value] for value in self._values[start:stop]]
+
+
+class SkillMaskColumn:
+    """
+    Skill proficiency bitmasks of every hero in one numpy column, next to a column of their ids.
+
+    A query for heroes proficient in several skills is a single vectorised AND and compare
+    over the column. Deleted heroes leave a zero mask, which never matches a query, and their
+    slot is reused by the next hero added. Per-skill counts estimate a query's selectivity
+    without scanning.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._masks = np.zeros(capacity, dtype=np.uint32)
+        self._ids = np.empty(capacity, dtype=object)
+        self._size = 0
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._counts = [0] * len(SKILLS)
+
+    def add(self, hero_id: str, mask: int):
+        if hero_id in self._slots:
+            self.remove(hero_id)
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._size == len(self._masks):
+                self._grow()
+            slot = self._size
+            self._size += 1
+        self._masks[slot] = mask
+        self._ids[slot] = hero_id
+        self._slots[hero_id] = slot
+        self._count(mask, 1)
+
+    def add_many(self, hero_ids: List[str], masks: List[int]):
+        """Add heroes not yet in the column, as one slice assignment when no freed slot is waiting."""
+        if self._free or not self._slots.keys().isdisjoint(hero_ids):
+            for hero_id, mask in zip(hero_ids, masks):
+                self.add(hero_id, mask)
+            return
+        start, end = self._size, self._size + len(hero_ids)
+        while end > len(self._masks):
+            self._grow()
+        self._masks[start:end] = masks
+        self._ids[start:end] = hero_ids
+        self._slots.update(zip(hero_ids, range(start, end)))
+        self._size = end
+        for mask, count in Counter(masks).items():
+            self._count(mask, count)
+
+    def remove(self, hero_id: str):
+        slot = self._slots.pop(hero_id, None)
+        if slot is None:
+            return
+        self._count(int(self._masks[slot]), -1)
+        self._masks[slot] = 0
+        self._ids[slot] = None
+        self._free.append(slot)
+
+    def estimate(self, required: int) -> int:
+        """Upper bound on the heroes matching `required`: the count of its rarest skill."""
+        return min(count for bit, count in enumerate(self._counts) if required >> bit & 1)
+
+    def match(self, required: int) -> List[str]:
+        """Ids of the heroes proficient in every skill of the non-zero mask `required`."""
+        masks = self._masks[:self._size]
+        return self._ids[:self._size][masks & required == required].tolist()
+
+    def _count(self, mask: int, delta: int):
+        for bit in range(len(SKILLS)):
+            if mask >> bit & 1:
+                self._counts[bit] += delta
+
+    def _grow(self):
+        capacity = len(self._masks) * 2
+        self._masks = np.concatenate((self._masks, np.zeros(capacity - len(self._masks), dtype=np.uint32)))
+        self._ids = np.concatenate((self._ids, np.empty(capacity - len(self._ids), dtype=object)))
+
+
+class HeroIndex:
+    """
+    Secondary indexes over the roster, maintained on create and delete.
+
+    Spell names, classes and races map to sets of hero ids, skill proficiencies are kept as
+    bitmasks in a SkillMaskColumn and numeric fields in RangeIndex buckets for range lookups.
+    `search` runs a small planner that starts from the most selective index and checks the
+    remaining predicates per candidate, so a query costs time proportional to its smallest
+    matching index rather than the roster.
+    """
+
+    def __init__(self):
+        self._by_spell: Dict[str, Set[str]] = defaultdict(set)
+        self._by_class: Dict[str, Set[str]] = defaultdict(set)
+        self._by_race: Dict[str, Set[str]] = defaultdict(set)
+        self._skills = SkillMaskColumn()
+        self._ranges: Dict[str, RangeIndex] = {field: RangeIndex() for field in RANGE_FIELDS}
+
+    def add(self, hero: DnDHero):
+        for spell in hero.spells or []:
+            self._by_spell[_key(spell.name)].add(hero.id)
+        self._by_class[_key(hero.class_)].add(hero.id)
+        self._by_race[_key(hero.race)].add(hero.id)
+        self._skills.add(hero.id, hero.skill_proficiencies.to_mask())
+        for field in RANGE_FIELDS:
+            self._ranges[field].add(getattr(hero, field), hero.id)
+
+    def add_many(self, heroes: List[DnDHero]):
+        """Index a batch of new heroes, computing each distinct set of skill proficiencies' mask once."""
+        # Proficiencies are interned, so a batch holds few distinct instances
+        masks: Dict[int, int] = {}
+        hero_masks = []
+        for hero in heroes:
+            for spell in hero.spells or []:
+                self._by_spell[_key(spell.name)].add(hero.id)
+            self._by_class[_key(hero.class_)].add(hero.id)
+            self._by_race[_key(hero.race)].add(hero.id)
+            for field in RANGE_FIELDS:
+                self._ranges[field].add(getattr(hero, field), hero.id)
+            skills = hero.skill_proficiencies
+            mask = masks.get(id(skills))
+            if mask is None:
+                mask = masks[id(skills)] = skills.to_mask()
+            hero_masks.append(mask)
+        self._skills.add_many([hero.id for hero in heroes], hero_masks)
+
+    def remove(self, hero: DnDHero):
+        for spell in hero.spells or []:
+            self._discard(self._by_spell, _key(spell.name), hero.id)
+        self._discard(self._by_class, _key(hero.class_), hero.id)
+        self._discard(self._by_race, _key(hero.race), hero.id)
+        self._skills.remove(hero.id)
+        for field in RANGE_FIELDS:
+            self._ranges[field].remove(getattr(hero, field), hero.id)
+
+    def search(self, query: HeroQuery, lookup: Callable[[str], Optional[DnDHero]]) -> Optional[List[DnDHero]]:
+        """
+        Return the heroes matching `query`, resolving ids through `lookup`, or None when the
+        query has no indexed predicate and the caller should return the whole roster.
+        """
+        paths = self._access_paths(query)
+        if not paths:
+            return None
+
+        # Start from the most selective index and check the rest in order of selectivity,
+        # so that non-matching candidates are rejected as early as possible
+        paths.sort(key=lambda path: path[0])
+        _, candidates, _ = paths[0]
+        checks = [check for _, _, check in paths[1:]]
+
+        results = []
+        for hero_id in candidates():
+            hero = lookup(hero_id)
+            if hero is not None and all(check(hero) for check in checks):
+                results.append(hero)
+        return results
+
+    def _access_paths(self, query: HeroQuery) -> List[Tuple[int, Callable[[], Iterable[str]], Callable[[DnDHero], bool]]]:
+        """Build (estimated matches, candidate ids, per-hero check) for each predicate in the query."""
+        paths = []
+
+        for index, value in ((self._by_spell, query.spell), (self._by_class, query.class_),
+                             (self._by_race, query.race)):
+            if value is not None:
+                ids = index.get(_key(value), set())
+                paths.append((len(ids), lambda ids=ids: ids, lambda hero, ids=ids: hero.id in ids))
+
+        if query.skills:
+            if any(skill not in SKILL_BITS for skill in query.skills):
+                paths.append((0, lambda: (), lambda hero: False))
+            else:
+                required = skills_mask(query.skills)
+                paths.append((self._skills.estimate(required), lambda: self._skills.match(required),
+                              lambda hero: hero.skill_proficiencies.to_mask() & required == required))
+
+        for field, low, high in (("level", query.min_level, query.max_level),
+                                 ("armor_class", query.min_armor_class, query.max_armor_class),
+                                 ("hit_points", query.min_hit_points, query.max_hit_points)):
+            if low is None and high is None:
+                continue
+            buckets = self._ranges[field].buckets(low, high)
+            low = low if low is not None else float("-inf")
+            high = high if high is not None else float("inf")
+            paths.append((sum(len(bucket) for bucket in buckets),
+                          lambda buckets=buckets: (hero_id for bucket in buckets for hero_id in bucket),
+                          lambda hero, field=field, low=low, high=high: low <= getattr(hero, field) <= high))
+
+        return paths
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, hero_id: str):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(hero_id)
+            if not ids:
+                del index[key]
+
@@ -0,0 +1,597 @@
+# server/services/hero_journal.py
+
+import asyncio
+import functools
+import gc
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate, islice
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from server.logger import logger
+from server.models.ability_scores import AbilityScores
+from server.models.dnd_hero import DnDHero
+from server.models.equipment import Equipment
+from server.models.skill_proficiencies import SkillProficiencies
+from server.models.spell import Spell
+from server.services.hero_backend import InMemoryHeroBackend
+from server.services.metrics import Histogram
+
+try:
+    import fcntl
+except ImportError:  # Windows: the journal directory is not locked against a second process
+    fcntl = None
+
+HERO_JOURNAL_SYNC_SECONDS = Histogram("hero_journal_sync_seconds", "Duration of hero journal writes and fsyncs.",
+                                      ["mode"])
+HERO_JOURNAL_SNAPSHOT_SECONDS = Histogram("hero_journal_snapshot_seconds", "Duration of hero roster snapshots.",
+                                          buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+
+# Journal and snapshot files start with MAGIC and a format version, then hold a sequence of
+# frames: kind, payload length and CRC-32 of the payload. A frame cut short or failing its
+# checksum ends the file, as a crash in the middle of an append leaves it
+MAGIC = b"HEROJRNL"
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct("<8sI")
+FRAME = struct.Struct("<BII")
+FRAME_ADD, FRAME_REMOVE, FRAME_END = 1, 2, 3
+
+# Heroes are encoded in blocks: a string table (the character length of every string, then
+# their UTF-8 text), a spell table, one fixed-size row per hero, and the string and spell
+# references of the variable-length lists (spell components, equipment items, hero spells)
+BLOCK = struct.Struct("<IIIII")
+SPELL_ROW = struct.Struct("<IIIIqI")
+HERO_ROW = struct.Struct("<6I7qI2I2I3q4I")
+NO_SPELLS = 0xFFFFFFFF
+
+# Heroes per block in snapshots, bounding the memory used while writing one
+SNAPSHOT_BLOCK_SIZE = 10_000
+
+JOURNAL_NAME = re.compile(r"journal-(\d+)\.log$")
+SNAPSHOT_NAME = re.compile(r"snapshot-(\d+)\.snap$")
+
+
+def _constructor(model):
+    """
+    Build instances of `model` from a dict of already valid field values, as model_construct
+    does but without its per-call bookkeeping. Every field is always given, so instances
+    share one fields-set, which pydantic only ever adds existing field names to.
+    """
+    fields_set = set(model.model_fields)
+    new = model.__new__
+    set_attribute = object.__setattr__
+
+    def construct(values: dict):
+        instance = new(model)
+        set_attribute(instance, "__dict__", values)
+        set_attribute(instance, "__pydantic_fields_set__", fields_set)
+        set_attribute(instance, "__pydantic_extra__", None)
+        set_attribute(instance, "__pydantic_private__", None)
+        return instance
+
+    return construct
+
+
+_hero = _constructor(DnDHero)
+_ability_scores = _constructor(AbilityScores)
+_equipment = _constructor(Equipment)
+_spell = _constructor(Spell)
+
+
+def _uint32s(buffer, offset: int, count: int) -> array:
+    values = array("I")
+    values.frombytes(buffer[offset:offset + count * 4])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _uint32_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array("I", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode_heroes(heroes: Sequence[DnDHero]) -> bytes:
+    """
+    Encode heroes as one block. Strings and spells repeated across heroes are stored once;
+    integer fields must fit in 64 bits.
+    """
+    strings: Dict[str, int] = {}
+    texts: List[str] = []
+
+    def string(value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        index = strings.get(value)
+        if index is None:
+            texts.append(value)
+            index = strings[value] = len(texts)
+        return index
+
+    spells: Dict[tuple, int] = {}
+    spell_rows: List[bytes] = []
+    spell_refs = array("I")
+    hero_rows: List[bytes] = []
+    hero_refs = array("I")
+    for hero in heroes:
+        scores = hero.ability_scores
+        equipment = hero.equipment
+        hero_refs.extend(map(string, equipment.items))
+        if hero.spells is not None:
+            for spell in hero.spells:
+                key = (spell.name, spell.level, spell.casting_time, spell.range, tuple(spell.components),
+                       spell.duration)
+                index = spells.get(key)
+                if index is None:
+                    index = spells[key] = len(spell_rows)
+                    spell_rows.append(SPELL_ROW.pack(string(spell.name), string(spell.casting_time),
+                                                     string(spell.range), string(spell.duration), spell.level,
+                                                     len(spell.components)))
+                    spell_refs.extend(map(string, spell.components))
+                hero_refs.append(index)
+        hero_rows.append(HERO_ROW.pack(
+            string(hero.id), string(hero.name), string(hero.race), string(hero.class_), string(hero.background),
+            string(hero.alignment), hero.level, scores.strength, scores.dexterity, scores.constitution,
+            scores.intelligence, scores.wisdom, scores.charisma, hero.skill_proficiencies.to_mask(),
+            string(equipment.weapon), string(equipment.armor), len(equipment.items),
+            NO_SPELLS if hero.spells is None else len(hero.spells), hero.hit_points, hero.armor_class, hero.speed,
+            string(hero.personality_traits), string(hero.ideals), string(hero.bonds), string(hero.flaws)))
+
+    text = "".join(texts).encode()
+    return b"".join((BLOCK.pack(len(texts), len(text), len(spell_rows), len(hero_rows),
+                                len(spell_refs) + len(hero_refs)),
+                     _uint32_bytes(array("I", map(len, texts))), text, *spell_rows, *hero_rows,
+                     _uint32_bytes(spell_refs + hero_refs)))
+
+
+def decode_heroes(buffer) -> List[DnDHero]:
+    """Rebuild the heroes of one block, trusted to be valid, without re-validating them."""
+    string_count, text_size, spell_count, hero_count, ref_count = BLOCK.unpack_from(buffer, 0)
+    offset = BLOCK.size
+    lengths = _uint32s(buffer, offset, string_count)
+    offset += string_count * 4
+    text = str(buffer[offset:offset + text_size], "utf-8")
+    offset += text_size
+    ends = list(accumulate(lengths))
+    strings = [None, *map(text.__getitem__, map(slice, [0, *ends[:-1]], ends))]
+
+    spells_end = offset + spell_count * SPELL_ROW.size
+    heroes_end = spells_end + hero_count * HERO_ROW.size
+    refs = iter(_uint32s(buffer, heroes_end, ref_count))
+    spells = [_spell({"name": strings[name], "level": level, "casting_time": strings[casting_time],
+                      "range": strings[range_], "components": [strings[ref] for ref in islice(refs, components)],
+                      "duration": strings[duration]})
+              for name, casting_time, range_, duration, level, components
+              in SPELL_ROW.iter_unpack(buffer[offset:spells_end])]
+
+    heroes = []
+    for (hero_id, name, race, class_, background, alignment, level,
+         strength, dexterity, constitution, intelligence, wisdom, charisma, skills,
+         weapon, armor, items, hero_spells, hit_points, armor_class, speed,
+         personality_traits, ideals, bonds, flaws) in HERO_ROW.iter_unpack(buffer[spells_end:heroes_end]):
+        heroes.append(_hero({
+            "id": strings[hero_id], "name": strings[name], "race": strings[race], "class_": strings[class_],
+            "level": level, "background": strings[background], "alignment": strings[alignment],
+            "ability_scores": _ability_scores({
+                "strength": strength, "dexterity": dexterity, "constitution": constitution,
+                "intelligence": intelligence, "wisdom": wisdom, "charisma": charisma}),
+            "skill_proficiencies": SkillProficiencies.from_mask(skills),
+            "equipment": _equipment({"weapon": strings[weapon], "armor": strings[armor],
+                                     "items": [strings[ref] for ref in islice(refs, items)]}),
+            "spells": None if hero_spells == NO_SPELLS else [spells[ref] for ref in islice(refs, hero_spells)],
+            "hit_points": hit_points, "armor_class": armor_class, "speed": speed,
+            "personality_traits": strings[personality_traits], "ideals": strings[ideals],
+            "bonds": strings[bonds], "flaws": strings[flaws]}))
+    return heroes
+
+
+def encode_ids(hero_ids: Sequence[str]) -> bytes:
+    text = "".join(hero_ids).encode()
+    return struct.pack("<II", len(hero_ids), len(text)) + _uint32_bytes(array("I", map(len, hero_ids))) + text
+
+
+def decode_ids(buffer) -> List[str]:
+    count, text_size = struct.unpack_from("<II", buffer, 0)
+    ends = list(accumulate(_uint32s(buffer, 8, count)))
+    text = str(buffer[8 + count * 4:8 + count * 4 + text_size], "utf-8")
+    return list(map(text.__getitem__, map(slice, [0, *ends[:-1]], ends)))
+
+
+def frame(kind: int, payload: bytes) -> bytes:
+    return FRAME.pack(kind, len(payload), zlib.crc32(payload)) + payload
+
+
+def read_frames(buffer) -> Tuple[List[Tuple[int, int, int]], int]:
+    """
+    Kind, start and end offset of the payload of every valid frame in a journal or snapshot
+    file, and the offset just past the last of them.
+    """
+    if FILE_HEADER.unpack_from(buffer, 0) != (MAGIC, FORMAT_VERSION):
+        raise ValueError("Not a hero journal or snapshot file of a supported format")
+    frames, offset = [], FILE_HEADER.size
+    with memoryview(buffer) as view:
+        while offset + FRAME.size <= len(buffer):
+            kind, size, checksum = FRAME.unpack_from(buffer, offset)
+            start, end = offset + FRAME.size, offset + FRAME.size + size
+            if end > len(buffer) or zlib.crc32(view[start:end]) != checksum:
+                break
+            frames.append((kind, start, end))
+            offset = end
+    return frames, offset
+
+
+class _MappedFile:
+    """A file mapped read-only into memory; empty files, which cannot be mapped, read as b""."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+
+def _fsync_directory(directory: str):
+    # Makes created, renamed and deleted files durable; directories cannot be opened on Windows
+    if os.name == "posix":
+        descriptor = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+
+_datasync = getattr(os, "fdatasync", os.fsync)
+
+
+class JournaledHeroBackend(InMemoryHeroBackend):
+    """
+    In-memory engine made durable by a write-ahead journal and periodic snapshots.
+
+    Reads are served from memory exactly as by InMemoryHeroBackend. Creates and deletes are
+    encoded as compact binary records and appended to the journal, made durable according to
+    `fsync`:
+
+    - "always": each write is written and fsynced before it returns, one fsync per write
+    - "batch": writes are buffered, and sync() flushes them with one fsync for every write
+      waiting on it (group commit); HeroService calls it once the write lock is released
+    - "never": each write is handed to the operating system, which decides when it reaches
+      the disk; a crash of the process loses nothing, a crash of the machine may
+
+    A write whose record cannot be journaled is reverted in memory, so the roster never holds
+    what the journal lacks, and no further write is accepted until the process restarts.
+
+    Every `snapshot_every` records the journal moves to a new generation and the roster is
+    written, in the background, to a snapshot of the same generation, after which older
+    snapshots and journals are deleted. open() maps the latest snapshot into memory, rebuilds
+    the heroes without validating them again, and replays the journal written since.
+
+    The directory is locked by one process at a time, so a journal serves a single worker.
+    """
+
+    def __init__(self, directory: str, fsync: str = "batch", snapshot_every: int = 100_000,
+                 snapshot_on_close: bool = True):
+        if fsync not in ("always", "batch", "never"):
+            raise ValueError(f"Unknown fsync mode: {fsync}")
+        super().__init__()
+        self.directory = directory
+        self.fsync = fsync
+        self.snapshot_every = snapshot_every
+        # A snapshot on close saves the next start from replaying the journal
+        self.snapshot_on_close = snapshot_on_close
+
+        # Journal files are written by one thread, so that appends, fsyncs and the move to a
+        # new generation happen in submission order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hero-journal")
+        self._lock_file = None
+        self._journal = None
+        self.generation = 0
+
+        # Records appended, and how many of them are known to be durable
+        self._appended = 0
+        self._durable = 0
+        self._buffer = bytearray()
+        self._flushing: Optional[asyncio.Future] = None
+        # How to revert each buffered write, should its flush fail
+        self._pending: List[Callable[[], None]] = []
+        self._since_snapshot = 0
+        self._snapshot_task: Optional[asyncio.Future] = None
+        # After a failed journal write the state of the file is unknown, so no further write is accepted
+        self._failure: Optional[BaseException] = None
+
+    async def open(self):
+        """Lock the directory and rebuild the roster from the latest snapshot and the journal since."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_directory()
+        # Left behind by a snapshot interrupted before it was complete
+        for name in os.listdir(self.directory):
+            if name.endswith(".snap.tmp"):
+                os.remove(os.path.join(self.directory, name))
+        started = time.perf_counter()
+        # Rebuilding the roster allocates millions of objects, none of them garbage; collections
+        # triggered along the way would only traverse the growing roster again and again
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            snapshot_generation, snapshot_heroes = self._load_snapshot()
+            replayed = self._replay_journals(snapshot_generation)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self._journal = open(self._path("journal", self.generation), "ab", buffering=0)
+        if self._journal.tell() == 0:
+            self._journal.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION))
+            _datasync(self._journal.fileno())
+            _fsync_directory(self.directory)
+        self._since_snapshot = replayed
+        logger.info("Recovered %d heroes in %.2fs: %d from the snapshot, %d journal records replayed.",
+                    len(self.store), time.perf_counter() - started, snapshot_heroes, replayed)
+
+    async def add(self, hero: DnDHero):
+        await self.add_many([hero])
+
+    async def add_many(self, heroes: List[DnDHero]):
+        # Checked and encoded before the roster changes, so that a hero that cannot be journaled is not kept either
+        self._check_failure()
+        record = frame(FRAME_ADD, encode_heroes(heroes))
+        await super().add_many(heroes)
+        await self._append(record, len(heroes), functools.partial(self._undo_add, list(heroes)))
+
+    async def remove(self, hero_id: str) -> bool:
+        return (await self.remove_many([hero_id]))[0]
+
+    async def remove_many(self, hero_ids: List[str]) -> List[bool]:
+        self._check_failure()
+        # Kept so that the removal can be undone should the journal write fail
+        heroes = [self.store.get(hero_id) for hero_id in hero_ids]
+        removed = await super().remove_many(hero_ids)
+        removed_heroes = [hero for hero, was_removed in zip(heroes, removed) if was_removed]
+        if removed_heroes:
+            record = frame(FRAME_REMOVE, encode_ids([hero.id for hero in removed_heroes]))
+            await self._append(record, len(removed_heroes), functools.partial(self._undo_remove, removed_heroes))
+        return removed
+
+    async def sync(self):
+        """Wait until every write made so far is durable, sharing one fsync with every concurrent caller."""
+        target = self._appended
+        while self._durable < target:
+            if self._flushing is None:
+                self._flushing = asyncio.ensure_future(self._flush())
+            await asyncio.shield(self._flushing)
+
+    async def snapshot(self):
+        """Move the journal to a new generation and write the roster to a snapshot of it in the background."""
+        if self._snapshot_task is not None:
+            await asyncio.gather(self._snapshot_task, return_exceptions=True)
+        await self.sync()
+        self.generation += 1
+        await self._io(self._rotate, self.generation)
+        self._since_snapshot = 0
+        # Heroes are never modified in place, so the list is a consistent copy of the roster
+        self._snapshot_task = asyncio.ensure_future(
+            asyncio.get_running_loop().run_in_executor(None, self._write_snapshot, self.generation,
+                                                       self.store.values()))
+        self._snapshot_task.add_done_callback(self._snapshot_done)
+
+    async def close(self):
+        if self._journal is None:
+            return
+        try:
+            if self._failure is None:
+                await self.sync()
+                if self.snapshot_on_close and self._since_snapshot:
+                    await self.snapshot()
+            if self._snapshot_task is not None:
+                await asyncio.gather(self._snapshot_task, return_exceptions=True)
+        finally:
+            self._executor.shutdown(wait=True)
+            self._journal.close()
+            self._journal = None
+            self._lock_file.close()
+
+    def _check_failure(self):
+        if self._failure is not None:
+            raise RuntimeError("The hero journal failed earlier; restart to recover") from self._failure
+
+    async def _append(self, record: bytes, records: int, undo: Callable[[], None]):
+        """Journal a change already made in memory; `undo` reverts it should the journal write fail."""
+        self._appended += records
+        self._since_snapshot += records
+        if self.fsync == "batch":
+            self._buffer += record
+            self._pending.append(undo)
+        else:
+            try:
+                await self._write(record, self._appended, self.fsync == "always")
+            except BaseException:
+                undo()
+                raise
+        if self._since_snapshot >= self.snapshot_every and (self._snapshot_task is None or self._snapshot_task.done()):
+            await self.snapshot()
+
+    async def _flush(self):
+        try:
+            self._check_failure()
+            record, self._buffer = bytes(self._buffer), bytearray()
+            pending, self._pending = self._pending, []
+            try:
+                await self._write(record, self._appended, True)
+            except BaseException:
+                # Every write not yet durable is reverted, the latest first, including those
+                # buffered while this flush was running, as they will never be written now
+                for undo in reversed(pending + self._pending):
+                    undo()
+                self._buffer, self._pending = bytearray(), []
+                raise
+        finally:
+            self._flushing = None
+
+    def _undo_add(self, heroes: List[DnDHero]):
+        for hero in heroes:
+            if self.store.remove(hero.id) is not None:
+                self.index.remove(hero)
+        # The version moves on rather than back, so that no ETag is ever reused for another roster
+        self._version += len(heroes)
+
+    def _undo_remove(self, heroes: List[DnDHero]):
+        # Restored heroes are sequenced anew, so they page after the heroes added before them
+        for hero in heroes:
+            self.store.add(hero)
+        self.index.add_many(heroes)
+        self._version += len(heroes)
+
+    async def _write(self, record: bytes, appended: int, fsync: bool):
+        started = time.perf_counter()
+        try:
+            if fsync:
+                await self._io(self._write_journal, record, True)
+            else:
+                # A write into the page cache costs less than handing it to the journal thread
+                self._write_journal(record, False)
+        except BaseException as e:
+            self._failure = e
+            logger.critical("Writing the hero journal failed, no further writes are accepted: %s", e)
+            raise
+        HERO_JOURNAL_SYNC_SECONDS.labels(self.fsync).observe(time.perf_counter() - started)
+        self._durable = max(self._durable, appended)
+
+    async def _io(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _write_journal(self, record: bytes, fsync: bool):
+        view = memoryview(record)
+        while view:
+            view = view[self._journal.write(view):]
+        if fsync:
+            _datasync(self._journal.fileno())
+
+    def _rotate(self, generation: int):
+        _datasync(self._journal.fileno())
+        self._journal.close()
+        self._journal = open(self._path("journal", generation), "wb", buffering=0)
+        self._journal.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION))
+        _datasync(self._journal.fileno())
+        _fsync_directory(self.directory)
+
+    def _write_snapshot(self, generation: int, heroes: List[DnDHero]):
+        started = time.perf_counter()
+        path = self._path("snapshot", generation)
+        with open(path + ".tmp", "wb") as file:
+            file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION))
+            for start in range(0, len(heroes), SNAPSHOT_BLOCK_SIZE):
+                file.write(frame(FRAME_ADD, encode_heroes(heroes[start:start + SNAPSHOT_BLOCK_SIZE])))
+            # Only a snapshot ending in this frame is complete
+            file.write(frame(FRAME_END, b""))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+        _fsync_directory(self.directory)
+
+        # The snapshot replaces every older file
+        for name in os.listdir(self.directory):
+            match = JOURNAL_NAME.match(name) or SNAPSHOT_NAME.match(name)
+            if match and int(match.group(1)) < generation:
+                os.remove(os.path.join(self.directory, name))
+        _fsync_directory(self.directory)
+        HERO_JOURNAL_SNAPSHOT_SECONDS.observe(time.perf_counter() - started)
+        logger.info("Snapshot %d of %d heroes written in %.2fs.", generation, len(heroes),
+                    time.perf_counter() - started)
+
+    @staticmethod
+    def _snapshot_done(task: asyncio.Future):
+        if not task.cancelled() and task.exception() is not None:
+            # The journal still holds every write since the previous snapshot
+            logger.error("Writing a hero snapshot failed: %s", task.exception())
+
+    def _lock_directory(self):
+        self._lock_file = open(os.path.join(self.directory, "LOCK"), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._lock_file.close()
+                raise RuntimeError(f"The hero journal at {self.directory} is in use by another process")
+
+    def _path(self, kind: str, generation: int) -> str:
+        return os.path.join(self.directory, f"{kind}-{generation:010d}.{'log' if kind == 'journal' else 'snap'}")
+
+    def _generations(self, pattern: re.Pattern) -> List[int]:
+        return sorted(int(match.group(1)) for match in map(pattern.match, os.listdir(self.directory)) if match)
+
+    def _load_snapshot(self) -> Tuple[int, int]:
+        """Load the latest snapshot, returning its generation (0 without one) and its number of heroes."""
+        generations = self._generations(SNAPSHOT_NAME)
+        if not generations:
+            return 0, 0
+        generation = generations[-1]
+        mapped = _MappedFile(self._path("snapshot", generation))
+        try:
+            frames, _ = read_frames(mapped.buffer)
+            if not frames or frames[-1][0] != FRAME_END:
+                raise RuntimeError(f"Hero snapshot {generation} is incomplete or corrupt")
+            count = 0
+            with memoryview(mapped.buffer) as view:
+                for _, start, end in frames[:-1]:
+                    heroes = decode_heroes(view[start:end])
+                    self._apply_add(heroes)
+                    count += len(heroes)
+        finally:
+            mapped.close()
+        return generation, count
+
+    def _replay_journals(self, snapshot_generation: int) -> int:
+        """Replay every journal since the snapshot, truncating a torn record at the end of the last one."""
+        generations = [generation for generation in self._generations(JOURNAL_NAME) if generation >= snapshot_generation]
+        self.generation = generations[-1] if generations else max(snapshot_generation, 1)
+        replayed = 0
+        for generation in generations:
+            path = self._path("journal", generation)
+            mapped = _MappedFile(path)
+            try:
+                size = len(mapped.buffer)
+                # A journal whose header is incomplete was being created when the process stopped
+                frames, end = read_frames(mapped.buffer) if size >= FILE_HEADER.size else ([], 0)
+                with memoryview(mapped.buffer) as view:
+                    for kind, start, end_of_frame in frames:
+                        if kind == FRAME_ADD:
+                            heroes = decode_heroes(view[start:end_of_frame])
+                            self._apply_add(heroes)
+                            replayed += len(heroes)
+                        elif kind == FRAME_REMOVE:
+                            hero_ids = decode_ids(view[start:end_of_frame])
+                            self._apply_remove(hero_ids)
+                            replayed += len(hero_ids)
+            finally:
+                mapped.close()
+            if end < size:
+                if generation != generations[-1]:
+                    raise RuntimeError(f"Hero journal {generation} is corrupt at offset {end}")
+                logger.warning("Discarding %d bytes of an incomplete record at the end of hero journal %d.",
+                               size - end, generation)
+                os.truncate(path, end)
+        return replayed
+
+    def _apply_add(self, heroes: List[DnDHero]):
+        for hero in heroes:
+            self.store.add(hero)
+        self.index.add_many(heroes)
+        self._version += len(heroes)
+
+    def _apply_remove(self, hero_ids: List[str]):
+        for hero_id in hero_ids:
+            hero = self.store.remove(hero_id)
+            if hero is not None:
+                self.index.remove(hero)
+                self._version += 1
@@ -1,58 +1,299 @@
 # server/services/hero_service.py
 
-from typing import List, Optional
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 from server.models.dnd_hero import DnDHero
+from server.models.hero_query import HeroQuery
 import uuid
-import asyncio
-from server.logger import logger
+from server.logger import get_logger
+from server.services.hero_analytics import HeroAnalytics
+from server.services.hero_backend import HeroBackend, InMemoryHeroBackend
+from server.services.hero_events import HeroEventHub
+from server.services.metrics import Counter, Gauge, Histogram, timed
+from server.services.rw_lock import AsyncRWLock
+
+# Named so that its per-request lines can be sampled with LOG_SAMPLE_RATES={"server.heroes": ...}.
+# Records are logged after the lock is released, so that logging never extends a critical section
+logger = get_logger("heroes")
+
+HERO_SERVICE_SECONDS = Histogram("hero_service_seconds", "Duration of HeroService calls, lock waits included.",
+                                 ["method"])
+HERO_SERVICE_ERRORS = Counter("hero_service_errors_total", "HeroService calls that raised.", ["method"])
+# Set when metrics are collected rather than on every create and delete
+ROSTER_SIZE = Gauge("hero_roster_size", "Number of heroes in the roster.")
+
+
+def _timed(method: str):
+    return timed(HERO_SERVICE_SECONDS, method, errors=HERO_SERVICE_ERRORS)
+
+
+def encode_cursor(seq: int) -> str:
+    """Wrap a store sequence number in an opaque, URL-safe pagination cursor."""
+    return base64.urlsafe_b64encode(f"h{seq}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Inverse of encode_cursor, raising ValueError for cursors this service did not issue."""
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Malformed cursor")
+    if not decoded.startswith("h") or not decoded[1:].isdigit():
+        raise ValueError("Malformed cursor")
+    return int(decoded[1:])
 
 
 class HeroService:
-    def __init__(self):
+    def __init__(self, backend: Optional[HeroBackend] = None, encoded_cache_size: int = 100_000,
+                 list_cache_max_bytes: int = 64 * 1024 * 1024, events: Optional[HeroEventHub] = None):
+
+        # Storage engine, in-memory unless a durable one is configured
+        self.backend = backend or InMemoryHeroBackend()
+
+        # Readers-writer lock: reads proceed in parallel, creates and deletes are exclusive
+        self.lock = AsyncRWLock("heroes")
+
+        # Version of each hero written by this process; heroes loaded from durable storage are at 0.
+        # Heroes are never modified in place, so a version only ever labels one content
+        self._hero_versions: Dict[str, int] = {}
+        self._next_version = 1
+
+        # JSON encoding of recently served heroes, by id, tagged with the version it was made from
+        self._encoded: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()
+        self.encoded_cache_size = encoded_cache_size
+
+        # Encoded full roster, tagged with the collection version it was made from
+        self._list_body: Optional[Tuple[int, bytes]] = None
+        self.list_cache_max_bytes = list_cache_max_bytes
+
+        # Columnar copy of the roster for aggregates, loaded on the first stats request and kept
+        # current by this process's creates and deletes. It is tagged with the collection version
+        # it reflects, so that it is loaded again once the roster has changed otherwise: written by
+        # another worker sharing the database, or a write the journal rolled back
+        self.analytics = HeroAnalytics()
+        self._analytics_version: Optional[int] = None
+
+        # Change feed of creates and deletes, published under the write lock so events follow the order of writes.
+        # Event data is a JSON array of the heroes created or the ids deleted, encoded only once someone reads it
+        self.events = events or HeroEventHub()
+
+    def _bump(self, hero_id: str):
+        self._hero_versions[hero_id] = self._next_version
+        self._next_version += 1
+
+    def _forget(self, hero_id: str):
+        self._hero_versions.pop(hero_id, None)
+        self._encoded.pop(hero_id, None)
+
+    def _update_analytics(self, added: Sequence[DnDHero] = (), removed: Sequence[str] = ()):
+        """
+        Apply a write of this process to the analytics columns. Every hero added or removed
+        moves the collection version on by one, which the tag follows.
+        """
+        if self._analytics_version is None:
+            return
+        for hero in added:
+            self.analytics.add(hero)
+        for hero_id in removed:
+            self.analytics.remove(hero_id)
+        self._analytics_version += len(added) + len(removed)
 
-        # In-memory structure to store heroes
-        self.heroes_db: List[DnDHero] = []
+    async def _sync(self):
+        """
+        Wait until this process's writes are durable. Writes the backend fails to persist are
+        rolled back after their events went out, so subscribers are then told to reload.
+        """
+        try:
+            await self.backend.sync()
+        except Exception:
+            self.events.publish_resync("rollback")
+            raise
 
-        # Lock to handle concurrent access
-        self.lock = asyncio.Lock()
+    def hero_version(self, hero_id: str) -> int:
+        return self._hero_versions.get(hero_id, 0)
 
+    def encode_hero(self, hero: DnDHero) -> bytes:
+        """JSON encoding of a hero, re-encoded only when the hero's version has changed."""
+        version = self._hero_versions.get(hero.id, 0)
+        entry = self._encoded.get(hero.id)
+        if entry is not None and entry[0] == version:
+            self._encoded.move_to_end(hero.id)
+            return entry[1]
+
+        encoded = hero.model_dump_json().encode()
+        self._encoded[hero.id] = (version, encoded)
+        if len(self._encoded) > self.encoded_cache_size:
+            self._encoded.popitem(last=False)
+        return encoded
+
+    def encode_heroes(self, heroes: List[DnDHero]) -> bytes:
+        return b"[" + b",".join(map(self.encode_hero, heroes)) + b"]"
+
+    @_timed("create_hero")
     async def create_hero(self, hero: DnDHero) -> DnDHero:
-        async with self.lock:
+        async with self.lock.write():
             hero.id = str(uuid.uuid4())
-            self.heroes_db.append(hero)
-            logger.info(f"Hero '{hero.name}' created with ID: {hero.id}")
-            return hero
+            await self.backend.add(hero)
+            self._bump(hero.id)
+            self._update_analytics(added=[hero])
+            self.events.publish("created", lambda: self.encode_heroes([hero]))
+        # Outside the lock, so that concurrent writers can share one fsync
+        await self._sync()
+        logger.info("Hero '%s' created with ID: %s", hero.name, hero.id)
+        return hero
 
+    @_timed("create_heroes")
+    async def create_heroes(self, heroes: List[DnDHero]) -> List[DnDHero]:
+        """Create a batch of heroes under a single write lock, logging once for the whole batch."""
+        async with self.lock.write():
+            for hero in heroes:
+                hero.id = str(uuid.uuid4())
+            await self.backend.add_many(heroes)
+            for hero in heroes:
+                self._bump(hero.id)
+            self._update_analytics(added=heroes)
+            if heroes:
+                created = list(heroes)
+                self.events.publish("created", lambda: self.encode_heroes(created))
+        await self._sync()
+        logger.info("Bulk created %d heroes.", len(heroes))
+        return heroes
+
+    @_timed("get_hero")
     async def get_hero(self, hero_id: str) -> Optional[DnDHero]:
-        async with self.lock:
-            hero = next((h for h in self.heroes_db if h.id == hero_id), None)
-            if hero:
-                logger.info(f"Hero '{hero_id}' retrieved.")
-            else:
-                logger.warning(f"Hero '{hero_id}' not found.")
-            return hero
+        async with self.lock.read():
+            hero = await self.backend.get(hero_id)
+        if hero:
+            logger.info("Hero '%s' retrieved.", hero_id)
+        else:
+            logger.warning("Hero '%s' not found.", hero_id)
+        return hero
 
+    @_timed("list_heroes")
     async def list_heroes(self) -> List[DnDHero]:
-        async with self.lock:
-            logger.info(f"Listing all heroes. Total count: {len(self.heroes_db)}")
-            return self.heroes_db.copy()
+        async with self.lock.read():
+            heroes = await self.backend.list_all()
+        logger.info("Listing all heroes. Total count: %d", len(heroes))
+        return heroes
+
+    @_timed("list_heroes_json")
+    async def list_heroes_json(self) -> Tuple[bytes, int]:
+        """The whole roster as a JSON array, with the collection version it reflects."""
+        async with self.lock.read():
+            version = await self.backend.version()
+            if self._list_body is not None and self._list_body[0] == version:
+                return self._list_body[1], version
+
+            heroes = await self.backend.list_all()
+            body = self.encode_heroes(heroes)
+            self._list_body = (version, body) if len(body) <= self.list_cache_max_bytes else None
+        logger.info("Listing all heroes. Total count: %d", len(heroes))
+        return body, version
+
+    @_timed("collection_version")
+    async def collection_version(self) -> int:
+        """Version of the roster as a whole, increased by every create and delete."""
+        async with self.lock.read():
+            return await self.backend.version()
+
+    @_timed("list_heroes_page")
+    async def list_heroes_page(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[DnDHero], Optional[str]]:
+        """Return one page of heroes in insertion order and the cursor of the next page, if any."""
+        after = decode_cursor(cursor) if cursor else None
+        async with self.lock.read():
+            heroes, next_seq = await self.backend.page(after, limit)
+        return heroes, encode_cursor(next_seq) if next_seq is not None else None
+
+    async def iter_heroes(self, chunk_size: int) -> AsyncIterator[List[DnDHero]]:
+        """Yield the roster in chunks, taking the lock once per chunk rather than for the whole walk."""
+        after = None
+        while True:
+            async with self.lock.read():
+                heroes, after = await self.backend.page(after, chunk_size)
+            if heroes:
+                yield heroes
+            if after is None:
+                return
 
+    @_timed("delete_hero")
     async def delete_hero(self, hero_id: str) -> bool:
-        async with self.lock:
-            hero = next((h for h in self.heroes_db if h.id == hero_id), None)
-            if hero:
-                self.heroes_db.remove(hero)
-                logger.info(f"Hero '{hero_id}' deleted.")
-                return True
-            else:
-                logger.warning(f"Hero '{hero_id}' not found for deletion.")
-                return False
+        async with self.lock.write():
+            removed = await self.backend.remove(hero_id)
+            if removed:
+                self._forget(hero_id)
+                self._update_analytics(removed=[hero_id])
+                self.events.publish("deleted", lambda: json.dumps([hero_id]).encode())
+        await self._sync()
+        if removed:
+            logger.info("Hero '%s' deleted.", hero_id)
+        else:
+            logger.warning("Hero '%s' not found for deletion.", hero_id)
+        return removed
+
+    @_timed("delete_heroes")
+    async def delete_heroes(self, hero_ids: List[str]) -> List[bool]:
+        """Delete a batch of heroes under a single write lock, reporting which ids existed."""
+        async with self.lock.write():
+            removed = await self.backend.remove_many(hero_ids)
+            deleted = [hero_id for hero_id, was_removed in zip(hero_ids, removed) if was_removed]
+            for hero_id in deleted:
+                self._forget(hero_id)
+            self._update_analytics(removed=deleted)
+            if deleted:
+                self.events.publish("deleted", lambda: json.dumps(deleted).encode())
+        await self._sync()
+        logger.info("Bulk deleted %d of %d heroes.", sum(removed), len(hero_ids))
+        return removed
+
+    @_timed("query_heroes")
+    async def query_heroes(self, query: HeroQuery) -> List[DnDHero]:
+        async with self.lock.read():
+            results = await self.backend.query(query)
+        logger.info("Found %d heroes matching %s.", len(results), query)
+        return results
 
     async def query_heroes_fireball_low_ac(self) -> List[DnDHero]:
-        async with self.lock:
-            results = [
-                hero for hero in self.heroes_db
-                if "Fireball" in hero.spells and hero.armor_class < 20
-            ]
-            logger.info(f"Found {len(results)} heroes with Fireball and AC < 20.")
-            return results
+        return await self.query_heroes(HeroQuery(spell="Fireball", max_armor_class=19))
+
+    @_timed("hero_stats")
+    async def hero_stats(self, field: str, group_by: Optional[str] = None,
+                         percentiles: Sequence[float] = (25, 50, 75)) -> List[dict]:
+        await self._load_analytics()
+        async with self.lock.read():
+            return self.analytics.summary(field, group_by, percentiles)
+
+    @_timed("hero_distribution")
+    async def hero_distribution(self, field: str, bin_width: int = 1, group_by: Optional[str] = None) -> List[dict]:
+        await self._load_analytics()
+        async with self.lock.read():
+            return self.analytics.distribution(field, bin_width, group_by)
+
+    async def _load_analytics(self):
+        """Load the roster into the analytics columns unless they reflect its current version."""
+        async with self.lock.read():
+            if await self.backend.version() == self._analytics_version:
+                return
+        async with self.lock.write():
+            # Read before the heroes, so that a write by another worker in between causes a reload next time
+            version = await self.backend.version()
+            if version != self._analytics_version:
+                heroes = await self.backend.list_all()
+                analytics = HeroAnalytics()
+                for hero in heroes:
+                    analytics.add(hero)
+                self.analytics, self._analytics_version = analytics, version
+                logger.info("Loaded %d heroes into the analytics columns.", len(heroes))
+
+    @_timed("count_heroes")
+    async def count_heroes(self) -> int:
+        async with self.lock.read():
+            return await self.backend.count()
+
+    async def open(self):
+        await self.backend.open()
+
+    async def close(self):
+        await self.backend.close()
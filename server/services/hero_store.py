@@ -0,0 +1,96 @@
+# server/services/hero_store.py
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from server.models.dnd_hero import DnDHero
+
+# Compact the insertion log once deleted slots outnumber live ones (and there are at least this many)
+COMPACTION_THRESHOLD = 1024
+
+
+class HeroStore:
+    """
+    In-memory hero storage indexed by id.
+
+    Heroes live in a single dict, which gives O(1) lookups and deletes while preserving
+    insertion order, so listing stays stable across creates and deletes.
+
+    Every hero is also given a monotonically increasing sequence number, recorded in an
+    insertion log. Pages are addressed by the last sequence number seen, so a cursor keeps
+    its place when heroes before or after it are deleted concurrently.
+    """
+
+    def __init__(self):
+        self._heroes: Dict[str, DnDHero] = {}
+        self._seqs: Dict[str, int] = {}
+
+        # Insertion log: sorted sequence numbers and the matching ids, None once deleted
+        self._log_seqs: List[int] = []
+        self._log_ids: List[Optional[str]] = []
+        self._deleted = 0
+        self._next_seq = 1
+
+    def add(self, hero: DnDHero):
+        if hero.id in self._heroes:
+            self.remove(hero.id)
+
+        seq = self._next_seq
+        self._next_seq += 1
+        self._heroes[hero.id] = hero
+        self._seqs[hero.id] = seq
+        self._log_seqs.append(seq)
+        self._log_ids.append(hero.id)
+
+    def get(self, hero_id: str) -> Optional[DnDHero]:
+        return self._heroes.get(hero_id)
+
+    def remove(self, hero_id: str) -> Optional[DnDHero]:
+        hero = self._heroes.pop(hero_id, None)
+        if hero is None:
+            return None
+
+        position = bisect_left(self._log_seqs, self._seqs.pop(hero_id))
+        self._log_ids[position] = None
+        self._deleted += 1
+        if self._deleted > COMPACTION_THRESHOLD and self._deleted * 2 > len(self._log_ids):
+            self._compact()
+        return hero
+
+    def values(self) -> List[DnDHero]:
+        return list(self._heroes.values())
+
+    def page(self, after: Optional[int], limit: int) -> Tuple[List[DnDHero], Optional[int]]:
+        """
+        Return up to `limit` heroes inserted after sequence number `after`, and the sequence
+        number to resume from, or None when there are no more heroes.
+        """
+        position = bisect_right(self._log_seqs, after) if after is not None else 0
+        heroes = []
+        while position < len(self._log_ids) and len(heroes) < limit:
+            hero_id = self._log_ids[position]
+            if hero_id is not None:
+                heroes.append(self._heroes[hero_id])
+            position += 1
+
+        # Skip trailing deleted slots so the last page does not hand out a cursor to nothing
+        while position < len(self._log_ids) and self._log_ids[position] is None:
+            position += 1
+        if position == len(self._log_ids) or not heroes:
+            return heroes, None
+        return heroes, self._seqs[heroes[-1].id]
+
+    def _compact(self):
+        live = [(seq, hero_id) for seq, hero_id in zip(self._log_seqs, self._log_ids) if hero_id is not None]
+        self._log_seqs = [seq for seq, _ in live]
+        self._log_ids = [hero_id for _, hero_id in live]
+        self._deleted = 0
+
+    def __contains__(self, hero_id: str) -> bool:
+        return hero_id in self._heroes
+
+    def __iter__(self) -> Iterator[DnDHero]:
+        return iter(self._heroes.values())
+
+    def __len__(self) -> int:
+        return len(self._heroes)
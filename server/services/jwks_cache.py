@@ -0,0 +1,179 @@
+# server/services/jwks_cache.py
+
+import asyncio
+import random
+import re
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from jwt import PyJWK
+from jwt.exceptions import PyJWKError
+
+from server.logger import logger
+from server.services.metrics import Counter, Histogram
+
+JWKS_LOOKUPS = Counter("jwks_cache_lookups_total", "Signing key lookups by outcome: hit, stale or miss.", ["result"])
+JWKS_FETCH_SECONDS = Histogram("jwks_fetch_seconds", "Latency of JWKS fetches from the identity provider.")
+JWKS_FETCH_ERRORS = Counter("jwks_fetch_errors_total", "JWKS fetches that failed.")
+
+# Matches the max-age directive of a Cache-Control header
+MAX_AGE_PATTERN = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+class JWKSCache:
+    """
+    Process-wide cache of the identity provider's signing keys.
+
+    Keys are parsed once into public key objects and indexed by `kid`. The key set is
+    kept fresh by a background task that refreshes it shortly before its TTL expires.
+    Unknown key ids trigger an on-demand refetch, rate limited so that tokens carrying
+    bogus `kid` values cannot turn into a fetch storm. If the provider is unreachable
+    the last known keys keep being served.
+    """
+
+    def __init__(
+            self,
+            jwks_url: str,
+            http_client: Optional[httpx.AsyncClient] = None,
+            default_ttl: float = 3600.0,
+            min_ttl: float = 60.0,
+            max_ttl: float = 86400.0,
+            refresh_ahead: float = 0.1,
+            unknown_kid_interval: float = 30.0,
+            retry_interval: float = 30.0,
+            timeout: float = 5.0,
+    ):
+        self.jwks_url = jwks_url
+        self.http_client = http_client
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        # Fraction of the TTL before expiry at which the background refresh kicks in
+        self.refresh_ahead = refresh_ahead
+        # Minimum number of seconds between two refetches caused by unknown key ids
+        self.unknown_kid_interval = unknown_kid_interval
+        # Delay before retrying a failed background refresh
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+
+        self._keys: Dict[str, Any] = {}
+        self._expires_at = 0.0
+        self._last_fetch = float("-inf")
+        self._fetch_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._hits, self._stale, self._misses = (JWKS_LOOKUPS.labels(result) for result in ("hit", "stale", "miss"))
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() >= self._expires_at
+
+    async def get_signing_key(self, kid: str) -> Optional[Any]:
+        """Return the public key for `kid`, fetching the key set only when needed."""
+        self._ensure_refresh_task()
+
+        key = self._keys.get(kid)
+        if key is not None and not self.is_stale:
+            self._hits.inc()
+            return key
+
+        if key is not None:
+            self._stale.inc()
+            # The keys are past their TTL and the background refresh has not caught up,
+            # try once and fall back to the stale key if the provider is unreachable
+            await self._refresh(min_interval=self.retry_interval)
+            return self._keys.get(kid, key)
+
+        # Unknown kid, the provider may have rotated its keys
+        self._misses.inc()
+        await self._refresh(min_interval=self.unknown_kid_interval)
+        return self._keys.get(kid)
+
+    async def refresh(self) -> bool:
+        """Force a refetch of the key set. Returns whether the fetch succeeded."""
+        return await self._refresh(min_interval=0.0)
+
+    def start(self):
+        """Start the background refresh task on the running event loop."""
+        self._ensure_refresh_task()
+
+    async def stop(self):
+        """Cancel the background refresh task."""
+        task, self._refresh_task = self._refresh_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _refresh(self, min_interval: float) -> bool:
+        # Coalesce concurrent refreshes: callers queued behind an in-flight fetch re-check
+        # the interval once they get the lock and return without fetching again
+        async with self._fetch_lock:
+            if time.monotonic() - self._last_fetch < min_interval:
+                return False
+            self._last_fetch = time.monotonic()
+            try:
+                await self._fetch()
+                return True
+            except (httpx.HTTPError, ValueError, KeyError, PyJWKError) as e:
+                JWKS_FETCH_ERRORS.inc()
+                logger.error("Failed to refresh JWKS from %s, serving %d cached keys: %s",
+                             self.jwks_url, len(self._keys), e)
+                return False
+
+    async def _fetch(self):
+        logger.info("Fetching JWKS from %s", self.jwks_url)
+        started = time.perf_counter()
+        try:
+            response = await self._get()
+        finally:
+            JWKS_FETCH_SECONDS.observe(time.perf_counter() - started)
+        response.raise_for_status()
+
+        keys = {}
+        for jwk in response.json()["keys"]:
+            if jwk.get("kty") != "RSA" or "kid" not in jwk:
+                continue
+            keys[jwk["kid"]] = PyJWK(jwk, algorithm="RS256").key
+
+        if not keys:
+            raise ValueError("JWKS document contains no usable RSA keys")
+
+        ttl = self._ttl_from_headers(response.headers)
+        self._keys = keys
+        self._expires_at = time.monotonic() + ttl
+        logger.info("Cached %d signing keys for %.0f seconds", len(keys), ttl)
+
+    async def _get(self) -> httpx.Response:
+        if self.http_client is not None:
+            return await self.http_client.get(self.jwks_url, timeout=self.timeout)
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            return await client.get(self.jwks_url)
+
+    def _ttl_from_headers(self, headers: httpx.Headers) -> float:
+        cache_control = headers.get("cache-control", "")
+        if "no-store" in cache_control or "no-cache" in cache_control:
+            return self.min_ttl
+        match = MAX_AGE_PATTERN.search(cache_control)
+        ttl = float(match.group(1)) if match else self.default_ttl
+        return min(max(ttl, self.min_ttl), self.max_ttl)
+
+    def _ensure_refresh_task(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            if self._keys:
+                # Refresh ahead of expiry, with jitter so that workers do not refresh in lockstep
+                remaining = self._expires_at - time.monotonic()
+                lead = (self._expires_at - self._last_fetch) * self.refresh_ahead
+                await asyncio.sleep(max(remaining - lead * random.uniform(1.0, 1.5), 0.0))
+                succeeded = await self.refresh()
+            else:
+                # Initial load, unless a caller has just fetched the key set on demand
+                succeeded = await self._refresh(min_interval=self.retry_interval) or bool(self._keys)
+            if not succeeded:
+                await asyncio.sleep(self.retry_interval)
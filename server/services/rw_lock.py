@@ -0,0 +1,166 @@
+# server/services/rw_lock.py
+
+import asyncio
+import time
+from collections import deque
+from typing import AsyncContextManager, Deque, Optional
+
+from server.services.metrics import Histogram
+
+# Lock waits and holds are mostly far below a millisecond, so the buckets start at a microsecond
+LOCK_BUCKETS = (0.000001, 0.000005, 0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+LOCK_WAIT = Histogram("rw_lock_wait_seconds", "Time spent waiting to acquire a readers-writer lock.",
+                      ["lock", "mode"], buckets=LOCK_BUCKETS)
+LOCK_HOLD = Histogram("rw_lock_hold_seconds", "Time a readers-writer lock was held.",
+                      ["lock", "mode"], buckets=LOCK_BUCKETS)
+
+
+class AsyncRWLock:
+    """
+    Readers-writer lock for asyncio tasks.
+
+    Any number of readers may hold the lock at once; a writer holds it alone. The lock is
+    phase-fair: once a writer is waiting, new readers queue behind it, so writers are not
+    starved, and when a writer releases the lock every queued reader is admitted together,
+    so readers are not starved either. An uncontended read acquire completes without
+    suspending the task.
+
+    A named lock records its wait and hold times in the LOCK_WAIT and LOCK_HOLD histograms.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name
+        if name is not None:
+            self._read_timings = (LOCK_WAIT.labels(name, "read").observe, LOCK_HOLD.labels(name, "read").observe)
+            self._write_timings = (LOCK_WAIT.labels(name, "write").observe, LOCK_HOLD.labels(name, "write").observe)
+        else:
+            self._read_timings = self._write_timings = None
+        self._readers = 0
+        self._writer = False
+        self._read_waiters: Deque[asyncio.Future] = deque()
+        self._write_waiters: Deque[asyncio.Future] = deque()
+
+    def read(self) -> AsyncContextManager[None]:
+        return _ReadGuard(self) if self._read_timings is None else _TimedGuard(
+            self.acquire_read, self.release_read, self._read_timings)
+
+    def write(self) -> AsyncContextManager[None]:
+        return _WriteGuard(self) if self._write_timings is None else _TimedGuard(
+            self.acquire_write, self.release_write, self._write_timings)
+
+    @property
+    def readers(self) -> int:
+        return self._readers
+
+    @property
+    def writer_active(self) -> bool:
+        return self._writer
+
+    async def acquire_read(self):
+        if not self._writer and not self._write_waiters:
+            self._readers += 1
+            return
+        await self._wait(self._read_waiters, self.release_read)
+
+    async def acquire_write(self):
+        if not self._writer and self._readers == 0 and not self._write_waiters:
+            self._writer = True
+            return
+        await self._wait(self._write_waiters, self.release_write)
+
+    def release_read(self):
+        self._readers -= 1
+        if self._readers == 0:
+            self._wake_writer()
+
+    def release_write(self):
+        self._writer = False
+        # Admit the whole batch of readers that queued up behind this writer
+        if not self._wake_readers():
+            self._wake_writer()
+
+    async def _wait(self, waiters: Deque[asyncio.Future], release):
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The lock was handed over just as the task was cancelled, pass it on
+                release()
+            else:
+                waiters.remove(future)
+                self._wake_after_cancel()
+            raise
+
+    def _wake_readers(self) -> bool:
+        woken = False
+        while self._read_waiters:
+            future = self._read_waiters.popleft()
+            if not future.done():
+                self._readers += 1
+                future.set_result(None)
+                woken = True
+        return woken
+
+    def _wake_writer(self) -> bool:
+        while self._write_waiters:
+            future = self._write_waiters.popleft()
+            if not future.done():
+                self._writer = True
+                future.set_result(None)
+                return True
+        return False
+
+    def _wake_after_cancel(self):
+        # A cancelled writer may have been the only thing holding queued readers back
+        if not self._writer and not self._write_waiters:
+            self._wake_readers()
+        elif not self._writer and self._readers == 0:
+            self._wake_writer()
+
+
+class _ReadGuard:
+    __slots__ = ("_lock",)
+
+    def __init__(self, lock: AsyncRWLock):
+        self._lock = lock
+
+    async def __aenter__(self):
+        await self._lock.acquire_read()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._lock.release_read()
+
+
+class _WriteGuard:
+    __slots__ = ("_lock",)
+
+    def __init__(self, lock: AsyncRWLock):
+        self._lock = lock
+
+    async def __aenter__(self):
+        await self._lock.acquire_write()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._lock.release_write()
+
+
+class _TimedGuard:
+    __slots__ = ("_acquire", "_release", "_timings", "_acquired")
+
+    def __init__(self, acquire, release, timings):
+        self._acquire = acquire
+        self._release = release
+        self._timings = timings
+        self._acquired = 0.0
+
+    async def __aenter__(self):
+        started = time.perf_counter()
+        await self._acquire()
+        self._acquired = time.perf_counter()
+        self._timings[0](self._acquired - started)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._release()
+        self._timings[1](time.perf_counter() - self._acquired)
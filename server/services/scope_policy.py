@@ -0,0 +1,59 @@
+# server/services/scope_policy.py
+
+import functools
+from typing import Dict, Iterable, List, Tuple, Union
+
+
+class ScopePolicy:
+    """
+    Role hierarchy compiled into bitmasks.
+
+    Every scope named in the hierarchy gets one bit, and every role the mask of all the
+    scopes it grants, directly or through the roles it grants in turn. A token's scopes and
+    roles then reduce to the OR of their masks, memoized per distinct set, and a requirement
+    of "any of these scopes" to a mask of its own, so each decision is a single AND.
+    """
+
+    def __init__(self, hierarchy: Dict[str, List[str]], cache_size: int = 1024):
+        self._bits: Dict[str, int] = {}
+        for role, granted in hierarchy.items():
+            for scope in (role, *granted):
+                self._bits.setdefault(scope, 1 << len(self._bits))
+        self._grants = {role: self._closure(role, hierarchy) for role in hierarchy}
+        # Masks by scope set; tokens carry a handful of distinct sets, so the cache is simply
+        # dropped if it ever fills up
+        self._masks: Dict[Union[str, Tuple[str, ...]], int] = {}
+        self.cache_size = cache_size
+
+    def requirement(self, *required_scopes: str) -> int:
+        """Mask met by a token granting any of `required_scopes`; scopes no role grants never match."""
+        return functools.reduce(lambda mask, scope: mask | self._bits.get(scope, 0), required_scopes, 0)
+
+    def mask(self, token_scopes: Iterable[str]) -> int:
+        """Mask of every scope granted by `token_scopes`, through the hierarchy."""
+        return functools.reduce(lambda mask, scope: mask | self._grants.get(scope, 0), token_scopes, 0)
+
+    def claims_mask(self, claims: dict) -> int:
+        """Mask granted by a token's delegated scopes ('scp') and application roles ('roles')."""
+        scp, roles = claims.get("scp", ""), claims.get("roles")
+        key = (scp, *roles) if roles else scp
+        mask = self._masks.get(key)
+        if mask is None:
+            if len(self._masks) >= self.cache_size:
+                self._masks.clear()
+            mask = self._masks[key] = self.mask(scp.split()) | self.mask(roles or ())
+        return mask
+
+    @staticmethod
+    def allows(token_mask: int, requirement: int) -> bool:
+        return token_mask & requirement != 0
+
+    def _closure(self, role: str, hierarchy: Dict[str, List[str]]) -> int:
+        mask, pending, seen = 0, [role], {role}
+        while pending:
+            for scope in hierarchy.get(pending.pop(), ()):
+                mask |= self._bits[scope]
+                if scope in hierarchy and scope not in seen:
+                    seen.add(scope)
+                    pending.append(scope)
+        return mask
@@ -0,0 +1,342 @@
+# server/services/sqlite_backend.py
+
+import asyncio
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from server.logger import logger
+from server.models.ability_scores import AbilityScores
+from server.models.dnd_hero import DnDHero
+from server.models.equipment import Equipment
+from server.models.hero_query import HeroQuery
+from server.models.skill_proficiencies import SKILL_BITS, SkillProficiencies, skills_mask
+from server.models.spell import Spell
+from server.services.hero_backend import HeroBackend
+
+ABILITIES = tuple(AbilityScores.model_fields)
+
+
+# Upper bound on bound parameters per statement, below SQLite's default limit
+MAX_PARAMS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS heroes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    race TEXT NOT NULL,
+    class_ TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    background TEXT,
+    alignment TEXT,
+    strength INTEGER NOT NULL,
+    dexterity INTEGER NOT NULL,
+    constitution INTEGER NOT NULL,
+    intelligence INTEGER NOT NULL,
+    wisdom INTEGER NOT NULL,
+    charisma INTEGER NOT NULL,
+    skills INTEGER NOT NULL,
+    weapon TEXT,
+    armor TEXT,
+    items TEXT NOT NULL,
+    has_spells INTEGER NOT NULL,
+    hit_points INTEGER NOT NULL,
+    armor_class INTEGER NOT NULL,
+    speed INTEGER NOT NULL,
+    personality_traits TEXT,
+    ideals TEXT,
+    bonds TEXT,
+    flaws TEXT
+);
+CREATE TABLE IF NOT EXISTS spells (
+    spell_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    casting_time TEXT NOT NULL,
+    range TEXT NOT NULL,
+    components TEXT NOT NULL,
+    duration TEXT NOT NULL,
+    UNIQUE (name, level, casting_time, range, components, duration)
+);
+CREATE TABLE IF NOT EXISTS hero_spells (
+    hero_seq INTEGER NOT NULL REFERENCES heroes (seq) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    spell_id INTEGER NOT NULL REFERENCES spells (spell_id),
+    PRIMARY KEY (hero_seq, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_heroes_class ON heroes (class_ COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_heroes_race ON heroes (race COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_heroes_level ON heroes (level);
+CREATE INDEX IF NOT EXISTS idx_heroes_armor_class ON heroes (armor_class);
+CREATE INDEX IF NOT EXISTS idx_heroes_hit_points ON heroes (hit_points);
+CREATE INDEX IF NOT EXISTS idx_spells_name ON spells (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_hero_spells_spell ON hero_spells (spell_id, hero_seq);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value NOT NULL
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('instance_id', lower(hex(randomblob(6))));
+CREATE TRIGGER IF NOT EXISTS heroes_version_insert AFTER INSERT ON heroes
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'version';
+END;
+CREATE TRIGGER IF NOT EXISTS heroes_version_delete AFTER DELETE ON heroes
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'version';
+END;
+"""
+
+HERO_COLUMNS = ("id", "name", "race", "class_", "level", "background", "alignment", *ABILITIES, "skills",
+                "weapon", "armor", "items", "has_spells", "hit_points", "armor_class", "speed",
+                "personality_traits", "ideals", "bonds", "flaws")
+
+# Statements are constant strings so that each pooled connection prepares them once and
+# reuses them from its statement cache
+INSERT_HERO = f"INSERT INTO heroes ({', '.join(HERO_COLUMNS)}) VALUES ({', '.join('?' * len(HERO_COLUMNS))})"
+SELECT_HEROES = f"SELECT seq, {', '.join(HERO_COLUMNS)} FROM heroes"
+SELECT_HERO = f"{SELECT_HEROES} WHERE id = ?"
+SELECT_PAGE = f"{SELECT_HEROES} WHERE seq > ? ORDER BY seq LIMIT ?"
+SELECT_ALL = f"{SELECT_HEROES} ORDER BY seq"
+DELETE_HERO = "DELETE FROM heroes WHERE id = ?"
+COUNT_HEROES = "SELECT COUNT(*) FROM heroes"
+SELECT_META = "SELECT value FROM meta WHERE key = ?"
+UPSERT_SPELL = """
+INSERT INTO spells (name, level, casting_time, range, components, duration) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT DO UPDATE SET name = excluded.name
+RETURNING spell_id
+"""
+INSERT_HERO_SPELL = "INSERT INTO hero_spells (hero_seq, position, spell_id) VALUES (?, ?, ?)"
+SELECT_HERO_SPELLS = """
+SELECT hs.hero_seq, s.name, s.level, s.casting_time, s.range, s.components, s.duration
+FROM hero_spells hs JOIN spells s ON s.spell_id = hs.spell_id
+WHERE hs.hero_seq IN ({placeholders})
+ORDER BY hs.hero_seq, hs.position
+"""
+
+
+# Short string lists (equipment items, spell components) are stored as a JSON array in one
+# column, so that any string, empty or not, reads back unchanged
+def _join(values: Iterable[str]) -> str:
+    return json.dumps(list(values), separators=(",", ":"))
+
+
+def _split(value: str) -> List[str]:
+    return json.loads(value)
+
+
+class SQLiteHeroBackend(HeroBackend):
+    """
+    Durable single-node engine on SQLite in WAL mode.
+
+    Heroes are stored as typed columns rather than JSON: ability scores inline, skill
+    proficiencies as one bitmask, and spells normalized into a shared catalogue referenced
+    by position. Calls run on a small thread pool, each worker holding its own connection,
+    so WAL readers proceed in parallel without blocking the event loop.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._spell_ids: Dict[Tuple, int] = {}
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="hero-sqlite")
+
+    async def open(self):
+        """Create or connect to the database file and its schema."""
+        await self._run(self._create_schema)
+        logger.info("SQLite hero storage ready at %s", self.path)
+
+    def _create_schema(self):
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        # Shared by every worker using this database, so their ETags agree
+        self.instance_id = connection.execute(SELECT_META, ("instance_id",)).fetchone()[0]
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.execute("PRAGMA busy_timeout = 5000")
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def add(self, hero: DnDHero):
+        await self._run(self._add_many, [hero])
+
+    async def add_many(self, heroes: List[DnDHero]):
+        await self._run(self._add_many, heroes)
+
+    async def get(self, hero_id: str) -> Optional[DnDHero]:
+        heroes = await self._run(self._select, SELECT_HERO, (hero_id,))
+        return heroes[0] if heroes else None
+
+    async def remove(self, hero_id: str) -> bool:
+        return (await self._run(self._remove_many, [hero_id]))[0]
+
+    async def remove_many(self, hero_ids: List[str]) -> List[bool]:
+        return await self._run(self._remove_many, hero_ids)
+
+    async def list_all(self) -> List[DnDHero]:
+        return await self._run(self._select, SELECT_ALL, ())
+
+    async def page(self, after: Optional[int], limit: int) -> Tuple[List[DnDHero], Optional[int]]:
+        return await self._run(self._page, after or 0, limit)
+
+    async def query(self, query: HeroQuery) -> List[DnDHero]:
+        sql, params = self._compile(query)
+        if sql is None:
+            return []
+        return await self._run(self._select, sql, params)
+
+    async def count(self) -> int:
+        return await self._run(lambda: self._connection().execute(COUNT_HEROES).fetchone()[0])
+
+    async def version(self) -> int:
+        # Maintained by triggers, so writes made by other processes sharing the database count too
+        return await self._run(lambda: self._connection().execute(SELECT_META, ("version",)).fetchone()[0])
+
+    async def close(self):
+        # Wait for calls still running on the pool without blocking the event loop
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+    @staticmethod
+    def _compile(query: HeroQuery) -> Tuple[Optional[str], list]:
+        """Translate a HeroQuery into SQL over the indexed columns, or None if nothing can match."""
+        clauses, params = [], []
+        if query.spell is not None:
+            clauses.append("seq IN (SELECT hs.hero_seq FROM hero_spells hs JOIN spells s ON s.spell_id = hs.spell_id "
+                           "WHERE s.name = ? COLLATE NOCASE)")
+            params.append(query.spell)
+        if query.class_ is not None:
+            clauses.append("class_ = ? COLLATE NOCASE")
+            params.append(query.class_)
+        if query.race is not None:
+            clauses.append("race = ? COLLATE NOCASE")
+            params.append(query.race)
+        for column, low, high in (("level", query.min_level, query.max_level),
+                                  ("armor_class", query.min_armor_class, query.max_armor_class),
+                                  ("hit_points", query.min_hit_points, query.max_hit_points)):
+            if low is not None:
+                clauses.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append(f"{column} <= ?")
+                params.append(high)
+        if query.skills:
+            if any(skill not in SKILL_BITS for skill in query.skills):
+                return None, []
+            mask = skills_mask(query.skills)
+            clauses.append("skills & ? = ?")
+            params.extend((mask, mask))
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return f"{SELECT_HEROES}{where} ORDER BY seq", params
+
+    def _add_many(self, heroes: List[DnDHero]):
+        connection = self._connection()
+
+        # Catalogue ids are only remembered once the transaction that created them has committed
+        new_spell_ids: Dict[Tuple, int] = {}
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for hero in heroes:
+                seq = connection.execute(INSERT_HERO, self._row(hero)).lastrowid
+                for position, spell in enumerate(hero.spells or []):
+                    connection.execute(INSERT_HERO_SPELL,
+                                       (seq, position, self._spell_id(connection, spell, new_spell_ids)))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self._spell_ids.update(new_spell_ids)
+
+    @staticmethod
+    def _row(hero: DnDHero) -> tuple:
+        scores = hero.ability_scores
+        equipment = hero.equipment
+        return (hero.id, hero.name, hero.race, hero.class_, hero.level, hero.background, hero.alignment,
+                *(getattr(scores, ability) for ability in ABILITIES), hero.skill_proficiencies.to_mask(),
+                equipment.weapon, equipment.armor, _join(equipment.items), hero.spells is not None,
+                hero.hit_points, hero.armor_class, hero.speed,
+                hero.personality_traits, hero.ideals, hero.bonds, hero.flaws)
+
+    def _spell_id(self, connection: sqlite3.Connection, spell: Spell, new_spell_ids: Dict[Tuple, int]) -> int:
+        key = (spell.name, spell.level, spell.casting_time, spell.range, _join(spell.components), spell.duration)
+        spell_id = self._spell_ids.get(key) or new_spell_ids.get(key)
+        if spell_id is None:
+            spell_id = new_spell_ids[key] = connection.execute(UPSERT_SPELL, key).fetchone()[0]
+        return spell_id
+
+    def _remove_many(self, hero_ids: List[str]) -> List[bool]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            removed = [connection.execute(DELETE_HERO, (hero_id,)).rowcount > 0 for hero_id in hero_ids]
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return removed
+
+    def _select(self, sql: str, params) -> List[DnDHero]:
+        return self._hydrate(self._connection().execute(sql, params).fetchall())
+
+    def _page(self, after: int, limit: int) -> Tuple[List[DnDHero], Optional[int]]:
+        # Fetch one extra row to learn whether another page follows
+        rows = self._connection().execute(SELECT_PAGE, (after, limit + 1)).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return self._hydrate(rows), rows[-1][0] if more else None
+
+    def _hydrate(self, rows: List[tuple]) -> List[DnDHero]:
+        """Rebuild heroes from trusted rows with model_construct, skipping re-validation."""
+        spells: Dict[int, List[Spell]] = {}
+        seqs = [row[0] for row in rows if row[HERO_COLUMNS.index("has_spells") + 1]]
+        connection = self._connection()
+        for start in range(0, len(seqs), MAX_PARAMS):
+            chunk = seqs[start:start + MAX_PARAMS]
+            sql = SELECT_HERO_SPELLS.format(placeholders=", ".join("?" * len(chunk)))
+            for hero_seq, name, level, casting_time, range_, components, duration in connection.execute(sql, chunk):
+                spells.setdefault(hero_seq, []).append(Spell.model_construct(
+                    name=name, level=level, casting_time=casting_time, range=range_,
+                    components=_split(components), duration=duration))
+
+        return [self._hero_from_row(row, spells) for row in rows]
+
+    @staticmethod
+    def _hero_from_row(row: tuple, spells: Dict[int, List[Spell]]) -> DnDHero:
+        (seq, hero_id, name, race, class_, level, background, alignment,
+         strength, dexterity, constitution, intelligence, wisdom, charisma, skills,
+         weapon, armor, items, has_spells, hit_points, armor_class, speed,
+         personality_traits, ideals, bonds, flaws) = row
+        return DnDHero.model_construct(
+            id=hero_id, name=name, race=race, class_=class_, level=level,
+            background=background, alignment=alignment,
+            ability_scores=AbilityScores.model_construct(
+                strength=strength, dexterity=dexterity, constitution=constitution,
+                intelligence=intelligence, wisdom=wisdom, charisma=charisma),
+            skill_proficiencies=SkillProficiencies.from_mask(skills),
+            equipment=Equipment.model_construct(weapon=weapon, armor=armor, items=_split(items)),
+            spells=spells.get(seq, []) if has_spells else None,
+            hit_points=hit_points, armor_class=armor_class, speed=speed,
+            personality_traits=personality_traits, ideals=ideals, bonds=bonds, flaws=flaws)
@@ -0,0 +1,49 @@
+# server/services/token_verifier.py
+
+from typing import Iterable
+
+import jwt
+
+from server.services.claims_cache import ClaimsCache
+from server.services.jwks_cache import JWKSCache
+
+
+class TokenVerifier:
+    """
+    Validates bearer access tokens locally: RS256 signature against the cached JWKS,
+    plus the `aud`, `iss`, `exp` and `nbf` claims. Verified claims are memoized in a
+    ClaimsCache until the token expires.
+    """
+
+    def __init__(self, jwks_cache: JWKSCache, issuers: Iterable[str], audiences: Iterable[str],
+                 claims_cache: ClaimsCache):
+        self.jwks_cache = jwks_cache
+        self.issuers = frozenset(issuers)
+        self.audiences = list(audiences)
+        self.claims_cache = claims_cache
+
+    async def verify(self, token: str) -> dict:
+        """Return the token's claims, raising jwt.InvalidTokenError if it is not valid."""
+        claims = self.claims_cache.get(token)
+        if claims is not None:
+            return claims
+
+        kid = jwt.get_unverified_header(token).get("kid")
+        public_key = await self.jwks_cache.get_signing_key(kid) if kid else None
+        if public_key is None:
+            raise jwt.InvalidTokenError(f"No signing key found for kid: {kid}")
+
+        claims = jwt.decode(
+            token,
+            public_key,
+            algorithms=["RS256"],
+            audience=self.audiences,
+            options={"require": ["exp", "nbf", "iss", "aud"]},
+        )
+
+        # Azure AD issues v1 and v2 access tokens with different issuers, so check against the set
+        if claims["iss"] not in self.issuers:
+            raise jwt.InvalidIssuerError("Invalid issuer")
+
+        self.claims_cache.put(token, claims)
+        return claims
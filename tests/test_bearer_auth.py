@@ -0,0 +1,158 @@
+# tests/test_bearer_auth.py
+
+import asyncio
+import time
+
+import httpx
+import jwt
+import pytest
+from fastapi import Depends, FastAPI
+
+from benchmarks.common import use_stub_settings
+from benchmarks.stub_idp import TENANT_ID, StubIdentityProvider
+from server.config import get_oauth_settings
+from server.services import auth_service
+from server.services.auth_service import require_scopes, token_audiences, token_issuers
+from server.services.claims_cache import ClaimsCache
+from server.services.jwks_cache import JWKSCache
+from server.services.token_verifier import TokenVerifier
+
+use_stub_settings(TENANT_ID)
+JWKS_URL = "https://idp.test/keys"
+
+
+@pytest.fixture
+def idp():
+    return StubIdentityProvider()
+
+
+@pytest.fixture
+def audience():
+    return token_audiences(get_oauth_settings())[1]
+
+
+def _verifier(idp: StubIdentityProvider, jwks_requests: list) -> TokenVerifier:
+    def handler(request: httpx.Request) -> httpx.Response:
+        jwks_requests.append(request)
+        return httpx.Response(200, json=idp.jwks())
+
+    settings = get_oauth_settings()
+    jwks_cache = JWKSCache(JWKS_URL, httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return TokenVerifier(jwks_cache, token_issuers(settings), token_audiences(settings), ClaimsCache(100))
+
+
+def _verify(idp: StubIdentityProvider, *tokens: str, jwks_requests: list = None) -> list:
+    """Verify tokens in turn with a fresh verifier, returning each one's claims or exception."""
+    async def scenario():
+        verifier = _verifier(idp, [] if jwks_requests is None else jwks_requests)
+        results = []
+        for token in tokens:
+            try:
+                results.append(await verifier.verify(token))
+            except jwt.InvalidTokenError as e:
+                results.append(e)
+        await verifier.jwks_cache.stop()
+        return results
+    return asyncio.run(scenario())
+
+
+def test_valid_token_is_verified_once(idp, audience):
+    jwks_requests = []
+    token = idp.sign(audience, scp="Heroes.Read")
+    first, second = _verify(idp, token, token, jwks_requests=jwks_requests)
+    assert first["scp"] == "Heroes.Read" and first["aud"] == audience
+    # The second use is answered from the claims cache
+    assert second is first
+    assert len(jwks_requests) == 1
+
+
+def test_v1_issuer_and_client_id_audience_are_accepted(idp):
+    settings = get_oauth_settings()
+    token = idp.sign(settings.AZURE_CLIENT_ID, iss=f"https://sts.windows.net/{TENANT_ID}/")
+    assert _verify(idp, token)[0]["aud"] == settings.AZURE_CLIENT_ID
+
+
+def _foreign_key(idp: StubIdentityProvider, audience: str) -> str:
+    other = StubIdentityProvider()
+    other.kid = idp.kid
+    return other.sign(audience)
+
+
+@pytest.mark.parametrize("forge, error", [
+    (lambda idp, audience: idp.sign(audience, lifetime=-60), jwt.ExpiredSignatureError),
+    (lambda idp, audience: idp.sign(audience, nbf=int(time.time()) + 600), jwt.ImmatureSignatureError),
+    (lambda idp, audience: idp.sign(audience, iss="https://login.example.com/v2.0"), jwt.InvalidIssuerError),
+    (lambda idp, audience: idp.sign("api://another-api"), jwt.InvalidAudienceError),
+    (lambda idp, audience: StubIdentityProvider().sign(audience), jwt.InvalidTokenError),
+    (_foreign_key, jwt.InvalidSignatureError),
+    (lambda idp, audience: jwt.encode({"aud": audience, "iss": idp.issuer, "exp": int(time.time()) + 600,
+                                       "nbf": int(time.time())}, "secret", algorithm="HS256",
+                                      headers={"kid": idp.kid}), jwt.InvalidAlgorithmError),
+    (lambda idp, audience: jwt.encode({"aud": audience, "iss": idp.issuer, "exp": int(time.time()) + 600},
+                                      idp.private_key, algorithm="RS256", headers={"kid": idp.kid}),
+     jwt.MissingRequiredClaimError),
+], ids=["expired", "not_yet_valid", "wrong_issuer", "wrong_audience", "unknown_key", "wrong_signature",
+        "hs256", "no_nbf"])
+def test_invalid_tokens_are_rejected(idp, audience, forge, error):
+    token = forge(idp, audience)
+    rejected, = _verify(idp, token)
+    assert isinstance(rejected, error)
+
+
+def test_cached_claims_expire_with_the_token(idp, audience):
+    token = idp.sign(audience, lifetime=2)
+
+    async def scenario():
+        verifier = _verifier(idp, [])
+        claims = await verifier.verify(token)
+        assert verifier.claims_cache.get(token) is claims
+        await asyncio.sleep(claims["exp"] - time.time() + 0.05)
+        # No longer served from the cache, and verified again, which fails
+        assert verifier.claims_cache.get(token) is None
+        with pytest.raises(jwt.ExpiredSignatureError):
+            await verifier.verify(token)
+        await verifier.jwks_cache.stop()
+
+    asyncio.run(scenario())
+
+
+def test_claims_cache_is_bounded_and_skips_tokens_without_exp():
+    cache = ClaimsCache(max_size=2)
+    cache.put("no-exp", {"sub": "user"})
+    assert cache.get("no-exp") is None
+    for token in ("a", "b", "c"):
+        cache.put(token, {"exp": time.time() + 60})
+    assert len(cache) == 2 and cache.get("a") is None and cache.get("c") is not None
+    cache.put("expired", {"exp": time.time() - 1})
+    assert cache.get("expired") is None
+
+
+def test_require_scopes(idp, audience, monkeypatch):
+    verifier = _verifier(idp, [])
+    monkeypatch.setattr(auth_service, "get_token_verifier", lambda: verifier)
+    app = FastAPI()
+
+    @app.post("/heroes", dependencies=[Depends(require_scopes("Heroes.Create"))])
+    async def create():
+        return {}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://server") as client:
+            async def post(token=None) -> httpx.Response:
+                headers = {"Authorization": f"Bearer {token}"} if token else {}
+                return await client.post("/heroes", headers=headers)
+
+            missing = await post()
+            assert missing.status_code == 401 and missing.headers["www-authenticate"] == "Bearer"
+            expired = await post(idp.sign(audience, lifetime=-60, scp="Heroes.Create"))
+            assert expired.status_code == 401 and 'error="invalid_token"' in expired.headers["www-authenticate"]
+            assert (await post("not-a-jwt")).status_code == 401
+            assert (await post(idp.sign(audience, scp="Heroes.Read"))).status_code == 403
+            assert (await post(idp.sign(audience, scp="Heroes.Read Other"))).status_code == 403
+            assert (await post(idp.sign(audience))).status_code == 403
+            assert (await post(idp.sign(audience, scp="Heroes.Create"))).status_code == 200
+            # Application tokens carry roles, which the hierarchy expands
+            assert (await post(idp.sign(audience, roles=["Admin"]))).status_code == 200
+        await verifier.jwks_cache.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,82 @@
+# tests/test_bulk_validation.py
+
+import json
+from typing import Annotated, List
+
+import pytest
+from fastapi import HTTPException
+from pydantic import Field, TypeAdapter
+
+from benchmarks.payloads import hero_payloads
+from server.models.dnd_hero import DnDHero
+from server.routers import heroes
+from server.routers.heroes import _validate_heroes
+
+
+@pytest.fixture
+def bulk_limit(monkeypatch):
+    monkeypatch.setattr(heroes, "MAX_BULK_ITEMS", 3)
+    monkeypatch.setattr(heroes, "hero_list_adapter", TypeAdapter(Annotated[List[DnDHero], Field(max_length=3)]))
+    return 3
+
+
+def _ndjson(payloads) -> bytes:
+    return b"\n".join(json.dumps(payload).encode() for payload in payloads)
+
+
+def test_valid_batch(bulk_limit):
+    valid, errors = _validate_heroes(json.dumps(hero_payloads(3)).encode(), "json")
+    assert [index for index, _ in valid] == [0, 1, 2] and errors == {}
+
+
+def test_invalid_items_are_reported_by_position(bulk_limit):
+    payloads = hero_payloads(2)
+    valid, errors = _validate_heroes(json.dumps([{"name": 1}, payloads[0], payloads[1]]).encode(), "json")
+    assert [index for index, _ in valid] == [1, 2]
+    assert list(errors) == [0] and ["name"] in [err["loc"] for err in errors[0]]
+
+
+def test_ndjson_items_are_reported_by_line_number(bulk_limit):
+    payloads = hero_payloads(2)
+    body = b"\n" + _ndjson([{"name": 1}, payloads[0]]) + b"\n\n{\n"
+    valid, errors = _validate_heroes(body, "ndjson")
+    assert [number for number, _ in valid] == [3]
+    assert sorted(errors) == [2, 5]
+    assert errors[5][0]["type"] == "json_invalid"
+
+
+@pytest.mark.parametrize("body", [b'"a","b"', b'"a"\n]\n["c"', json.dumps(hero_payloads(2)).encode()],
+                         ids=["two_values", "array_across_lines", "array_on_one_line"])
+def test_ndjson_lines_must_each_hold_one_hero(bulk_limit, body):
+    valid, errors = _validate_heroes(body, "ndjson")
+    assert valid == []
+    assert all(item_errors for item_errors in errors.values())
+    assert sorted(errors) == list(range(1, len(body.splitlines()) + 1))
+
+
+def test_ndjson_hero_ids_are_one_string_per_line(bulk_limit):
+    assert heroes._ndjson_hero_ids(b'"a"\n\n"b"\n') == ["a", "b"]
+    for body in (b'"a","b"', b'"a"\n["b"]', b'"a"\n]\n["c"'):
+        with pytest.raises(HTTPException) as raised:
+            heroes._ndjson_hero_ids(body)
+        assert raised.value.status_code == 400
+    with pytest.raises(HTTPException) as raised:
+        heroes._ndjson_hero_ids(b"\n".join(b'"%d"' % index for index in range(bulk_limit + 1)))
+    assert raised.value.status_code == 413
+
+
+@pytest.mark.parametrize("payload_format", ["json", "ndjson"])
+def test_oversized_batch_is_refused(bulk_limit, payload_format):
+    payloads = hero_payloads(bulk_limit + 2)
+    body = json.dumps(payloads).encode() if payload_format == "json" else _ndjson(payloads)
+    with pytest.raises(HTTPException) as raised:
+        _validate_heroes(body, payload_format)
+    assert raised.value.status_code == 413
+
+
+def test_oversized_batch_with_invalid_items_is_refused_before_validation(bulk_limit):
+    payloads = [{"name": index} for index in range(bulk_limit + 1)]
+    for payload_format, body in (("json", json.dumps(payloads).encode()), ("ndjson", _ndjson(payloads))):
+        with pytest.raises(HTTPException) as raised:
+            _validate_heroes(body, payload_format)
+        assert raised.value.status_code == 413
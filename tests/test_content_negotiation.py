@@ -0,0 +1,162 @@
+# tests/test_content_negotiation.py
+
+import asyncio
+import gzip
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from benchmarks.common import use_stub_settings
+from benchmarks.payloads import hero_payloads, make_roster
+from benchmarks.stub_idp import TENANT_ID
+from client.services import content_negotiation as client_negotiation
+from server.services import content_negotiation as server_negotiation
+from server.services.content_negotiation import (JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, VARY, BodyTooLargeError,
+                                                 ContentNegotiator, decompress)
+
+# Both apps carry their own copy of the module
+MODULES = pytest.mark.parametrize("module", [server_negotiation, client_negotiation], ids=["server", "client"])
+BODY = json.dumps(hero_payloads(20)).encode()
+
+
+@pytest.fixture(scope="module")
+def app():
+    use_stub_settings(TENANT_ID)
+    from server.main import create_app
+    from server.services.auth_service import get_current_claims
+
+    app = create_app()
+    app.dependency_overrides[get_current_claims] = lambda: {"roles": ["Admin"]}
+    asyncio.run(app.state.hero_service.create_heroes(make_roster(50)))
+    return app
+
+
+def _get(app, path: str, headers: dict) -> httpx.Response:
+    async def request():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://server") as client:
+            return await client.request("GET", path, headers=headers)
+    return asyncio.run(request())
+
+
+def _post(app, path: str, content: bytes, headers: dict) -> httpx.Response:
+    async def request():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://server") as client:
+            return await client.post(path, content=content, headers=headers)
+    return asyncio.run(request())
+
+
+@MODULES
+def test_gzip_round_trip(module):
+    negotiator = module.ContentNegotiator(encodings=["gzip"])
+    encoded = asyncio.run(negotiator.render(BODY, module.JSON_MEDIA_TYPE, "gzip"))
+    assert gzip.decompress(encoded) == BODY
+    assert module.decompress(encoded, "gzip", len(BODY)) == BODY
+    with pytest.raises(module.BodyTooLargeError):
+        module.decompress(encoded, "gzip", len(BODY) - 1)
+
+
+@MODULES
+@pytest.mark.parametrize("encoding, package", [("br", "brotli"), ("zstd", "zstandard")])
+def test_compressor_round_trip(module, encoding, package):
+    codec = pytest.importorskip(package)
+    negotiator = module.ContentNegotiator(encodings=[encoding, "gzip"], min_size=0)
+    assert negotiator.encoding(f"gzip, {encoding}", len(BODY)) == encoding
+    encoded = asyncio.run(negotiator.render(BODY, module.JSON_MEDIA_TYPE, encoding))
+    assert len(encoded) < len(BODY)
+    decoded = codec.decompress(encoded) if encoding == "br" else codec.ZstdDecompressor().decompress(encoded)
+    assert decoded == BODY
+    # Request bodies in the same coding are decoded, within the size limit
+    assert module.decompress(encoded, encoding, len(BODY)) == BODY
+    with pytest.raises(module.BodyTooLargeError):
+        module.decompress(encoded, encoding, len(BODY) - 1)
+    with pytest.raises(ValueError):
+        module.decompress(encoded[:len(encoded) // 2] + b"\0" * 8, encoding, len(BODY))
+
+
+@MODULES
+def test_msgpack_round_trip(module):
+    msgpack = pytest.importorskip("msgpack")
+    negotiator = module.ContentNegotiator()
+    assert negotiator.media_type("application/x-msgpack, application/json;q=0.5") == module.MSGPACK_MEDIA_TYPE
+    assert negotiator.media_type("application/msgpack;q=0.5, application/json") == module.JSON_MEDIA_TYPE
+    encoded = asyncio.run(negotiator.render(BODY, module.MSGPACK_MEDIA_TYPE, None))
+    assert msgpack.unpackb(encoded) == json.loads(BODY)
+    assert module.decode_msgpack(encoded) == json.loads(BODY)
+    with pytest.raises(ValueError):
+        module.decode_msgpack(b"\xc1")
+
+
+def test_unavailable_codecs_are_never_chosen():
+    negotiator = ContentNegotiator(encodings=["zstd", "br", "gzip"], min_size=0)
+    chosen = negotiator.encoding("zstd, br, gzip", len(BODY))
+    assert chosen in negotiator.compressors
+    if server_negotiation.msgpack is None:
+        assert negotiator.media_type(MSGPACK_MEDIA_TYPE) == JSON_MEDIA_TYPE
+    for encoding, package in (("br", "brotli"), ("zstd", "zstandard")):
+        if getattr(server_negotiation, package) is None:
+            assert encoding not in negotiator.compressors
+            with pytest.raises(server_negotiation.UnsupportedEncodingError):
+                decompress(BODY, encoding, len(BODY))
+
+
+def test_msgpack_etag_and_vary(app):
+    pytest.importorskip("msgpack")
+    as_json = _get(app, "/api/heroes/", {})
+    as_msgpack = _get(app, "/api/heroes/", {"Accept": MSGPACK_MEDIA_TYPE})
+    assert as_msgpack.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert as_msgpack.headers["vary"] == as_json.headers["vary"] == VARY
+    json_etag, msgpack_etag = as_json.headers["etag"], as_msgpack.headers["etag"]
+    assert msgpack_etag == json_etag[:-1] + '-msgpack"'
+
+    # Each representation revalidates against its own ETag only
+    assert _get(app, "/api/heroes/", {"Accept": MSGPACK_MEDIA_TYPE, "If-None-Match": msgpack_etag}).status_code == 304
+    assert _get(app, "/api/heroes/", {"Accept": MSGPACK_MEDIA_TYPE, "If-None-Match": json_etag}).status_code == 200
+    assert _get(app, "/api/heroes/", {"If-None-Match": msgpack_etag}).status_code == 200
+
+
+@pytest.mark.parametrize("encoding, package", [("br", "brotli"), ("zstd", "zstandard")])
+def test_compressed_response_has_weak_etag(app, encoding, package):
+    pytest.importorskip(package)
+    response = _get(app, "/api/heroes/", {"Accept-Encoding": encoding})
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["etag"].startswith("W/")
+    assert response.headers["vary"] == VARY
+    # httpx decodes the body as the Content-Encoding says
+    assert len(response.json()) == len(_get(app, "/api/heroes/", {}).json())
+
+
+def test_msgpack_upload(app):
+    msgpack = pytest.importorskip("msgpack")
+    from server.routers.heroes import _validate_heroes
+
+    payloads = hero_payloads(3)
+    valid, errors = _validate_heroes(msgpack.packb(payloads[:2] + [{"name": 1}]), "msgpack")
+    assert [index for index, _ in valid] == [0, 1] and list(errors) == [2]
+    with pytest.raises(HTTPException) as raised:
+        _validate_heroes(msgpack.packb({"name": "not a list"}), "msgpack")
+    assert raised.value.status_code == 400
+
+    response = _post(app, "/api/heroes/bulk", msgpack.packb(payloads),
+                     {"Content-Type": "application/vnd.msgpack", "Accept": MSGPACK_MEDIA_TYPE})
+    assert response.status_code == 200
+    assert msgpack.unpackb(response.content)["created"] == 3
+
+
+def test_msgpack_upload_without_msgpack(app):
+    if server_negotiation.msgpack is not None:
+        pytest.skip("msgpack is installed")
+    response = _post(app, "/api/heroes/bulk", b"\x90", {"Content-Type": MSGPACK_MEDIA_TYPE})
+    assert response.status_code == 415
+
+
+def test_oversized_compressed_upload(app, monkeypatch):
+    from server.config import encoding_settings
+
+    monkeypatch.setattr(encoding_settings, "MAX_DECOMPRESSED_BODY", len(BODY) - 1)
+    response = _post(app, "/api/heroes/bulk", gzip.compress(BODY),
+                     {"Content-Type": JSON_MEDIA_TYPE, "Content-Encoding": "gzip"})
+    assert response.status_code == 413
+    with pytest.raises(BodyTooLargeError):
+        decompress(gzip.compress(BODY), "gzip", len(BODY) - 1)
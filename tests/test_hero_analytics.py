@@ -0,0 +1,41 @@
+# tests/test_hero_analytics.py
+
+import asyncio
+import os
+
+from benchmarks.payloads import make_roster
+from server.services.hero_service import HeroService
+from server.services.sqlite_backend import SQLiteHeroBackend
+
+
+def _count(groups) -> int:
+    return sum(group["count"] for group in groups)
+
+
+def test_stats_follow_writes_of_another_worker(tmp_path):
+    async def scenario():
+        path = os.path.join(str(tmp_path), "heroes.db")
+        # Two workers sharing one database, each with its own analytics columns
+        first, second = HeroService(SQLiteHeroBackend(path)), HeroService(SQLiteHeroBackend(path))
+        await first.open()
+        await second.open()
+        heroes = make_roster(6)
+        try:
+            await first.create_heroes(heroes[:3])
+            assert _count(await first.hero_stats("level")) == 3
+            assert _count(await second.hero_stats("level")) == 3
+
+            await second.create_heroes(heroes[3:])
+            await second.delete_hero(heroes[0].id)
+            assert _count(await second.hero_stats("level")) == 5
+            assert _count(await first.hero_stats("level")) == 5
+
+            # Writes of a worker keep its own columns current without a reload
+            await first.delete_hero(heroes[1].id)
+            assert _count(await first.hero_stats("level")) == 4
+            assert _count(await second.hero_stats("level")) == 4
+        finally:
+            await first.close()
+            await second.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,166 @@
+# tests/test_hero_events.py
+
+import asyncio
+import json
+
+import pytest
+
+from server.services.hero_events import KEEPALIVE_FRAME, HeroEventHub
+
+
+def _events(chunk: bytes) -> list:
+    """The (id, event, data) of every frame in a chunk of the stream."""
+    events = []
+    for frame in chunk.decode().split("\n\n"):
+        if not frame or frame.startswith(":"):
+            continue
+        fields = dict(line.split(": ", 1) for line in frame.split("\n"))
+        events.append((fields["id"], fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def _publish(hub: HeroEventHub, name: str, hero_id: str) -> int:
+    return hub.publish(name, lambda: json.dumps({"id": hero_id}).encode())
+
+
+async def _settle():
+    """Let every subscriber reach the point where it waits for the next event."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _receive(stream) -> bytes:
+    return await asyncio.wait_for(stream.__anext__(), timeout=1)
+
+
+async def _live(hub: HeroEventHub, stream, *events) -> bytes:
+    """Publish `events` in one step while `stream` waits for the next, returning the chunk it receives."""
+    waiting = asyncio.create_task(_receive(stream))
+    await _settle()
+    for name, hero_id in events:
+        _publish(hub, name, hero_id)
+    return await waiting
+
+
+def test_events_are_delivered_to_every_subscriber_and_encoded_once():
+    async def scenario():
+        hub = HeroEventHub(keepalive=None)
+        encoded = []
+        streams = [hub.subscribe() for _ in range(3)]
+        waiting = [asyncio.create_task(_receive(stream)) for stream in streams]
+        await _settle()
+        assert hub.subscribers == 3
+        hub.publish("created", lambda: encoded.append(1) or b'{"id": "1"}')
+        _publish(hub, "deleted", "1")
+        chunks = await asyncio.gather(*waiting)
+        # Both events of the step arrive together, as the same bytes for everyone
+        assert chunks[0] == chunks[1] == chunks[2]
+        assert _events(chunks[0]) == [(f"{hub.epoch.decode()}-1", "created", {"id": "1"}),
+                                      (f"{hub.epoch.decode()}-2", "deleted", {"id": "1"})]
+        assert encoded == [1]
+        for stream in streams:
+            await stream.aclose()
+        assert hub.subscribers == 0
+
+    asyncio.run(scenario())
+
+
+def test_reconnecting_replays_the_missed_events():
+    async def scenario():
+        hub = HeroEventHub(keepalive=None)
+        stream = hub.subscribe()
+        (last_id, _, _), = _events(await _live(hub, stream, ("created", "1")))
+        await stream.aclose()
+        _publish(hub, "created", "2")
+        _publish(hub, "deleted", "1")
+
+        resumed = hub.subscribe(last_id)
+        assert [(name, data["id"]) for _, name, data in _events(await _receive(resumed))] == \
+            [("created", "2"), ("deleted", "1")]
+        # Then carries on with live events
+        assert _events(await _live(hub, resumed, ("created", "3")))[0][2] == {"id": "3"}
+        await resumed.aclose()
+
+        # Resuming from the latest event replays nothing
+        current = hub.subscribe(f"{hub.epoch.decode()}-{hub.seq}")
+        assert _events(await _live(hub, current, ("created", "4")))[0][2] == {"id": "4"}
+        await current.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_ids_that_cannot_be_replayed_resync():
+    async def scenario():
+        hub = HeroEventHub(replay_size=3, keepalive=None)
+        for hero_id in "12345":
+            _publish(hub, "created", hero_id)
+        epoch = hub.epoch.decode()
+        # Another process or an earlier run, a malformed id, one not issued yet, and one no longer kept
+        for last_id in ("0badbeef-5", "garbage", f"{epoch}-x", f"{epoch}-6", f"{epoch}-1"):
+            stream = hub.subscribe(last_id)
+            (resync_id, name, data), = _events(await _receive(stream))
+            assert (resync_id, name, data) == (f"{epoch}-5", "resync", {"reason": "replay"}), last_id
+            await stream.aclose()
+        # The oldest event still kept can be resumed from
+        stream = hub.subscribe(f"{epoch}-2")
+        assert [data["id"] for _, _, data in _events(await _receive(stream))] == ["3", "4", "5"]
+        await stream.aclose()
+
+        # Reconnecting with the id of the resync resumes right after the reloaded roster
+        stream = hub.subscribe("0badbeef-5")
+        (resync_id, _, _), = _events(await _receive(stream))
+        await stream.aclose()
+        _publish(hub, "deleted", "5")
+        stream = hub.subscribe(resync_id)
+        assert [(name, data["id"]) for _, name, data in _events(await _receive(stream))] == [("deleted", "5")]
+        await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_subscriber_that_falls_behind_is_resynced_and_dropped():
+    async def scenario():
+        hub = HeroEventHub(replay_size=10, max_backlog=2, keepalive=None)
+        stream = hub.subscribe()
+        await _live(hub, stream, ("created", "1"))
+        # The subscriber does not read while more events than its backlog allows are published
+        for hero_id in "234":
+            _publish(hub, "created", hero_id)
+        (resync_id, name, data), = _events(await _receive(stream))
+        assert (resync_id, name, data) == (f"{hub.epoch.decode()}-4", "resync", {"reason": "backlog"})
+        # The stream ends there
+        with pytest.raises(StopAsyncIteration):
+            await _receive(stream)
+        assert hub.subscribers == 0
+
+    asyncio.run(scenario())
+
+
+def test_idle_stream_is_kept_alive():
+    async def scenario():
+        hub = HeroEventHub(keepalive=0.01)
+        stream = hub.subscribe()
+        assert await _receive(stream) == KEEPALIVE_FRAME
+        assert _events(await _live(hub, stream, ("created", "1")))[0][1] == "created"
+        await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_published_resyncs_are_coalesced():
+    async def scenario():
+        hub = HeroEventHub(keepalive=None)
+        stream = hub.subscribe()
+        waiting = asyncio.create_task(_receive(stream))
+        await _settle()
+        _publish(hub, "created", "1")
+        first = hub.publish_resync("rollback")
+        assert hub.publish_resync("rollback") == first == hub.seq
+        assert [name for _, name, _ in _events(await waiting)] == ["created", "resync"]
+        # A resync after further events is sent again
+        assert hub.publish_resync("rollback") == first
+        _publish(hub, "created", "2")
+        assert hub.publish_resync("rollback") == first + 2
+        await stream.aclose()
+
+    asyncio.run(scenario())
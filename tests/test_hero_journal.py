@@ -0,0 +1,148 @@
+# tests/test_hero_journal.py
+
+import asyncio
+
+import pytest
+
+from benchmarks.payloads import make_roster
+from server.services.hero_journal import JournaledHeroBackend
+from server.services.hero_service import HeroService
+
+
+def _fail_writes(backend: JournaledHeroBackend):
+    def write_journal(record: bytes, fsync: bool):
+        raise OSError("No space left on device")
+    backend._write_journal = write_journal
+
+
+async def _roster(backend: JournaledHeroBackend):
+    return sorted(hero.id for hero in await backend.list_all())
+
+
+@pytest.mark.parametrize("fsync", ["always", "batch", "never"])
+def test_failed_add_leaves_roster_unchanged(tmp_path, fsync):
+    async def scenario():
+        backend = JournaledHeroBackend(str(tmp_path), fsync=fsync)
+        await backend.open()
+        heroes = make_roster(10)
+        await backend.add_many(heroes[:5])
+        await backend.sync()
+        before = await _roster(backend)
+
+        _fail_writes(backend)
+        with pytest.raises(OSError):
+            await backend.add_many(heroes[5:])
+            await backend.sync()
+        assert await _roster(backend) == before
+        assert await backend.count() == 5
+        assert await backend.get(heroes[5].id) is None
+
+        # No write is accepted once the journal has failed, and the roster stays as it was
+        with pytest.raises(RuntimeError):
+            await backend.add(heroes[9])
+        assert await _roster(backend) == before
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("fsync", ["always", "batch", "never"])
+def test_failed_remove_leaves_roster_unchanged(tmp_path, fsync):
+    async def scenario():
+        backend = JournaledHeroBackend(str(tmp_path), fsync=fsync)
+        await backend.open()
+        heroes = make_roster(5)
+        await backend.add_many(heroes)
+        await backend.sync()
+        before = await _roster(backend)
+
+        _fail_writes(backend)
+        with pytest.raises(OSError):
+            await backend.remove_many([heroes[0].id, "missing", heroes[3].id])
+            await backend.sync()
+        assert await _roster(backend) == before
+        assert (await backend.get(heroes[3].id)).name == heroes[3].name
+
+        with pytest.raises(RuntimeError):
+            await backend.remove(heroes[1].id)
+        assert await _roster(backend) == before
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_failed_flush_reverts_every_buffered_write(tmp_path):
+    async def scenario():
+        backend = JournaledHeroBackend(str(tmp_path), fsync="batch")
+        await backend.open()
+        heroes = make_roster(6)
+        await backend.add_many(heroes[:2])
+        await backend.sync()
+        before = await _roster(backend)
+        version = await backend.version()
+
+        _fail_writes(backend)
+        # Buffered without a flush, so both are reverted by the flush that fails
+        await backend.add_many(heroes[2:4])
+        await backend.remove(heroes[0].id)
+        with pytest.raises(OSError):
+            await backend.sync()
+        assert await _roster(backend) == before
+        # The version moves on, so ETags of the reverted roster are not reused
+        assert await backend.version() > version
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_subscribers_resync_after_a_failed_flush(tmp_path):
+    async def scenario():
+        backend = JournaledHeroBackend(str(tmp_path), fsync="batch")
+        service = HeroService(backend)
+        await service.open()
+        heroes = make_roster(4)
+        await service.create_heroes(heroes[:2])
+        stream = service.events.subscribe()
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+
+        _fail_writes(backend)
+        # Two writers share the flush that fails; both events went out before it did
+        results = await asyncio.gather(service.create_heroes(heroes[2:]), service.delete_hero(heroes[0].id),
+                                       return_exceptions=True)
+        assert all(isinstance(result, OSError) for result in results)
+
+        async def until_resync() -> bytes:
+            received = await first
+            while b"event: resync" not in received:
+                received += await stream.__anext__()
+            return received
+        received = await asyncio.wait_for(until_resync(), timeout=5)
+        await stream.aclose()
+
+        assert received.count(b"event: resync") == 1
+        assert received.index(b"event: created") < received.index(b"event: deleted") < received.index(b"event: resync")
+        assert b'data: {"reason": "rollback"}' in received
+        assert sorted(hero.id for hero in await service.list_heroes()) == sorted(hero.id for hero in heroes[:2])
+
+    asyncio.run(scenario())
+
+
+def test_journal_recovers_only_written_heroes(tmp_path):
+    async def scenario():
+        heroes = make_roster(4)
+        backend = JournaledHeroBackend(str(tmp_path), fsync="always", snapshot_on_close=False)
+        await backend.open()
+        await backend.add_many(heroes[:3])
+        await backend.remove(heroes[1].id)
+        _fail_writes(backend)
+        with pytest.raises(OSError):
+            await backend.add(heroes[3])
+        await backend.close()
+
+        reopened = JournaledHeroBackend(str(tmp_path))
+        await reopened.open()
+        assert await _roster(reopened) == sorted([heroes[0].id, heroes[2].id])
+        await reopened.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,159 @@
+# tests/test_hero_proxy.py
+
+import asyncio
+import time
+
+import httpx
+from fastapi import HTTPException
+
+from client.models.session import Session
+from client.services.hero_api_client import HeroApiClient
+
+BASE_URL = "http://server"
+
+
+def _session(user: str, token: str = "token") -> Session:
+    now = time.time()
+    return Session(id=f"session-{user}", access_token=f"{token}-{user}", claims={"oid": user}, id_claims={},
+                   access_token_expires_at=now + 3600, created_at=now)
+
+
+class _Upstream:
+    """A stand-in hero API answering from `bodies` with an ETag per version, recording every request."""
+
+    def __init__(self):
+        self.bodies = {"/api/heroes/": b"[]"}
+        self.versions = {}
+        self.requests = []
+        self.gate = None
+
+    def bump(self, path: str, body: bytes):
+        self.bodies[path] = body
+        self.versions[path] = self.versions.get(path, 0) + 1
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.gate is not None:
+            await self.gate.wait()
+        body = self.bodies.get(request.url.path)
+        if body is None:
+            return httpx.Response(404, json={"detail": "Hero not found"})
+        etag = f'"{request.url.path}-{self.versions.get(request.url.path, 0)}"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, content=body, headers={"ETag": etag, "Content-Type": "application/json"})
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+def test_cached_responses_are_revalidated():
+    upstream = _Upstream()
+    hero_api = HeroApiClient(BASE_URL)
+
+    async def scenario():
+        async with upstream.client() as http_client:
+            first = await hero_api.get(http_client, _session("alice"), "/api/heroes/")
+            assert first.status_code == 200 and first.content == b"[]"
+            assert "if-none-match" not in upstream.requests[-1].headers
+            # Unchanged: the server still sees the (refreshed) token, and answers an empty 304
+            second = await hero_api.get(http_client, _session("alice", "refreshed"), "/api/heroes/")
+            assert second == first
+            assert upstream.requests[-1].headers["if-none-match"] == first.etag
+            assert upstream.requests[-1].headers["authorization"] == "Bearer refreshed-alice"
+            # Changed: the new version replaces the cached one
+            upstream.bump("/api/heroes/", b'[{"id":"1"}]')
+            third = await hero_api.get(http_client, _session("alice"), "/api/heroes/")
+            assert third.status_code == 200 and third.content == b'[{"id":"1"}]' and third.etag != first.etag
+            assert await hero_api.get(http_client, _session("alice"), "/api/heroes/") == third
+            assert len(upstream.requests) == 4
+
+    asyncio.run(scenario())
+
+
+def test_cache_is_kept_per_user():
+    upstream = _Upstream()
+    hero_api = HeroApiClient(BASE_URL)
+
+    async def scenario():
+        async with upstream.client() as http_client:
+            await hero_api.get(http_client, _session("alice"), "/api/heroes/")
+            await hero_api.get(http_client, _session("bob"), "/api/heroes/")
+            # Bob's first request is not revalidated against Alice's copy
+            assert "if-none-match" not in upstream.requests[-1].headers
+            assert upstream.requests[-1].headers["authorization"] == "Bearer token-bob"
+
+    asyncio.run(scenario())
+
+
+def test_uncacheable_responses_are_not_kept():
+    upstream = _Upstream()
+    upstream.bump("/api/heroes/big", b"x" * 64)
+    hero_api = HeroApiClient(BASE_URL, cache_size=2, max_cached_body=32)
+    alice = _session("alice")
+
+    async def scenario():
+        async with upstream.client() as http_client:
+            # Too large to cache
+            await hero_api.get(http_client, alice, "/api/heroes/big")
+            await hero_api.get(http_client, alice, "/api/heroes/big")
+            assert "if-none-match" not in upstream.requests[-1].headers
+            # A cached hero that is gone is dropped along with its 404
+            upstream.bump("/api/heroes/1", b'{"id":"1"}')
+            await hero_api.get(http_client, alice, "/api/heroes/1")
+            del upstream.bodies["/api/heroes/1"]
+            assert (await hero_api.get(http_client, alice, "/api/heroes/1")).status_code == 404
+            assert all(url != f"{BASE_URL}/api/heroes/1" for _, url in hero_api._cache)
+            # The least recently used entry is evicted past the cache size
+            for hero_id in "234":
+                upstream.bump(f"/api/heroes/{hero_id}", b"{}")
+                await hero_api.get(http_client, alice, f"/api/heroes/{hero_id}")
+            assert [url for _, url in hero_api._cache] == [f"{BASE_URL}/api/heroes/3", f"{BASE_URL}/api/heroes/4"]
+
+    asyncio.run(scenario())
+
+
+def test_identical_gets_share_one_upstream_request():
+    upstream = _Upstream()
+    hero_api = HeroApiClient(BASE_URL)
+
+    async def scenario():
+        upstream.gate = asyncio.Event()
+        async with upstream.client() as http_client:
+            calls = [asyncio.create_task(hero_api.get(http_client, _session("alice"), "/api/heroes/"))
+                     for _ in range(5)]
+            calls.append(asyncio.create_task(hero_api.get(http_client, _session("bob"), "/api/heroes/")))
+            calls.append(asyncio.create_task(hero_api.get(http_client, _session("alice"), "/api/heroes/",
+                                                          {"level": 3})))
+            await asyncio.sleep(0.01)
+            # One request per user and URL
+            assert len(upstream.requests) == 3
+            # A caller that goes away does not cancel the request for the others
+            calls[0].cancel()
+            upstream.gate.set()
+            results = await asyncio.gather(*calls[1:])
+            assert calls[0].cancelled()
+            assert all(result.status_code == 200 for result in results) and len(upstream.requests) == 3
+            assert not hero_api._inflight
+            # Once answered, the next GET is a new request
+            await hero_api.get(http_client, _session("alice"), "/api/heroes/")
+            assert len(upstream.requests) == 4
+
+    asyncio.run(scenario())
+
+
+def test_unreachable_upstream_answers_502_to_every_waiter():
+    hero_api = HeroApiClient(BASE_URL)
+
+    async def refuse(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.01)
+        raise httpx.ConnectError("refused", request=request)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(refuse)) as http_client:
+            results = await asyncio.gather(*(hero_api.get(http_client, _session("alice"), "/api/heroes/")
+                                             for _ in range(3)), return_exceptions=True)
+            assert all(isinstance(result, HTTPException) and result.status_code == 502 for result in results)
+            assert not hero_api._inflight
+
+    asyncio.run(scenario())
@@ -0,0 +1,137 @@
+# tests/test_login_callback.py
+
+import asyncio
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from benchmarks.common import use_stub_settings
+from benchmarks.stub_idp import TENANT_ID, StubIdentityProvider
+from client.logger import stop_logging
+from client.services import auth_service
+from client.services.auth_service import get_endpoints, handle_openid_connect_flow
+from client.services.http_client import get_http_client
+from client.services.jwks_cache import JWKSCache
+from client.services.session_service import session_service
+
+use_stub_settings(TENANT_ID)
+CLIENT_ID = "bench-client-id"
+SCOPE = f"api://{CLIENT_ID}/Heroes.Read"
+NONCE = "nonce-of-the-login"
+
+
+@pytest.fixture
+def idp():
+    return StubIdentityProvider()
+
+
+@pytest.fixture
+def jwks_cache(monkeypatch):
+    # A fresh key cache per test, so keys of an earlier provider are never served
+    cache = JWKSCache(get_endpoints().jwks)
+    monkeypatch.setattr(auth_service, "get_jwks_cache", lambda: cache)
+    return cache
+
+
+def _idp_transport(idp: StubIdentityProvider, tokens, status_code: int = 200) -> httpx.MockTransport:
+    """The token endpoint answering `tokens`, or tokens for the nonce of the code when it is a callable."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url == get_endpoints().jwks:
+            return httpx.Response(200, json=idp.jwks())
+        if callable(tokens):
+            return httpx.Response(status_code, json=tokens(parse_qs(request.content.decode())["code"][0]))
+        return httpx.Response(status_code, json=tokens)
+    return httpx.MockTransport(handler)
+
+
+def _login(idp: StubIdentityProvider, jwks_cache: JWKSCache, tokens: dict, status_code: int = 200):
+    async def scenario():
+        async with httpx.AsyncClient(transport=_idp_transport(idp, tokens, status_code)) as http_client:
+            jwks_cache.http_client = http_client
+            return await handle_openid_connect_flow("code", http_client, NONCE)
+    return asyncio.run(scenario())
+
+
+def test_verified_id_token_starts_a_session(idp, jwks_cache):
+    session = _login(idp, jwks_cache, idp.issue_tokens(CLIENT_ID, SCOPE, NONCE))
+    assert session.id_claims["aud"] == CLIENT_ID and session.id_claims["nonce"] == NONCE
+    assert session.claims["scp"] == "Heroes.Read"
+
+
+@pytest.mark.parametrize("forge", [
+    lambda idp: StubIdentityProvider().sign(CLIENT_ID, nonce=NONCE),
+    lambda idp: idp.sign("another-client", nonce=NONCE),
+    lambda idp: idp.sign(CLIENT_ID, lifetime=-60, nonce=NONCE),
+    lambda idp: idp.sign(CLIENT_ID, nonce="nonce-of-another-login"),
+    lambda idp: idp.sign(CLIENT_ID),
+], ids=["foreign_key", "wrong_audience", "expired", "wrong_nonce", "no_nonce"])
+def test_unverifiable_id_token_is_refused(idp, jwks_cache, forge):
+    tokens = idp.issue_tokens(CLIENT_ID, SCOPE, NONCE)
+    tokens["id_token"] = forge(idp)
+    with pytest.raises(HTTPException) as raised:
+        _login(idp, jwks_cache, tokens)
+    assert raised.value.status_code == 403
+
+
+def test_rejected_code_answers_the_identity_provider_status(idp, jwks_cache):
+    with pytest.raises(HTTPException) as raised:
+        _login(idp, jwks_cache, {"error": "invalid_grant"}, status_code=400)
+    assert raised.value.status_code == 400
+
+
+@pytest.fixture
+def app(idp, jwks_cache):
+    from client.main import create_app
+
+    app = create_app()
+    # Codes are redeemed for tokens carrying the nonce of the login they were issued for
+    http_client = httpx.AsyncClient(transport=_idp_transport(
+        idp, lambda code: idp.issue_tokens(CLIENT_ID, SCOPE, idp.codes.pop(code)[2])))
+    jwks_cache.http_client = http_client
+    app.dependency_overrides[get_http_client] = lambda: http_client
+    yield app
+    stop_logging(app.state.log_listener)
+
+
+def _browser(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://client")
+
+
+async def _start_login(browser: httpx.AsyncClient, idp: StubIdentityProvider) -> dict:
+    """Start a login and complete it at the identity provider, returning the query of its callback."""
+    query = {key: values[0] for key, values in
+             parse_qs(urlsplit((await browser.get("/auth/login")).headers["location"]).query).items()}
+    return {"code": idp.issue_code(CLIENT_ID, query["redirect_uri"], query["nonce"]), "state": query["state"]}
+
+
+def test_callback_completes_a_login_started_by_the_browser(app, idp):
+    async def scenario():
+        async with _browser(app) as browser:
+            # Two logins in flight at once, as from two tabs
+            first, second = await _start_login(browser, idp), await _start_login(browser, idp)
+            for params in (second, first):
+                response = await browser.get("/auth/callback", params=params)
+                assert response.status_code == 200
+                assert session_service.cookie_name in response.cookies
+            # Each login completes once
+            assert (await browser.get("/auth/callback", params=first)).status_code == 400
+
+    asyncio.run(scenario())
+
+
+def test_callback_refuses_a_login_started_elsewhere(app, idp):
+    async def scenario():
+        async with _browser(app) as attacker, _browser(app) as victim:
+            # The attacker's own login, completed in the victim's browser
+            params = await _start_login(attacker, idp)
+            for forged in (params, {"code": params["code"]}, {**params, "state": "guessed"}):
+                response = await victim.get("/auth/callback", params=forged)
+                assert response.status_code == 400
+                assert session_service.cookie_name not in response.cookies
+            # A started login does not accept another state either
+            own = await _start_login(victim, idp)
+            assert (await victim.get("/auth/callback", params={**own, "state": params["state"]})).status_code == 400
+
+    asyncio.run(scenario())
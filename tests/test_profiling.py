@@ -0,0 +1,58 @@
+# tests/test_profiling.py
+
+import asyncio
+import sys
+
+import pytest
+
+from client.services import profiling as client_profiling
+from server.services import profiling as server_profiling
+
+MODULES = pytest.mark.parametrize("module", [server_profiling, client_profiling], ids=["server", "client"])
+SCOPE = {"type": "http", "method": "GET", "path": "/api/heroes/events", "headers": []}
+
+
+def _streaming_app(media_type: bytes, checkpoint):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", media_type)]})
+        await asyncio.sleep(0.2)
+        checkpoint()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    return app
+
+
+async def _send(message):
+    pass
+
+
+@MODULES
+@pytest.mark.parametrize("media_type, max_duration", [(b"text/event-stream; charset=utf-8", 30.0),
+                                                      (b"application/x-ndjson", 0.05)], ids=["sse", "max_duration"])
+def test_long_responses_release_the_profiler(module, media_type, max_duration):
+    switch_interval = sys.getswitchinterval()
+    seen = {}
+
+    def checkpoint():
+        seen["active"] = middleware._active
+        seen["switch_interval"] = sys.getswitchinterval()
+        seen["profiles"] = len(store.list())
+
+    store = module.ProfileStore()
+    middleware = module.ProfilingMiddleware(_streaming_app(media_type, checkpoint), store, sample_rate=1.0,
+                                            max_duration=max_duration)
+    asyncio.run(middleware(dict(SCOPE), None, _send))
+    # Released while the response was still being streamed
+    assert seen == {"active": False, "switch_interval": switch_interval, "profiles": 1}
+    assert len(store.list()) == 1 and store.list()[0].status == 200
+
+
+@MODULES
+def test_short_responses_are_profiled_to_the_end(module):
+    store = module.ProfileStore()
+    seen = {}
+    app = _streaming_app(b"application/json", lambda: seen.setdefault("active", middleware._active))
+    middleware = module.ProfilingMiddleware(app, store, sample_rate=1.0)
+    asyncio.run(middleware(dict(SCOPE), None, _send))
+    assert seen == {"active": True}
+    assert store.list()[0].duration_ms >= 200
+    assert not middleware._active
@@ -0,0 +1,165 @@
+# tests/test_rw_lock.py
+
+import asyncio
+
+import pytest
+
+from server.services.rw_lock import AsyncRWLock
+
+# Unnamed locks use the bare guards, named ones the timed guards
+LOCKS = pytest.mark.parametrize("name", [None, "test"], ids=["bare", "timed"])
+
+
+async def _settle():
+    """Let every runnable task reach its next suspension point."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class _Holder:
+    """A task holding the lock in one mode until released, recording the order it was granted in."""
+
+    def __init__(self, lock: AsyncRWLock, mode: str, granted: list, label: str):
+        self.release = asyncio.Event()
+        self.task = asyncio.create_task(self._hold(lock, mode, granted, label))
+
+    async def _hold(self, lock, mode, granted, label):
+        async with (lock.read() if mode == "read" else lock.write()):
+            granted.append(label)
+            await self.release.wait()
+
+
+@LOCKS
+def test_readers_share_and_writers_hold_alone(name):
+    async def scenario():
+        lock, granted = AsyncRWLock(name), []
+        readers = [_Holder(lock, "read", granted, f"r{i}") for i in range(3)]
+        await _settle()
+        assert lock.readers == 3 and granted == ["r0", "r1", "r2"]
+        writer = _Holder(lock, "write", granted, "w")
+        await _settle()
+        assert "w" not in granted and not lock.writer_active
+        for reader in readers:
+            reader.release.set()
+        await _settle()
+        assert granted[-1] == "w" and lock.writer_active and lock.readers == 0
+        writer.release.set()
+        await asyncio.gather(*(holder.task for holder in (*readers, writer)))
+        assert not lock.writer_active and lock.readers == 0
+
+    asyncio.run(scenario())
+
+
+@LOCKS
+def test_waiting_writer_is_not_starved_by_new_readers(name):
+    async def scenario():
+        lock, granted = AsyncRWLock(name), []
+        first = _Holder(lock, "read", granted, "r0")
+        await _settle()
+        writer = _Holder(lock, "write", granted, "w")
+        await _settle()
+        # Readers arriving after the writer queue behind it instead of joining the current readers
+        late = [_Holder(lock, "read", granted, f"r{i}") for i in range(1, 4)]
+        await _settle()
+        assert granted == ["r0"] and lock.readers == 1
+        first.release.set()
+        await _settle()
+        assert granted == ["r0", "w"]
+        # The writer's release admits the whole queued batch of readers at once
+        writer.release.set()
+        await _settle()
+        assert granted == ["r0", "w", "r1", "r2", "r3"] and lock.readers == 3
+        for reader in late:
+            reader.release.set()
+        await asyncio.gather(first.task, writer.task, *(reader.task for reader in late))
+
+    asyncio.run(scenario())
+
+
+@LOCKS
+def test_queued_readers_are_not_starved_by_writers(name):
+    async def scenario():
+        lock, granted = AsyncRWLock(name), []
+        first = _Holder(lock, "write", granted, "w0")
+        await _settle()
+        reader = _Holder(lock, "read", granted, "r")
+        second = _Holder(lock, "write", granted, "w1")
+        await _settle()
+        first.release.set()
+        await _settle()
+        # The reader queued before the second writer is served first
+        assert granted == ["w0", "r"]
+        reader.release.set()
+        await _settle()
+        assert granted == ["w0", "r", "w1"]
+        second.release.set()
+        await asyncio.gather(first.task, reader.task, second.task)
+
+    asyncio.run(scenario())
+
+
+@LOCKS
+def test_cancelled_writer_does_not_hold_back_readers(name):
+    async def scenario():
+        lock, granted = AsyncRWLock(name), []
+        first = _Holder(lock, "read", granted, "r0")
+        await _settle()
+        writer = _Holder(lock, "write", granted, "w")
+        await _settle()
+        reader = _Holder(lock, "read", granted, "r1")
+        await _settle()
+        assert granted == ["r0"]
+        writer.task.cancel()
+        await _settle()
+        # Nothing is left in front of the queued reader
+        assert writer.task.cancelled() and granted == ["r0", "r1"] and lock.readers == 2
+        first.release.set()
+        reader.release.set()
+        await asyncio.gather(first.task, reader.task)
+        assert lock.readers == 0 and not lock.writer_active
+
+    asyncio.run(scenario())
+
+
+@LOCKS
+def test_cancelled_writer_passes_the_lock_to_the_next_writer(name):
+    async def scenario():
+        lock, granted = AsyncRWLock(name), []
+        first = _Holder(lock, "read", granted, "r")
+        await _settle()
+        cancelled = _Holder(lock, "write", granted, "w0")
+        second = _Holder(lock, "write", granted, "w1")
+        await _settle()
+        first.release.set()
+        await asyncio.sleep(0)
+        # Handed the lock as the reader left, but cancelled before it could run
+        assert lock.writer_active
+        cancelled.task.cancel()
+        await _settle()
+        assert cancelled.task.cancelled() and granted == ["r", "w1"] and lock.writer_active
+        second.release.set()
+        await asyncio.gather(first.task, second.task)
+        assert not lock.writer_active
+
+    asyncio.run(scenario())
+
+
+@LOCKS
+def test_cancelled_writer_frees_the_lock_when_nobody_waits(name):
+    async def scenario():
+        lock, granted = AsyncRWLock(name), []
+        first = _Holder(lock, "write", granted, "w0")
+        await _settle()
+        cancelled = _Holder(lock, "write", granted, "w1")
+        await _settle()
+        first.release.set()
+        await asyncio.sleep(0)
+        cancelled.task.cancel()
+        await _settle()
+        assert cancelled.task.cancelled() and not lock.writer_active and lock.readers == 0
+        # The lock is free again, so an acquire completes without waiting
+        await asyncio.wait_for(lock.acquire_read(), timeout=1)
+        lock.release_read()
+        await first.task
+
+    asyncio.run(scenario())
@@ -0,0 +1,60 @@
+# tests/test_scope_policy.py
+
+import itertools
+
+import pytest
+
+from client.services import scope_policy as client_scope_policy
+from server.services import scope_policy as server_scope_policy
+from server.services.auth_service import ROLE_HIERARCHY
+
+# Both apps carry their own copy of the module
+MODULES = pytest.mark.parametrize("module", [server_scope_policy, client_scope_policy], ids=["server", "client"])
+SCOPES = ["Heroes.Read", "Heroes.Create", "Admin", "User.Read", "Heroes.Delete"]
+
+
+def _subsets(items):
+    return itertools.chain.from_iterable(itertools.combinations(items, size) for size in range(len(items) + 1))
+
+
+def _reference(token_scopes, required_scopes) -> bool:
+    """The string comparison the bitmasks replace."""
+    return any(required in ROLE_HIERARCHY.get(scope, []) for scope in token_scopes for required in required_scopes)
+
+
+@MODULES
+def test_matches_the_role_hierarchy(module):
+    policy = module.ScopePolicy(ROLE_HIERARCHY)
+    for token_scopes in _subsets(SCOPES):
+        token_mask = policy.mask(token_scopes)
+        for required_scopes in _subsets(SCOPES):
+            expected = _reference(token_scopes, required_scopes)
+            assert policy.allows(token_mask, policy.requirement(*required_scopes)) == expected, \
+                (token_scopes, required_scopes)
+
+
+@MODULES
+def test_grants_are_transitive(module):
+    policy = module.ScopePolicy({"Owner": ["Editor"], "Editor": ["Viewer", "Editor"], "Viewer": ["Viewer"],
+                                 "Cyclic": ["Loop"], "Loop": ["Cyclic", "Viewer"]})
+    assert policy.allows(policy.mask(["Owner"]), policy.requirement("Viewer"))
+    assert not policy.allows(policy.mask(["Viewer"]), policy.requirement("Editor"))
+    assert policy.allows(policy.mask(["Cyclic"]), policy.requirement("Viewer"))
+    # Scopes the hierarchy does not know grant nothing and are never met
+    assert policy.mask(["Unknown"]) == 0 and policy.requirement("Unknown") == 0
+    assert not policy.allows(policy.mask(["Owner"]), policy.requirement("Unknown"))
+
+
+@MODULES
+def test_claims_mask_combines_scopes_and_roles(module):
+    policy = module.ScopePolicy(ROLE_HIERARCHY, cache_size=2)
+    create, admin = policy.requirement("Heroes.Create"), policy.requirement("Admin")
+    assert policy.claims_mask({}) == 0
+    assert policy.allows(policy.claims_mask({"scp": "User.Read Heroes.Create"}), create)
+    assert not policy.allows(policy.claims_mask({"scp": "Heroes.Create"}), admin)
+    assert policy.allows(policy.claims_mask({"scp": "Heroes.Read", "roles": ["Admin"]}), admin)
+    assert policy.allows(policy.claims_mask({"roles": ["Heroes.Create"]}), create)
+    assert not policy.allows(policy.claims_mask({"scp": "", "roles": ["Heroes.Read"]}), create)
+    assert policy.claims_mask({"scp": "Heroes.Read"}) == policy.mask(["Heroes.Read"])
+    # The memo is dropped rather than grown past its size
+    assert len(policy._masks) <= policy.cache_size
@@ -0,0 +1,74 @@
+# tests/test_sessions.py
+
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from benchmarks.common import use_stub_settings
+from benchmarks.stub_idp import TENANT_ID
+from client.models.session import Session
+from client.services import session_service as session_module
+from client.services.session_service import SessionService
+from client.services.session_store import InMemorySessionStore, SQLiteSessionStore
+
+use_stub_settings(TENANT_ID)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemorySessionStore(ttl=3600, max_sessions=100)
+    return SQLiteSessionStore(os.path.join(str(tmp_path), "sessions.db"), ttl=3600, max_sessions=100)
+
+
+def _session(expires_in: float) -> Session:
+    return Session(id="session", access_token="old", refresh_token="refresh", claims={}, id_claims={"sub": "user"},
+                   access_token_expires_at=time.time() + expires_in, created_at=time.time())
+
+
+def test_refresh_finishing_after_logout_does_not_restore_the_session(store, monkeypatch):
+    answered = None
+
+    async def refresh_access_token(session, http_client):
+        await answered.wait()
+        return session.model_copy(update={"access_token": "new", "access_token_expires_at": time.time() + 3600})
+
+    monkeypatch.setattr(session_module, "refresh_access_token", refresh_access_token)
+
+    async def scenario():
+        nonlocal answered
+        answered = asyncio.Event()
+        service = SessionService(store, b"secret", "session", cookie_secure=False, refresh_margin=300)
+        session = _session(expires_in=60)
+        await store.put(session)
+        # Still valid, so the token is refreshed in the background
+        assert await service.ensure_fresh(session, http_client=None) is session
+        refresh = service._refreshes[session.id]
+
+        await store.delete(session.id)
+        answered.set()
+        with pytest.raises(HTTPException) as raised:
+            await refresh
+        assert raised.value.status_code == 401
+        assert await store.get(session.id) is None
+        await service.close()
+
+    asyncio.run(scenario())
+
+
+def test_replace_keeps_the_original_expiry(store):
+    async def scenario():
+        session = _session(expires_in=60)
+        assert not await store.replace(session)
+        await store.put(session)
+        assert await store.replace(session.model_copy(update={"access_token": "new"}))
+        assert (await store.get(session.id)).access_token == "new"
+        expired = session.model_copy(update={"id": "expired", "created_at": time.time() - store.ttl})
+        await store.put(expired)
+        assert not await store.replace(expired)
+        await store.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,38 @@
+# tests/test_sqlite_backend.py
+
+import asyncio
+import os
+import random
+
+from benchmarks.payloads import SPELLS, hero_payload
+from server.models.dnd_hero import DnDHero
+from server.services.hero_backend import InMemoryHeroBackend
+from server.services.sqlite_backend import SQLiteHeroBackend
+
+
+def _hero(index: int, items, components) -> DnDHero:
+    payload = hero_payload(index, random.Random(index))
+    payload["equipment"]["items"] = items
+    payload["spells"] = [{**SPELLS[0], "components": components}]
+    return DnDHero.model_validate(payload)
+
+
+def test_string_lists_read_back_unchanged(tmp_path):
+    heroes = [_hero(0, [""], []), _hero(1, ["Rope\x1fHook", "", "Torch"], ["V", ""]),
+              _hero(2, [], ["V\x1fS"]), _hero(3, ['"quoted"', "[]"], ["S"])]
+
+    async def scenario():
+        sqlite = SQLiteHeroBackend(os.path.join(str(tmp_path), "heroes.db"))
+        memory = InMemoryHeroBackend()
+        for backend in (sqlite, memory):
+            await backend.open()
+            await backend.add_many(heroes)
+        try:
+            for hero in heroes:
+                stored = await sqlite.get(hero.id)
+                assert stored.model_dump() == (await memory.get(hero.id)).model_dump() == hero.model_dump()
+        finally:
+            await sqlite.close()
+            await memory.close()
+
+    asyncio.run(scenario())
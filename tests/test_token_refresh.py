@@ -0,0 +1,58 @@
+# tests/test_token_refresh.py
+
+import asyncio
+import time
+
+import httpx
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from benchmarks.common import use_stub_settings
+from benchmarks.stub_idp import TENANT_ID
+from client.models.session import Session
+from client.services.auth_service import refresh_access_token
+
+use_stub_settings(TENANT_ID)
+
+
+def _session() -> Session:
+    return Session(id="session", access_token="old", refresh_token="refresh", claims={}, id_claims={"sub": "user"},
+                   access_token_expires_at=time.time(), created_at=time.time())
+
+
+def _refresh(handler) -> Session:
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+            return await refresh_access_token(_session(), http_client)
+    return asyncio.run(scenario())
+
+
+def test_refresh_replaces_the_access_token():
+    access_token = jwt.encode({"exp": 2_000_000_000, "scp": "Heroes.Read"}, "secret", algorithm="HS256")
+    session = _refresh(lambda request: httpx.Response(200, json={"access_token": access_token}))
+    assert session.access_token == access_token and session.refresh_token == "refresh"
+    assert session.access_token_expires_at == 2_000_000_000
+
+
+def test_rejected_refresh_token_ends_the_session():
+    with pytest.raises(HTTPException) as raised:
+        _refresh(lambda request: httpx.Response(400, json={"error": "invalid_grant"}))
+    assert raised.value.status_code == 401
+
+
+def _unreachable(request: httpx.Request):
+    raise httpx.ConnectError("Connection refused", request=request)
+
+
+@pytest.mark.parametrize("handler", [
+    _unreachable,
+    lambda request: httpx.Response(200, content=b"<html>Bad gateway</html>"),
+    lambda request: httpx.Response(200, json={"token_type": "Bearer"}),
+    lambda request: httpx.Response(200, json={"access_token": "not a jwt"}),
+    lambda request: httpx.Response(503),
+], ids=["unreachable", "not_json", "no_access_token", "malformed_access_token", "unavailable"])
+def test_identity_provider_failures_answer_502(handler):
+    with pytest.raises(HTTPException) as raised:
+        _refresh(handler)
+    assert raised.value.status_code == 502